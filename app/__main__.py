@@ -1,12 +1,67 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from typing import Awaitable
+import asyncio
+import time
 
 from app.api.routes.base_prompt import router as base_prompt_router
 from app.api.routes.corpus import router as corpus_router
+from app.api.routes.generation import router as generation_router
+from app.api.routes.interaction import router as interaction_router
+from app.api.routes.metrics import router as metrics_router
+from app.api.routes.scene import router as scene_router
+from app.api.routes.user import router as user_router
+from app.core.base_prompt import base_prompt_manager
+from app.core.corpus import corpus_dataset_manager
+from app.core.generation import generation_corpus_exporter
+from app.core.interaction import interaction_ingest_buffer
+from app.utils.executor import install_io_executor, shutdown_io_executor
+from app.utils.db import dispose_async_engine, init_db
+from app.utils.log import logger
+from app.utils.metrics import MetricsMiddleware, registry
 
-app = FastAPI()
+
+async def timed(name: str, awaitable: Awaitable):
+    """等待 awaitable 完成并记录耗时"""
+    start = time.perf_counter()
+    result = await awaitable
+    logger.debug(f"{name}完成，耗时 {time.perf_counter() - start:.3f} 秒。")
+    return result
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start = time.perf_counter()
+    install_io_executor()
+    await asyncio.gather(
+        timed("数据库初始化", init_db()),
+        timed("base prompt 载入", base_prompt_manager.refresh()),
+        timed("语料库中断操作恢复", corpus_dataset_manager.recover()),
+    )
+    corpus_dataset_manager.start_watch()
+    base_prompt_manager.start_watch()
+    logger.success(f"应用启动完成，耗时 {time.perf_counter() - start:.3f} 秒。")
+    yield
+    await base_prompt_manager.stop_watch()
+    await generation_corpus_exporter.close()
+    await corpus_dataset_manager.close()
+    await interaction_ingest_buffer.close()
+    await dispose_async_engine()
+    await shutdown_io_executor()
+
+
+app = FastAPI(lifespan=lifespan)
+
+if registry is not None:
+    app.add_middleware(MetricsMiddleware)
 
 app.include_router(base_prompt_router, prefix='/base_prompt')
 app.include_router(corpus_router, prefix='/corpus')
+app.include_router(interaction_router, prefix='/interaction')
+app.include_router(generation_router, prefix='/generation')
+app.include_router(scene_router, prefix='/scene')
+app.include_router(user_router, prefix='/user')
+app.include_router(metrics_router)
 
 if __name__ == "__main__":
     import uvicorn
@@ -7,6 +7,7 @@ from app.common.models.base_prompt import (
     BasePromptAdd,
     BasePrompt,
 )
+from app.models.base_prompt import BasePromptRender, RenderedBasePrompt
 from app.core.base_prompt import base_prompt_manager
 
 router = APIRouter()
@@ -19,21 +20,31 @@ async def _():
 
 @router.get('/refresh', response_model=BasePromptManagerStatus)
 async def _():
-    return base_prompt_manager.status(refresh=True)
+    await base_prompt_manager.refresh()
+    return base_prompt_manager.status()
 
 
 @router.post('/get', response_model=BasePrompt)
 async def _(model: BasePromptGet):
     try:
-        return base_prompt_manager.get(name=model.name, params=model.params)
+        return await base_prompt_manager.get(name=model.name, params=model.params)
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+
+
+@router.post('/get_all', response_model=list[RenderedBasePrompt] | list[BasePrompt])
+async def _(model: BasePromptGetAll, render: bool = False):
+    """获取全部 base prompt，render 为真时在服务端以 params 批量渲染，返回渲染结果与各自缺失的参数"""
+    try:
+        return await base_prompt_manager.get_all(params=model.params, render=render)
     except ValueError as e:
         raise HTTPException(403, *e.args)
 
 
-@router.post('/get_all', response_model=list[BasePrompt])
-async def _(model: BasePromptGetAll):
+@router.post('/render', response_model=RenderedBasePrompt)
+async def _(model: BasePromptRender):
     try:
-        return base_prompt_manager.get_all(params=model.params)
+        return await base_prompt_manager.render(name=model.name, params=model.params)
     except ValueError as e:
         raise HTTPException(403, *e.args)
 
@@ -41,7 +52,7 @@ async def _(model: BasePromptGetAll):
 @router.post('/add', response_model=BasePromptManagerStatus)
 async def _(model: BasePromptAdd):
     try:
-        base_prompt_manager.add(name=model.name, text=model.text)
+        await base_prompt_manager.add(name=model.name, text=model.text)
         return base_prompt_manager.status()
     except ValueError as e:
         raise HTTPException(403, *e.args)
@@ -1,31 +1,54 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Header, Query
+from fastapi.responses import StreamingResponse
+import json
+import re
 
 from app.common.models.corpus import *
-from app.core.corpus import corpus_dataset_manager
+from app.models.corpus import (
+    CorpusBulkAddResult,
+    CorpusPage,
+    CorpusSample,
+    CorpusSampleResult,
+    CorpusSplitExport,
+    CorpusSearchResult,
+    DatasetDetail,
+    DatasetScanResult,
+    ReshardProgress,
+)
+from app.core.corpus import corpus_dataset_manager, format_snapshot, parse_snapshot
+
+EXPORT_CHUNK_SIZE = 1 << 16
+"""逐行导出语料时单次输出的字节数"""
+
+SEARCH_MAX_LIMIT = 1000
+"""单次全文检索最多返回的语料条数"""
+
+READ_MAX_LIMIT = 1000
+"""单次分页读取最多返回的语料条数"""
 
 router = APIRouter()
 
 
-@router.get('/info', response_model=list[DatasetInfo])
+@router.get('/info', response_model=list[DatasetDetail])
 async def _():
     try:
-        return corpus_dataset_manager.get_all_info()
+        return await corpus_dataset_manager.get_all_info()
     except ValueError as e:
         raise HTTPException(403, *e.args)
 
 
-@router.get('/info/{dataset_name}', response_model=DatasetInfo)
+@router.get('/info/{dataset_name}', response_model=DatasetDetail)
 async def _(dataset_name: str):
     try:
-        return corpus_dataset_manager.get_info(dataset_name)
+        return await corpus_dataset_manager.get_info(dataset_name)
     except ValueError as e:
         raise HTTPException(403, *e.args)
 
 
-@router.post('/create', response_model=DatasetInfo)
+@router.post('/create', response_model=DatasetDetail)
 async def _(model: DatasetInfo):
     try:
-        return corpus_dataset_manager.create(model.name, model.description, model.bucket_num)
+        return await corpus_dataset_manager.create(model.name, model.description, model.bucket_num)
     except ValueError as e:
         raise HTTPException(403, *e.args)
 
@@ -33,8 +56,270 @@ async def _(model: DatasetInfo):
 @router.post('/add', response_model=DatasetInfo)
 async def _(model: CorpusAdd):
     try:
-        info = corpus_dataset_manager.get_info(model.dataset_name)
+        return await corpus_dataset_manager.add_corpus(model.dataset_name, model.corpus)
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+
+
+@router.post('/add_bulk/{dataset_name}', response_model=CorpusBulkAddResult)
+async def _(dataset_name: str, request: Request):
+    gzipped = 'gzip' in request.headers.get('content-encoding', '') \
+        or request.headers.get('content-type', '') in ('application/gzip', 'application/x-gzip')
+    try:
+        return await corpus_dataset_manager.add_corpus_stream(dataset_name, request.stream(), gzipped=gzipped)
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+
+
+@router.post('/dedup/rebuild/{dataset_name}', response_model=DatasetDetail)
+async def _(dataset_name: str):
+    try:
+        return await corpus_dataset_manager.rebuild_dedup_index(dataset_name)
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+
+
+@router.post('/stats/rebuild/{dataset_name}', response_model=DatasetDetail)
+async def _(dataset_name: str):
+    try:
+        return await corpus_dataset_manager.rebuild_stats(dataset_name)
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+
+
+@router.post('/search/rebuild/{dataset_name}', response_model=DatasetDetail)
+async def _(dataset_name: str):
+    try:
+        return await corpus_dataset_manager.rebuild_search_index(dataset_name)
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+
+
+@router.get('/search/{dataset_name}', response_model=CorpusSearchResult)
+async def _(
+    dataset_name: str,
+    q: str,
+    limit: int = Query(default=20, ge=1, le=SEARCH_MAX_LIMIT),
+    cursor: str | None = None,
+    bucket_start: int | None = None,
+    bucket_end: int | None = None,
+):
+    """
+    全文检索数据集语料
+
+    以空白分隔的各部分须全部命中，中文按连续子串匹配；结果按分桶 id 与逻辑偏移排序，翻页时传回上一页返回的 cursor
+    """
+    try:
+        return await corpus_dataset_manager.search(dataset_name, q, limit, cursor, bucket_start, bucket_end)
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+
+
+@router.post('/offset/rebuild/{dataset_name}', response_model=DatasetDetail)
+async def _(dataset_name: str):
+    try:
+        return await corpus_dataset_manager.rebuild_offset_index(dataset_name)
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+
+
+@router.get('/read/{dataset_name}', response_model=CorpusPage)
+async def _(
+    dataset_name: str,
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=READ_MAX_LIMIT),
+    bucket_start: int | None = None,
+    bucket_end: int | None = None,
+    snapshot: str | None = None,
+):
+    """
+    按序号分页读取数据集语料
+
+    语料按分桶 id 与写入顺序编号；翻页时传回首页返回的 snapshot，以保证各页基于同一批语料
+    """
+    try:
+        return await corpus_dataset_manager.read_page(
+            dataset_name,
+            offset,
+            limit,
+            bucket_start,
+            bucket_end,
+            None if snapshot is None else parse_snapshot(snapshot),
+        )
     except ValueError as e:
         raise HTTPException(403, *e.args)
-    await corpus_dataset_manager.add_corpus(model.dataset_name, model.corpus)
-    return info
+
+
+@router.post('/seal/{dataset_name}', response_model=DatasetDetail)
+async def _(dataset_name: str, bucket_id: int | None = None):
+    """封存数据集语料桶中的现有语料，未指定 bucket_id 时封存全部语料桶"""
+    try:
+        return await corpus_dataset_manager.seal(dataset_name, None if bucket_id is None else [bucket_id])
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+
+
+@router.post('/reshard/{dataset_name}', response_model=ReshardProgress)
+async def _(dataset_name: str, bucket_num: int):
+    try:
+        return await corpus_dataset_manager.reshard(dataset_name, bucket_num)
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+
+
+@router.get('/reshard/{dataset_name}', response_model=ReshardProgress)
+async def _(dataset_name: str):
+    try:
+        return corpus_dataset_manager.get_reshard_progress(dataset_name)
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+
+
+@router.post('/scan/{dataset_name}', response_model=DatasetScanResult)
+async def _(dataset_name: str, repair: bool = False):
+    """在后台校验数据集全部语料，repair 为真时改写存在问题的语料桶"""
+    try:
+        return await corpus_dataset_manager.scan(dataset_name, repair)
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+
+
+@router.get('/scan/{dataset_name}', response_model=DatasetScanResult)
+async def _(dataset_name: str):
+    try:
+        return corpus_dataset_manager.get_scan_result(dataset_name)
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+
+
+@router.get('/export/{dataset_name}')
+async def _(
+    dataset_name: str,
+    bucket_start: int | None = None,
+    bucket_end: int | None = None,
+    shuffle: bool = False,
+    seed: int | None = None,
+    skip: int = 0,
+    snapshot: str | None = None,
+    range: str | None = Header(default=None),
+):
+    """
+    以 NDJSON 流式导出数据集语料
+
+    响应头 X-Corpus-Snapshot 为本次导出的数据快照，续传时通过 snapshot 参数传回以保证内容一致；
+    顺序导出时支持 `Range: bytes=N-` 按字节续传，乱序导出时通过 skip 跳过已接收的语料条数
+    """
+    try:
+        bucket_ids = await corpus_dataset_manager.get_bucket_ids(dataset_name, bucket_start, bucket_end)
+        if snapshot is None:
+            dataset_snapshot = await corpus_dataset_manager.snapshot(dataset_name, bucket_ids)
+        else:
+            dataset_snapshot = {k: v for k, v in parse_snapshot(snapshot).items() if k in bucket_ids}
+            await corpus_dataset_manager.check_snapshot(dataset_name, dataset_snapshot)
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+    headers = {'X-Corpus-Snapshot': format_snapshot(dataset_snapshot)}
+
+    if shuffle or skip > 0:
+
+        async def iter_lines():
+            buffer = bytearray()
+            count = 0
+            async for line in corpus_dataset_manager.iter_corpus_lines(
+                dataset_name,
+                dataset_snapshot,
+                shuffle=shuffle,
+                seed=seed,
+            ):
+                count += 1
+                if count <= skip:
+                    continue
+                buffer += line + b'\n'
+                if len(buffer) >= EXPORT_CHUNK_SIZE:
+                    yield bytes(buffer)
+                    buffer.clear()
+            if buffer:
+                yield bytes(buffer)
+
+        return StreamingResponse(iter_lines(), media_type='application/x-ndjson', headers=headers)
+
+    total = sum(end - start for start, end in dataset_snapshot.values())
+    offset = 0
+    status_code = 200
+    if range is not None:
+        match = re.fullmatch(r'bytes=(\d+)-', range.strip())
+        if match is None or int(match[1]) >= total:
+            raise HTTPException(416, headers={'Content-Range': f'bytes */{total}'})
+        offset = int(match[1])
+        status_code = 206
+        headers['Content-Range'] = f'bytes {offset}-{total - 1}/{total}'
+    headers['Accept-Ranges'] = 'bytes'
+    headers['Content-Length'] = str(total - offset)
+    return StreamingResponse(
+        corpus_dataset_manager.iter_export_chunks(dataset_name, dataset_snapshot, offset),
+        status_code=status_code,
+        media_type='application/x-ndjson',
+        headers=headers,
+    )
+
+
+@router.post('/sample/{dataset_name}', response_model=CorpusSampleResult)
+async def _(dataset_name: str, model: CorpusSample):
+    """
+    对数据集语料确定性抽样
+
+    指定 split 时仅在该划分内抽样，指定 weight_field 时按该字段加权抽样；manifest 为真时仅返回 (分桶 id, 逻辑偏移) 清单
+    """
+    try:
+        return await corpus_dataset_manager.sample(
+            dataset_name,
+            model.num,
+            seed=model.seed,
+            splits=model.splits,
+            split=model.split,
+            weight_field=model.weight_field,
+            manifest=model.manifest,
+            bucket_start=model.bucket_start,
+            bucket_end=model.bucket_end,
+        )
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+
+
+@router.post('/split/{dataset_name}')
+async def _(dataset_name: str, model: CorpusSplitExport):
+    """
+    以 NDJSON 流式导出数据集中属于某一划分的语料
+
+    manifest 为真时每行为 {"bucket_id": 分桶 id, "offset": 逻辑偏移}；响应头 X-Corpus-Snapshot 为本次导出的数据快照
+    """
+    try:
+        bucket_ids = await corpus_dataset_manager.get_bucket_ids(dataset_name, model.bucket_start, model.bucket_end)
+        if model.snapshot is None:
+            dataset_snapshot = await corpus_dataset_manager.snapshot(dataset_name, bucket_ids)
+        else:
+            dataset_snapshot = {k: v for k, v in parse_snapshot(model.snapshot).items() if k in bucket_ids}
+            await corpus_dataset_manager.check_snapshot(dataset_name, dataset_snapshot)
+        lines = corpus_dataset_manager.iter_split_lines(
+            dataset_name, dataset_snapshot, model.splits, model.split, model.seed
+        )
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+
+    async def iter_chunks():
+        buffer = bytearray()
+        async for bucket_id, offset, line in lines:
+            if model.manifest:
+                line = json.dumps({'bucket_id': bucket_id, 'offset': offset}).encode('utf-8')
+            buffer += line + b'\n'
+            if len(buffer) >= EXPORT_CHUNK_SIZE:
+                yield bytes(buffer)
+                buffer.clear()
+        if buffer:
+            yield bytes(buffer)
+
+    return StreamingResponse(
+        iter_chunks(),
+        media_type='application/x-ndjson',
+        headers={'X-Corpus-Snapshot': format_snapshot(dataset_snapshot)},
+    )
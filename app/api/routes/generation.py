@@ -0,0 +1,99 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.db import Generation
+from app.models.generation import GenerationExport, GenerationExportProgress
+from app.core.generation import generation_corpus_exporter, query_generations, select_generations
+from app.core.query import check_limit, check_stream, get_keyset_after, iter_ndjson_rows
+from app.utils.db import get_async_session
+
+router = APIRouter()
+
+
+@router.get('/list')
+async def _(
+    scene_id: int | None = None,
+    interaction_id: int | None = None,
+    start_timestamp: int | None = None,
+    end_timestamp: int | None = None,
+    after_timestamp: int | None = None,
+    after_id: int | None = None,
+    limit: int | None = None,
+    desc: bool = False,
+):
+    """
+    以 NDJSON 流式导出生成内容，scene_id 与 interaction_id 至少指定其一
+
+    按 (timestamp, id) 排序，续传时以已接收的最后一条记录的 timestamp 与 id 作为 after_timestamp 与 after_id
+    """
+    try:
+        statement = select_generations(
+            scene_id=scene_id,
+            interaction_id=interaction_id,
+            start_timestamp=start_timestamp,
+            end_timestamp=end_timestamp,
+            after=get_keyset_after(after_timestamp, after_id),
+            desc=desc,
+        )
+        check_limit(limit, stream=True)
+        check_stream()
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+    return StreamingResponse(iter_ndjson_rows(statement, limit), media_type='application/x-ndjson')
+
+
+@router.get('/scene/{scene_id}', response_model=list[Generation])
+async def _(
+    scene_id: int,
+    start_timestamp: int | None = None,
+    end_timestamp: int | None = None,
+    after_timestamp: int | None = None,
+    after_id: int | None = None,
+    limit: int = 100,
+    desc: bool = False,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """查询场景时间范围 [start_timestamp, end_timestamp) 内的生成内容，按 (timestamp, id) 键集分页"""
+    try:
+        return await query_generations(
+            session,
+            limit=limit,
+            scene_id=scene_id,
+            start_timestamp=start_timestamp,
+            end_timestamp=end_timestamp,
+            after=get_keyset_after(after_timestamp, after_id),
+            desc=desc,
+        )
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+
+
+@router.get('/interaction/{interaction_id}', response_model=list[Generation])
+async def _(
+    interaction_id: int,
+    limit: int = 100,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """查询交互行为对应的生成内容"""
+    try:
+        return await query_generations(session, limit=limit, interaction_id=interaction_id)
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+
+
+@router.post('/export', response_model=GenerationExportProgress)
+async def _(model: GenerationExport):
+    """在后台将生成内容增量导出至语料数据集，返回进度"""
+    try:
+        return await generation_corpus_exporter.export(model)
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+
+
+@router.get('/export/{dataset_name}', response_model=GenerationExportProgress)
+async def _(dataset_name: str):
+    try:
+        return generation_corpus_exporter.get_progress(dataset_name)
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
@@ -0,0 +1,168 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.db import Interaction, Scene_User_Rollup
+from app.models.interaction import InteractionIngest, InteractionIngestResult, SceneMinuteActivity, SceneTypeSummary
+from app.core.interaction import (
+    IngestBufferFullError,
+    interaction_ingest_buffer,
+    resolve_ingest_users,
+    query_interactions,
+    select_interactions,
+    get_scene_activity,
+    get_scene_summary,
+    get_scene_top_users,
+)
+from app.core.query import check_limit, check_stream, get_keyset_after, iter_ndjson_rows
+from app.utils.db import get_async_session
+
+router = APIRouter()
+
+
+@router.post('/ingest', response_model=InteractionIngestResult)
+async def _(interactions: list[InteractionIngest], wait: bool = False):
+    """
+    批量写入交互行为
+
+    user_id 为空时按 user 中的媒体平台账号解析(不存在时创建)用户，同一请求中的账号合并为一次批量解析；
+    交互行为进入缓冲区后即返回，由后台合并批次写入数据库；wait 为真时等待写入完成后返回
+    """
+    try:
+        await interaction_ingest_buffer.put(await resolve_ingest_users(interactions), wait=wait)
+    except IngestBufferFullError as e:
+        raise HTTPException(503, *e.args, headers={'Retry-After': '1'})
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+    return InteractionIngestResult(accepted=len(interactions), pending=interaction_ingest_buffer.pending)
+
+
+@router.get('/list')
+async def _(
+    scene_id: int | None = None,
+    user_id: int | None = None,
+    start_timestamp: int | None = None,
+    end_timestamp: int | None = None,
+    type: str | None = None,
+    field: list[str] | None = Query(None),
+    after_timestamp: int | None = None,
+    after_id: int | None = None,
+    limit: int | None = None,
+    desc: bool = False,
+):
+    """
+    以 NDJSON 流式导出交互行为，scene_id 与 user_id 至少指定其一
+
+    field 形如 key=value 或 key，按 fields 字段筛选；按 (timestamp, id) 排序，
+    续传时以已接收的最后一条记录的 timestamp 与 id 作为 after_timestamp 与 after_id
+    """
+    try:
+        statement = select_interactions(
+            scene_id=scene_id,
+            user_id=user_id,
+            start_timestamp=start_timestamp,
+            end_timestamp=end_timestamp,
+            type=type,
+            fields=field,
+            after=get_keyset_after(after_timestamp, after_id),
+            desc=desc,
+        )
+        check_limit(limit, stream=True)
+        check_stream()
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+    return StreamingResponse(iter_ndjson_rows(statement, limit), media_type='application/x-ndjson')
+
+
+@router.get('/scene/{scene_id}', response_model=list[Interaction])
+async def _(
+    scene_id: int,
+    start_timestamp: int | None = None,
+    end_timestamp: int | None = None,
+    type: str | None = None,
+    field: list[str] | None = Query(None),
+    after_timestamp: int | None = None,
+    after_id: int | None = None,
+    limit: int = 100,
+    desc: bool = False,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """查询场景时间范围 [start_timestamp, end_timestamp) 内的交互行为，按 (timestamp, id) 键集分页"""
+    try:
+        return await query_interactions(
+            session,
+            limit=limit,
+            scene_id=scene_id,
+            start_timestamp=start_timestamp,
+            end_timestamp=end_timestamp,
+            type=type,
+            fields=field,
+            after=get_keyset_after(after_timestamp, after_id),
+            desc=desc,
+        )
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+
+
+@router.get('/user/{user_id}', response_model=list[Interaction])
+async def _(
+    user_id: int,
+    scene_id: int | None = None,
+    start_timestamp: int | None = None,
+    end_timestamp: int | None = None,
+    type: str | None = None,
+    field: list[str] | None = Query(None),
+    after_timestamp: int | None = None,
+    after_id: int | None = None,
+    limit: int = 100,
+    desc: bool = False,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """查询用户时间范围 [start_timestamp, end_timestamp) 内的交互行为，可按场景筛选，按 (timestamp, id) 键集分页"""
+    try:
+        return await query_interactions(
+            session,
+            limit=limit,
+            scene_id=scene_id,
+            user_id=user_id,
+            start_timestamp=start_timestamp,
+            end_timestamp=end_timestamp,
+            type=type,
+            fields=field,
+            after=get_keyset_after(after_timestamp, after_id),
+            desc=desc,
+        )
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+
+
+@router.get('/rollup/{scene_id}/activity', response_model=list[SceneMinuteActivity])
+async def _(
+    scene_id: int,
+    start_timestamp: int | None = None,
+    end_timestamp: int | None = None,
+    type: str | None = None,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """查询场景每分钟交互行为汇总，仅读取汇总表"""
+    return await get_scene_activity(session, scene_id, start_timestamp, end_timestamp, type)
+
+
+@router.get('/rollup/{scene_id}/summary', response_model=list[SceneTypeSummary])
+async def _(scene_id: int, session: AsyncSession = Depends(get_async_session)):
+    """查询场景各交互行为类型汇总，仅读取汇总表"""
+    return await get_scene_summary(session, scene_id)
+
+
+@router.get('/rollup/{scene_id}/top_users', response_model=list[Scene_User_Rollup])
+async def _(
+    scene_id: int,
+    order_by: str = 'amount',
+    limit: int = 100,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """查询场景用户排行，order_by 为 amount 或 interaction_num，仅读取汇总表"""
+    try:
+        return await get_scene_top_users(session, scene_id, order_by, limit)
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response
+
+from app.utils.metrics import render_metrics
+
+router = APIRouter()
+
+
+@router.get('/metrics')
+async def _():
+    """以 Prometheus 文本格式输出服务运行指标"""
+    try:
+        content, media_type = render_metrics()
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+    return Response(content, media_type=media_type)
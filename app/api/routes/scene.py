@@ -0,0 +1,40 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.core.scene import select_scenes
+from app.core.query import check_limit, check_stream, get_keyset_after, iter_ndjson_rows
+
+router = APIRouter()
+
+
+@router.get('/list')
+async def _(
+    scene_type: str | None = None,
+    start_timestamp: int | None = None,
+    end_timestamp: int | None = None,
+    field: list[str] | None = Query(None),
+    after_timestamp: int | None = None,
+    after_id: int | None = None,
+    limit: int | None = None,
+    desc: bool = False,
+):
+    """
+    以 NDJSON 流式导出场景实例，时间范围作用于场景开始时间
+
+    field 形如 key=value 或 key，按 fields 字段筛选；按 (start_timestamp, id) 排序，
+    续传时以已接收的最后一条记录的 start_timestamp 与 id 作为 after_timestamp 与 after_id
+    """
+    try:
+        statement = select_scenes(
+            scene_type=scene_type,
+            start_timestamp=start_timestamp,
+            end_timestamp=end_timestamp,
+            fields=field,
+            after=get_keyset_after(after_timestamp, after_id),
+            desc=desc,
+        )
+        check_limit(limit, stream=True)
+        check_stream()
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+    return StreamingResponse(iter_ndjson_rows(statement, limit), media_type='application/x-ndjson')
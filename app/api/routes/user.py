@@ -0,0 +1,61 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.models.user import ResolvedUser, UserBind, UserResolve
+from app.core.user import select_users, user_resolver
+from app.core.query import check_limit, check_stream, get_keyset_after, iter_ndjson_rows
+
+router = APIRouter()
+
+
+@router.get('/list')
+async def _(
+    platform: str | None = None,
+    main_id: int | None = None,
+    start_timestamp: int | None = None,
+    end_timestamp: int | None = None,
+    field: list[str] | None = Query(None),
+    after_timestamp: int | None = None,
+    after_id: int | None = None,
+    limit: int | None = None,
+    desc: bool = False,
+):
+    """
+    以 NDJSON 流式导出用户账号，时间范围作用于注册时间
+
+    field 形如 key=value 或 key，按 platform_fields 字段筛选；按 (register_timestamp, id) 排序，
+    续传时以已接收的最后一条记录的 register_timestamp 与 id 作为 after_timestamp 与 after_id
+    """
+    try:
+        statement = select_users(
+            platform=platform,
+            main_id=main_id,
+            start_timestamp=start_timestamp,
+            end_timestamp=end_timestamp,
+            platform_fields=field,
+            after=get_keyset_after(after_timestamp, after_id),
+            desc=desc,
+        )
+        check_limit(limit, stream=True)
+        check_stream()
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+    return StreamingResponse(iter_ndjson_rows(statement, limit), media_type='application/x-ndjson')
+
+
+@router.post('/resolve', response_model=list[ResolvedUser])
+async def _(users: list[UserResolve]):
+    """批量将媒体平台账号解析为系统标识，不存在的账号将被创建，结果与请求一一对应"""
+    try:
+        return await user_resolver.resolve(users)
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
+
+
+@router.post('/bind', response_model=list[ResolvedUser])
+async def _(model: UserBind):
+    """将账号绑定至主账号，返回绑定后的账号"""
+    try:
+        return await user_resolver.bind(model.main_id, model.user_ids)
+    except ValueError as e:
+        raise HTTPException(403, *e.args)
@@ -1,13 +1,45 @@
 from pydantic import DirectoryPath
-import re
+from typing import Iterable, Mapping, NamedTuple
+from types import MappingProxyType
+from threading import Lock
+from asyncio import Task
+from pathlib import Path
+import asyncio
+import time
+import os
+
+try:
+    from watchfiles import awatch
+except ImportError:
+    awatch = None
 
 from app.common.models.base_prompt import (
     BasePrompt,
     BasePromptInfo,
     BasePromptManagerStatus,
 )
+from app.models.base_prompt import RenderedBasePrompt
 from app.utils.config import settings
 from app.utils.log import logger
+from app.utils.metrics import base_prompt_files, base_prompt_refresh_duration, base_prompt_reloaded_files
+
+from .template import PromptTemplate
+
+BASE_PROMPT_FILE_SUFFIX = '.txt'
+"""base prompt 文件后缀"""
+
+
+class BasePromptSnapshot(NamedTuple):
+    """base prompt 不可变快照，整体替换以保证读取方不会看到更新到一半的内容"""
+
+    templates: Mapping[str, PromptTemplate]
+    """base prompt 名称与编译后模板映射表"""
+
+    signatures: Mapping[str, tuple[int, int]]
+    """base prompt 名称与文件 (mtime_ns, 大小) 映射表，用于判断文件是否变更"""
+
+
+EMPTY_SNAPSHOT = BasePromptSnapshot(MappingProxyType(dict()), MappingProxyType(dict()))
 
 
 class BasePromptManager:
@@ -16,76 +48,207 @@ class BasePromptManager:
     base_prompt_data_dir: DirectoryPath | None
     """base prompt 数据目录"""
 
-    base_prompt_map: dict[str, str]
-    """base prompt 名称内容映射表"""
+    snapshot: BasePromptSnapshot
+    """当前 base prompt 快照"""
 
     def __init__(self):
-        self.base_prompt_map = dict()
-        self.refresh(refresh_data_dir=True)
+        self.base_prompt_data_dir = settings.base_prompt_data_dir
+        self.snapshot = EMPTY_SNAPSHOT
+        self._loaded = False
+        self._lock = Lock()
+        self._watch_task: Task | None = None
+
+    async def refresh(self, refresh_data_dir: bool = False):
+        """增量重新载入 base prompt 目录，文件读取在线程池中进行"""
+        await asyncio.to_thread(self._refresh, refresh_data_dir)
+
+    async def _ensure_loaded(self, refresh: bool = False):
+        """首次读取或要求刷新时载入 base prompt 目录，应用启动时通常已完成首次载入"""
+        if refresh or not self._loaded:
+            await self.refresh()
 
-    def refresh(self, refresh_data_dir: bool = False):
+    def _refresh(self, refresh_data_dir: bool = False):
+        """
+        增量重新载入 base prompt 目录
+
+        仅重新读取 mtime 或大小发生变化的文件，载入完成后整体替换快照；耗时与文件数计入运行指标
+        """
+        start = time.perf_counter()
         if refresh_data_dir:
             self.base_prompt_data_dir = settings.base_prompt_data_dir
-        self.base_prompt_map.clear()
 
         if self.base_prompt_data_dir is None:
+            self.snapshot = EMPTY_SNAPSHOT
             logger.warning('base prompt 目录配置项为空。')
             return
 
-        for file_name in self.base_prompt_data_dir.iterdir():
-            if not file_name.name.endswith('.txt'):
+        with self._lock:
+            names = [
+                entry.name.removesuffix(BASE_PROMPT_FILE_SUFFIX)
+                for entry in os.scandir(self.base_prompt_data_dir)
+                if entry.name.endswith(BASE_PROMPT_FILE_SUFFIX) and entry.is_file()
+            ]
+            changed = self._reload(names, prune=True)
+            self._loaded = True
+        base_prompt_refresh_duration.observe(time.perf_counter() - start)
+
+        if changed:
+            logger.success(f"base prompt 更新成功，共 {changed} 个变更。")
+            if len(self.snapshot.templates) > 0:
+                logger.debug(
+                    "当前 base prompt 内容概述如下：" + '[' + (', '.join(map(str, self.status().base_prompt_info))) + '].'
+                )
+
+    def _reload(self, names: Iterable[str], prune: bool = False) -> int:
+        """
+        重新载入指定名称的 base prompt 文件并替换快照，返回变更数
+
+        文件不存在的名称将被移除；prune 为真时 names 视为全部名称，其余名称一并移除。调用方需持有 _lock
+        """
+        snapshot = self.snapshot
+        templates = dict(snapshot.templates)
+        signatures = dict(snapshot.signatures)
+        changed = 0
+        names = set(names)
+        if prune:
+            for name in set(templates) - names:
+                templates.pop(name)
+                signatures.pop(name, None)
+                changed += 1
+        for name in names:
+            file_path = self.base_prompt_data_dir / (name + BASE_PROMPT_FILE_SUFFIX)
+            try:
+                stat = file_path.stat()
+                signature = (stat.st_mtime_ns, stat.st_size)
+                if signatures.get(name) == signature:
+                    continue
+                template = PromptTemplate(file_path.read_text(encoding='utf-8-sig').strip())
+            except FileNotFoundError:
+                if templates.pop(name, None) is not None:
+                    signatures.pop(name, None)
+                    changed += 1
                 continue
-            self.base_prompt_map[file_name.name.removesuffix('.txt')] = \
-                file_name.read_text(encoding='utf-8-sig').strip()
+            templates[name] = template
+            signatures[name] = signature
+            changed += 1
+        if changed:
+            self.snapshot = BasePromptSnapshot(MappingProxyType(templates), MappingProxyType(signatures))
+            base_prompt_reloaded_files.inc(changed)
+        base_prompt_files.set(len(self.snapshot.templates))
+        return changed
+
+    def start_watch(self):
+        """开始监听 base prompt 目录，文件变更时自动增量载入，需在事件循环中调用"""
+        if self.base_prompt_data_dir is None or not settings.base_prompt_watch:
+            return
+        if awatch is None:
+            logger.warning("未安装 watchfiles，base prompt 目录变更需手动刷新。")
+            return
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch(self.base_prompt_data_dir))
+
+    async def stop_watch(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+    async def _watch(self, base_prompt_data_dir: Path):
 
-        logger.success("base prompt 更新成功。")
+        def watch_filter(_, path: str) -> bool:
+            return path.endswith(BASE_PROMPT_FILE_SUFFIX)
 
-        status = self.status()
-        if status.is_available:
-            if len(status.base_prompt_info) > 0:
-                logger.debug("当前 base prompt 内容概述如下：" + '[' + (', '.join(map(str, status.base_prompt_info))) + '].')
-        else:
-            logger.debug('当前 base prompt 不可用。')
+        def reload(names: set[str]) -> int:
+            with self._lock:
+                return self._reload(names)
 
-    def status(self, refresh: bool = False) -> BasePromptManagerStatus:
-        if refresh:
-            self.refresh()
+        try:
+            logger.debug(f"开始监听 base prompt 目录 {base_prompt_data_dir} 变更。")
+            async for changes in awatch(base_prompt_data_dir, watch_filter=watch_filter, debounce=200, step=20):
+                names = {Path(path).name.removesuffix(BASE_PROMPT_FILE_SUFFIX) for _, path in changes}
+                changed = await asyncio.to_thread(reload, names)
+                if changed:
+                    logger.success(f"base prompt 目录变更，已更新 {changed} 个 base prompt。")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"base prompt 目录监听失败，目录变更需手动刷新：{e!r}")
+
+    def status(self) -> BasePromptManagerStatus:
         return BasePromptManagerStatus(
             is_available=self.base_prompt_data_dir is not None,
             base_prompt_info=[
                 BasePromptInfo(
                     name=name,
-                    length=len(text),
-                    param_num=len(re.findall(r"{{{[A-Za-z]+?}}}", text)),
-                ) for name, text in self.base_prompt_map.items()
+                    length=len(template.text),
+                    param_num=template.param_num,
+                ) for name, template in self.snapshot.templates.items()
             ]
         )
 
-    def get(self, name: str, params: dict[str, str] = dict(), refresh: bool = False) -> BasePrompt:
+    async def get(self, name: str, params: dict[str, str] = dict(), refresh: bool = False) -> BasePrompt:
         if self.base_prompt_data_dir is None:
             raise ValueError('base prompt 目录配置项为空。')
-        if refresh:
-            self.refresh()
-        base_prompt = self.base_prompt_map.get(name)
-        if base_prompt is None:
+        await self._ensure_loaded(refresh)
+        template = self.snapshot.templates.get(name)
+        if template is None:
             return BasePrompt(name=name, text='', params=params)
-        return BasePrompt(name=name, text=base_prompt, params=params)
+        return BasePrompt(name=name, text=template.text, params=params)
+
+    async def add(self, name: str, text: str):
+        """写入新的 base prompt 文件并仅载入该文件，文件读写在线程池中进行"""
+        await asyncio.to_thread(self._add, name, text)
 
-    def add(self, name: str, text: str):
+    def _add(self, name: str, text: str):
         if self.base_prompt_data_dir is None:
             raise ValueError('base prompt 目录配置项为空。')
-        file_path = self.base_prompt_data_dir / f'{name}.txt'
+        file_path = self.base_prompt_data_dir / (name + BASE_PROMPT_FILE_SUFFIX)
         if file_path.exists():
             raise ValueError('该名称的 base prompt 已存在。')
         file_path.write_text(text, encoding='utf-8-sig')
-        self.refresh()
+        with self._lock:
+            self._reload([name])
+        logger.success(f"base prompt {name} 添加成功。")
 
-    def get_all(self, params: dict[str, str], refresh: bool = False) -> list[BasePrompt]:
+    async def get_all(
+        self,
+        params: dict[str, str],
+        refresh: bool = False,
+        render: bool = False,
+    ) -> list[BasePrompt] | list[RenderedBasePrompt]:
+        """获取全部 base prompt，render 为真时以 params 一次性渲染全部 base prompt，并列出各自缺失的参数"""
         if self.base_prompt_data_dir is None:
             raise ValueError('base prompt 目录配置项为空。')
-        if refresh:
-            self.refresh()
-        return [self.get(name, params) for name in self.base_prompt_map.keys()]
+        await self._ensure_loaded(refresh)
+        if render:
+            return [_render(name, template, params) for name, template in self.snapshot.templates.items()]
+        return [
+            BasePrompt(name=name, text=template.text, params=params)
+            for name, template in self.snapshot.templates.items()
+        ]
+
+    async def render(self, name: str, params: dict[str, str] = dict(), refresh: bool = False) -> RenderedBasePrompt:
+        """以 params 填充 base prompt 中的参数占位符，缺失的参数保留原占位符并在结果中列出"""
+        if self.base_prompt_data_dir is None:
+            raise ValueError('base prompt 目录配置项为空。')
+        await self._ensure_loaded(refresh)
+        template = self.snapshot.templates.get(name)
+        if template is None:
+            raise ValueError(f'不存在名称为 {name} 的 base prompt。')
+        return _render(name, template, params)
+
+
+def _render(name: str, template: PromptTemplate, params: dict[str, str]) -> RenderedBasePrompt:
+    text, missing_params = template.render(params)
+    return RenderedBasePrompt(
+        name=name,
+        text=text,
+        param_names=list(template.param_names),
+        missing_params=missing_params,
+    )
 
 
 base_prompt_manager = BasePromptManager()
@@ -0,0 +1,52 @@
+"""base prompt 模板编译与渲染"""
+
+import re
+
+PARAM_PATTERN = re.compile(r"{{{([A-Za-z]+?)}}}")
+"""base prompt 参数占位符格式，形如 {{{name}}}"""
+
+
+class PromptTemplate:
+    """
+    编译后的 base prompt 模板
+
+    载入时将文本一次性解析为字面量与参数名交替排列的片段列表，渲染时单次拼接，无需重复匹配正则
+    """
+
+    text: str
+    """模板原文"""
+
+    segments: tuple[str, ...]
+    """片段列表，偶数位为字面量，奇数位为参数名"""
+
+    param_names: tuple[str, ...]
+    """参数名列表(去重，按首次出现顺序)"""
+
+    param_num: int
+    """参数占位符个数(含重复)"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.segments = tuple(PARAM_PATTERN.split(text))
+        self.param_names = tuple(dict.fromkeys(self.segments[1::2]))
+        self.param_num = len(self.segments) // 2
+
+    def render(self, params: dict[str, str]) -> tuple[str, list[str]]:
+        """
+        以 params 填充参数占位符，返回渲染结果与缺失的参数名列表
+
+        缺失的参数保留原占位符
+        """
+        missing = [name for name in self.param_names if name not in params]
+        if not self.param_num:
+            return self.text, missing
+        parts = list(self.segments)
+        for i in range(1, len(parts), 2):
+            name = parts[i]
+            parts[i] = params[name] if name in params else '{{{' + name + '}}}'
+        return ''.join(parts), missing
+
+
+__all__ = [
+    "PromptTemplate",
+]
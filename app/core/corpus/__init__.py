@@ -1,22 +1,58 @@
-from collections import defaultdict
-from pydantic import DirectoryPath
-from asyncio import Lock
-import aiofiles
-import hashlib
+from pydantic import DirectoryPath, ValidationError
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterable, AsyncIterator
+from asyncio import Future, Task
+from datetime import datetime
+from pathlib import Path
+import asyncio
+import shutil
+import os
+import random
 import json
 
 from app.utils.config import settings
 from app.utils.log import logger
+from app.utils.metrics import register_queue_depth
 from app.common.models.corpus import *
+from app.models.corpus import (
+    BucketScanResult,
+    CorpusBulkAddError,
+    CorpusBulkAddResult,
+    CorpusPage,
+    CorpusSampleItem,
+    CorpusSampleResult,
+    CorpusSearchHit,
+    CorpusSearchResult,
+    DatasetDetail,
+    DatasetScanResult,
+    ReshardProgress,
+)
 
-DATASET_INFO_FILENAME = 'INFO.json'
-"""语料数据集信息文件"""
+from .cache import DatasetInfoCache
+from .const import DATASET_INFO_FILENAME, get_bucket_file_name, get_line_bucket_id
+from .dedup import CorpusDedupIndex, DuplicateCorpusError, get_digest
+from .ndjson import iter_ndjson_lines
+from .offset import CorpusOffsetIndex
+from .reader import get_bucket_layout, get_bucket_size, iter_bucket_chunks, iter_bucket_lines, iter_bucket_lines_sync
+from .reshard import RESHARD_DIRNAME, split_bucket_range, merge_parts, commit_reshard, recover_reshard
+from .scan import (
+    SCAN_DIRNAME,
+    SCAN_MAX_ISSUES,
+    MISPLACED_SUFFIX,
+    split_scan_ranges,
+    scan_bucket_range,
+    merge_scan_parts,
+    recover_scan,
+)
+from .sample import SAMPLE_MAX_NUM, get_split_bounds, get_split_name, sample_bucket_range, merge_samples
+from .search import CorpusSearchIndex, build_match_query, format_search_cursor, parse_search_cursor
+from .seal import compress_blocks, commit_seal, commit_rewrite, recover_dataset_seal
+from .stats import CorpusStatsIndex
+from .lock import bucket_lock, bucket_locks
+from .writer import BucketCommitHook, BucketWriterPool
 
-BUCKET_FILE_PREFIX = 'bucket_'
-"""语料桶文件前缀"""
-
-bucket_file_lock = defaultdict(Lock)
-"""语料桶文件锁"""
+BULK_ADD_MAX_ERRORS = 100
+"""批量添加语料时最多返回的拒绝原因条数"""
 
 
 class CorpusDatasetManager:
@@ -25,13 +61,85 @@ class CorpusDatasetManager:
     corpus_data_dir: DirectoryPath | None
     """语料库数据目录"""
 
+    writer_pool: BucketWriterPool
+    """语料桶文件写入器池"""
+
+    dedup_index: CorpusDedupIndex | None
+    """语料去重索引，未启用去重时为 None"""
+
+    search_index: CorpusSearchIndex | None
+    """语料全文检索索引，未启用检索时为 None"""
+
+    offset_index: CorpusOffsetIndex
+    """语料桶行偏移索引，未随写入维护时在分页读取前补齐"""
+
+    stats_index: CorpusStatsIndex
+    """语料数据集统计信息索引"""
+
+    info_cache: DatasetInfoCache
+    """语料数据集信息缓存"""
+
+    reshard_progress: dict[str, ReshardProgress]
+    """数据集名称与重新分桶进度映射表"""
+
+    scan_results: dict[str, DatasetScanResult]
+    """数据集名称与校验进度及结果映射表"""
+
     def __init__(self):
         self.corpus_data_dir = settings.corpus_data_dir
+        self.info_cache = DatasetInfoCache()
+        self.reshard_progress = dict()
+        self._reshard_tasks: dict[str, Task] = dict()
+        self._sealing: set[str] = set()
+        self.scan_results = dict()
+        self._scan_tasks: dict[str, Task] = dict()
+        self.dedup_index = CorpusDedupIndex(settings.corpus_dedup_max_digests) if settings.corpus_dedup else None
+        self.stats_index = CorpusStatsIndex(settings.corpus_stats_flush_interval)
+        self.search_index = CorpusSearchIndex() if settings.corpus_search_index else None
+        self.offset_index = CorpusOffsetIndex()
+        hooks = [self.dedup_index, self.stats_index, self.search_index]
+        if settings.corpus_offset_index:
+            hooks.append(self.offset_index)
+        self.writer_pool = BucketWriterPool(hooks=[hook for hook in hooks if hook is not None], reroute=self._reroute)
+        register_queue_depth('corpus_writer', self.writer_pool.get_queue_depths)
+
+    async def get_info(self, dataset_name: str) -> DatasetDetail:
+        """获取数据集信息及其统计信息，统计信息由内存增量维护，不扫描语料桶文件"""
+        return await asyncio.to_thread(self._get_info, dataset_name)
 
-    def get_info(self, dataset_name: str) -> DatasetInfo:
+    def _get_info(self, dataset_name: str) -> DatasetDetail:
+        dataset_info = self._load_info(dataset_name)
+        bucket_stats = self.stats_index.get(self.corpus_data_dir / dataset_name, dataset_info.bucket_num)
+        return DatasetDetail(
+            **dataset_info.model_dump(),
+            corpus_num=sum(item.corpus_num for item in bucket_stats),
+            size=sum(item.size for item in bucket_stats),
+            last_write_timestamp=max(
+                (item.last_write_timestamp for item in bucket_stats if item.last_write_timestamp is not None),
+                default=None,
+            ),
+            buckets=bucket_stats,
+        )
+
+    def _load_info(self, dataset_name: str) -> DatasetInfo:
         if self.corpus_data_dir is None:
             raise ValueError("语料库目录配置项为空。")
         dataset_dir = self.corpus_data_dir / dataset_name
+        return self.info_cache.get(dataset_dir, lambda: self._read_info(dataset_dir))
+
+    async def load_info(self, dataset_name: str) -> DatasetInfo:
+        """
+        获取数据集信息，供写入等热路径在事件循环中调用
+
+        目录监听生效且已缓存时直接返回缓存，否则在线程池中校验 mtime 或读取 INFO.json，不阻塞事件循环
+        """
+        if self.info_cache.watching:
+            dataset_info = self.info_cache.peek(dataset_name)
+            if dataset_info is not None:
+                return dataset_info
+        return await asyncio.to_thread(self._load_info, dataset_name)
+
+    def _read_info(self, dataset_dir: Path) -> DatasetInfo:
         if not dataset_dir.is_dir():
             raise ValueError(f"语料库目录 {dataset_dir} 不存在。")
         dataset_info_path = dataset_dir / DATASET_INFO_FILENAME
@@ -39,26 +147,30 @@ class CorpusDatasetManager:
             raise ValueError(f"语料库目录 {dataset_dir} 中没有 {DATASET_INFO_FILENAME} 文件。")
         return DatasetInfo.model_validate(json.loads(dataset_info_path.read_text(encoding='utf-8-sig')))
 
-    def get_all_info(self) -> list[DatasetInfo]:
+    async def get_all_info(self) -> list[DatasetDetail]:
+        return await asyncio.to_thread(self._get_all_info)
+
+    def _get_all_info(self) -> list[DatasetDetail]:
         if self.corpus_data_dir is None:
             raise ValueError("语料库目录配置项为空。")
         res = []
-        for dir in self.corpus_data_dir.iterdir():
-            if not dir.is_dir():
-                continue
+        for dataset_name in self.info_cache.list_dataset_names(self.corpus_data_dir):
             try:
-                res.append(self.get_info(dir.name))
+                res.append(self._get_info(dataset_name))
             except ValueError:
-                logger.warning(f"获取语料库 {dir.name} 信息时发生错误。")
+                logger.warning(f"获取语料库 {dataset_name} 信息时发生错误。")
         return res
 
-    def create(
+    async def create(
         self,
         dataset_name: str,
         description: str = "",
         bucket_num: int = 8,
         exist_ok: bool = False,
-    ):
+    ) -> DatasetDetail | None:
+        return await asyncio.to_thread(self._create, dataset_name, description, bucket_num, exist_ok)
+
+    def _create(self, dataset_name: str, description: str, bucket_num: int, exist_ok: bool) -> DatasetDetail | None:
         if self.corpus_data_dir is None:
             raise ValueError("语料库目录配置项为空。")
         dataset_dir = self.corpus_data_dir / dataset_name
@@ -78,23 +190,908 @@ class CorpusDatasetManager:
             ).model_dump_json(),
             encoding='utf-8-sig',
         )
+        self.info_cache.invalidate(dataset_name)
         logger.success(f"语料库 {dataset_name} 创建成功，分桶数为 {bucket_num}。")
-        return self.get_info(dataset_name)
+        return self._get_info(dataset_name)
 
-    async def add_corpus(self, dataset_name: str, corpus: Corpus):
+    def get_bucket_file_path(self, dataset_name: str, bucket_id: int) -> Path:
         if self.corpus_data_dir is None:
             raise ValueError("语料库目录配置项为空。")
-        dataset_dir = self.corpus_data_dir / dataset_name
-        if not dataset_dir.is_dir():
-            raise ValueError(f"语料库目录 {dataset_dir} 不存在。")
-        corpus_json_str = corpus.model_dump_json()
-        dataset_info = self.get_info(dataset_name)
-        bucket_id = int(hashlib.sha256(corpus_json_str.encode('utf-8')).hexdigest(), 16) % dataset_info.bucket_num + 1
-        bucket_file_path = dataset_dir / (BUCKET_FILE_PREFIX + str(bucket_id) + '.jsonl')
-        async with bucket_file_lock[bucket_file_path]:
-            async with aiofiles.open(bucket_file_path, 'a', encoding='utf-8-sig') as f:
-                await f.write(corpus_json_str + '\n')
+        return self.corpus_data_dir / dataset_name / get_bucket_file_name(bucket_id)
+
+    def _submit_line(self, dataset_name: str, line: bytes, bucket_num: int) -> tuple[int, Future]:
+        """
+        将语料行(不含换行符)按 sha256 分桶后提交至对应语料桶写入器，返回分桶 id 与写入完成 Future
+
+        分桶数由调用方经 load_info 获取后传入，本方法不做磁盘 IO；分桶数过期时由写入器在文件锁内校验并重新提交
+        """
+        bucket_id = get_line_bucket_id(line, bucket_num)
+        bucket_file_path = self.get_bucket_file_path(dataset_name, bucket_id)
+        if self.dedup_index is not None and self.dedup_index.contains(bucket_file_path, get_digest(line)):
+            future = asyncio.get_running_loop().create_future()
+            future.set_exception(DuplicateCorpusError("该语料在数据集中已存在。"))
+            return bucket_id, future
+        return bucket_id, self.writer_pool.submit(bucket_file_path, line + b'\n', bucket_num)
+
+    async def _resubmit(self, dataset_name: str, pending: list[tuple[bytes, Future]]):
+        """按最新分桶数重新提交一批 (语料行, 等待者)，语料行需自带换行符，写入结果转交给原等待者"""
+        try:
+            bucket_num = (await self.load_info(dataset_name)).bucket_num
+        except Exception as e:
+            for _, waiter in pending:
+                if not waiter.done():
+                    waiter.set_exception(e)
+            return
+        for line, waiter in pending:
+            _, future = self._submit_line(dataset_name, line.removesuffix(b'\n'), bucket_num)
+            future.add_done_callback(lambda future, waiter=waiter: _chain_future(future, waiter))
+
+    async def _reroute(self, bucket_file_path: Path, pending: list[tuple[bytes, Future]]):
+        """其他进程重新分桶后，失效数据集信息缓存并按新分桶数重新提交被写入器拒绝的语料行"""
+        dataset_name = bucket_file_path.parent.name
+        self.info_cache.invalidate(dataset_name)
+        await self._resubmit(dataset_name, pending)
+
+    def _submit_corpus(self, dataset_name: str, corpus: Corpus, bucket_num: int) -> tuple[int, Future]:
+        return self._submit_line(dataset_name, corpus.model_dump_json().encode('utf-8'), bucket_num)
+
+    async def add_corpus(self, dataset_name: str, corpus: Corpus) -> DatasetInfo:
+        """添加单条语料，返回数据集信息"""
+        dataset_info = await self.load_info(dataset_name)
+        bucket_id, future = self._submit_corpus(dataset_name, corpus, dataset_info.bucket_num)
+        await future
         logger.success(f"数据集 {dataset_name} 语料添加成功，分桶 id 为 {bucket_id}。")
+        return dataset_info
+
+    async def add_corpus_stream(
+        self,
+        dataset_name: str,
+        chunks: AsyncIterable[bytes],
+        gzipped: bool = False,
+    ) -> CorpusBulkAddResult:
+        """
+        从 NDJSON 字节流批量添加语料
+
+        逐行校验并提交，同时在途的语料条数不超过 corpus_bulk_window，内存占用与上传大小无关
+        """
+        result = await self.add_corpus_lines(
+            dataset_name,
+            iter_ndjson_lines(chunks, gzipped=gzipped, max_line_bytes=settings.corpus_bulk_max_line_bytes),
+        )
+        logger.success(f"数据集 {dataset_name} 批量添加语料完成，成功 {result.accepted} 条，拒绝 {result.rejected} 条。")
+        return result
+
+    async def add_corpus_lines(
+        self,
+        dataset_name: str,
+        lines: AsyncIterable[tuple[int, bytes | None]],
+        result: CorpusBulkAddResult | None = None,
+    ) -> CorpusBulkAddResult:
+        """
+        批量校验并添加 (行号, 语料 JSON) 序列，语料 JSON 为 None 表示该行超长
+
+        同时在途的语料条数不超过 corpus_bulk_window，返回时全部语料均已写入完成；
+        行号仅用于标识被拒绝的语料，result 不为空时在其上累计结果；
+        数据集信息缓存被失效(如本进程重新分桶)后，后续语料按重新读取的分桶数路由
+        """
+        dataset_info = await self.load_info(dataset_name)
+        if result is None:
+            result = CorpusBulkAddResult(dataset_name=dataset_name)
+
+        def reject(line_no: int, reason: str):
+            result.rejected += 1
+            if len(result.errors) < BULK_ADD_MAX_ERRORS:
+                result.errors.append(CorpusBulkAddError(line=line_no, reason=reason))
+
+        in_flight: list[tuple[int, Future]] = []
+
+        async def drain():
+            await asyncio.wait([future for _, future in in_flight])
+            for line_no, future in in_flight:
+                exception = future.exception()
+                if exception is None:
+                    result.accepted += 1
+                elif isinstance(exception, DuplicateCorpusError):
+                    reject(line_no, str(exception))
+                else:
+                    result.failed += 1
+                    reject(line_no, f"写入失败：{exception!r}")
+            in_flight.clear()
+
+        async for line_no, line in lines:
+            if line is None:
+                reject(line_no, f"单行长度超过 {settings.corpus_bulk_max_line_bytes} 字节。")
+                continue
+            try:
+                corpus = Corpus.model_validate_json(line)
+            except ValidationError as e:
+                reject(line_no, f"语料格式校验失败：{e.errors(include_url=False, include_input=False)}")
+                continue
+            if self.info_cache.peek(dataset_name) is not dataset_info:
+                dataset_info = await self.load_info(dataset_name)
+            in_flight.append((line_no, self._submit_corpus(dataset_name, corpus, dataset_info.bucket_num)[1]))
+            if len(in_flight) >= settings.corpus_bulk_window:
+                await drain()
+        if in_flight:
+            await drain()
+        return result
+
+    async def _rebuild_buckets(self, dataset_name: str, hooks: list[BucketCommitHook]):
+        """
+        由数据集全部语料桶文件并行重建指定写入钩子的附属数据，调用方需独占数据集
+
+        各语料桶在文件锁内重建，期间其他进程对该语料桶的写入等待重建完成，不会遗漏于重建结果之外
+        """
+        dataset_info = await self.load_info(dataset_name)
+
+        def rebuild(hook: BucketCommitHook, bucket_file_path: Path):
+            with bucket_lock(bucket_file_path):
+                hook.rebuild(bucket_file_path)
+
+        await asyncio.gather(
+            *(
+                asyncio.to_thread(rebuild, hook, self.get_bucket_file_path(dataset_name, bucket_id))
+                for bucket_id in range(1, dataset_info.bucket_num + 1)
+                for hook in hooks
+            )
+        )
+
+    async def rebuild_dedup_index(self, dataset_name: str) -> DatasetDetail:
+        """由数据集现有语料桶文件重建去重索引"""
+        if self.dedup_index is None:
+            raise ValueError("语料去重未启用。")
+        await self.load_info(dataset_name)
+        async with self.writer_pool.exclusive(self.corpus_data_dir / dataset_name):
+            await self._rebuild_buckets(dataset_name, [self.dedup_index])
+        logger.success(f"数据集 {dataset_name} 去重索引重建完成。")
+        return await self.get_info(dataset_name)
+
+    async def rebuild_stats(self, dataset_name: str) -> DatasetDetail:
+        """扫描数据集全部语料桶文件，修复统计信息"""
+        await self.load_info(dataset_name)
+        async with self.writer_pool.exclusive(self.corpus_data_dir / dataset_name):
+            await self._rebuild_buckets(dataset_name, [self.stats_index])
+        logger.success(f"数据集 {dataset_name} 统计信息重建完成。")
+        return await self.get_info(dataset_name)
+
+    async def rebuild_search_index(self, dataset_name: str) -> DatasetDetail:
+        """由数据集现有语料桶文件重建全文检索索引"""
+        if self.search_index is None:
+            raise ValueError("语料全文检索未启用。")
+        await self.load_info(dataset_name)
+        async with self.writer_pool.exclusive(self.corpus_data_dir / dataset_name):
+            await self._rebuild_buckets(dataset_name, [self.search_index])
+        logger.success(f"数据集 {dataset_name} 检索索引重建完成。")
+        return await self.get_info(dataset_name)
+
+    async def rebuild_offset_index(self, dataset_name: str) -> DatasetDetail:
+        """由数据集现有语料桶文件重建行偏移索引"""
+        await self.load_info(dataset_name)
+        async with self.writer_pool.exclusive(self.corpus_data_dir / dataset_name):
+            await self._rebuild_buckets(dataset_name, [self.offset_index])
+        logger.success(f"数据集 {dataset_name} 行偏移索引重建完成。")
+        return await self.get_info(dataset_name)
+
+    async def search(
+        self,
+        dataset_name: str,
+        query: str,
+        limit: int = 20,
+        cursor: str | None = None,
+        bucket_start: int | None = None,
+        bucket_end: int | None = None,
+    ) -> CorpusSearchResult:
+        """
+        全文检索数据集 [bucket_start, bucket_end] 分桶内的语料
+
+        检索前将各语料桶的检索索引追平至当前快照(检索数据库缺失时即全量重建)，
+        再按命中的逻辑偏移直接读取语料行；cursor 为上一页结果返回的游标
+        """
+        if self.search_index is None:
+            raise ValueError("语料全文检索未启用。")
+        if limit < 1:
+            raise ValueError("检索条数必须为正整数。")
+        match_query = build_match_query(query)
+        after = None if cursor is None else parse_search_cursor(cursor)
+        bucket_ids = await self.get_bucket_ids(dataset_name, bucket_start, bucket_end)
+        snapshot = await self.snapshot(dataset_name, bucket_ids)
+        paths = {bucket_id: self.get_bucket_file_path(dataset_name, bucket_id) for bucket_id in snapshot}
+
+        def run() -> list[CorpusSearchHit]:
+            for bucket_id, (_, end) in snapshot.items():
+                self.search_index.catch_up(paths[bucket_id], end)
+            hits = []
+            for bucket_id, offset in self.search_index.search(
+                self.corpus_data_dir / dataset_name, match_query, list(snapshot), limit, after
+            ):
+                _, line = next(iter_bucket_lines_sync(paths[bucket_id], offset, snapshot[bucket_id][1]))
+                corpus = Corpus.model_validate_json(line)
+                hits.append(CorpusSearchHit(bucket_id=bucket_id, offset=offset, corpus=corpus))
+            return hits
+
+        hits = await asyncio.to_thread(run)
+        return CorpusSearchResult(
+            dataset_name=dataset_name,
+            hits=hits,
+            cursor=format_search_cursor(hits[-1].bucket_id, hits[-1].offset) if len(hits) >= limit else None,
+        )
+
+    async def reshard(self, dataset_name: str, bucket_num: int) -> ReshardProgress:
+        """
+        在后台将数据集改写为新的分桶数，返回进度对象
+
+        各语料桶按快照在进程池中并行流式拆分，期间写入照常提交至旧语料桶；
+        拆分完成后暂停提交，追平快照之后的新写入，原子切换 INFO.json，并将排队中的写入按新分桶数重新路由
+        """
+        dataset_info = await self.load_info(dataset_name)
+        if bucket_num < 1:
+            raise ValueError("分桶数必须为正整数。")
+        if bucket_num == dataset_info.bucket_num:
+            raise ValueError(f"数据集 {dataset_name} 的分桶数已为 {bucket_num}。")
+        self._check_maintenance(dataset_name)
+        progress = self.reshard_progress[dataset_name] = ReshardProgress(
+            dataset_name=dataset_name,
+            old_bucket_num=dataset_info.bucket_num,
+            new_bucket_num=bucket_num,
+            start_timestamp=int(datetime.now().timestamp() * 1000),
+        )
+        self._reshard_tasks[dataset_name] = asyncio.create_task(self._reshard(dataset_info, progress))
+        return progress
+
+    def _check_maintenance(self, dataset_name: str):
+        """确认数据集当前没有进行中的重新分桶、封存或校验"""
+        task = self._reshard_tasks.get(dataset_name)
+        if task is not None and not task.done():
+            raise ValueError(f"数据集 {dataset_name} 正在重新分桶。")
+        if dataset_name in self._sealing:
+            raise ValueError(f"数据集 {dataset_name} 正在封存。")
+        task = self._scan_tasks.get(dataset_name)
+        if task is not None and not task.done():
+            raise ValueError(f"数据集 {dataset_name} 正在校验。")
+
+    def get_reshard_progress(self, dataset_name: str) -> ReshardProgress:
+        progress = self.reshard_progress.get(dataset_name)
+        if progress is None:
+            raise ValueError(f"数据集 {dataset_name} 没有重新分桶记录。")
+        return progress
+
+    async def _reshard(self, dataset_info: DatasetInfo, progress: ReshardProgress):
+        dataset_name = dataset_info.name
+        dataset_dir = self.corpus_data_dir / dataset_name
+        reshard_dir = dataset_dir / RESHARD_DIRNAME
+        old_bucket_ids = list(range(1, progress.old_bucket_num + 1))
+        try:
+            await asyncio.to_thread(recover_reshard, dataset_dir)
+            await asyncio.to_thread(reshard_dir.mkdir)
+            snapshot = await self.snapshot(dataset_name, old_bucket_ids)
+            progress.total_size = sum(end - start for start, end in snapshot.values())
+            loop = asyncio.get_running_loop()
+            executor = ProcessPoolExecutor(
+                max_workers=min(settings.corpus_reshard_workers or os.cpu_count() or 1, len(old_bucket_ids))
+            )
+            try:
+                futures = [
+                    loop.run_in_executor(
+                        executor,
+                        split_bucket_range,
+                        str(self.get_bucket_file_path(dataset_name, bucket_id)),
+                        start,
+                        end,
+                        str(reshard_dir),
+                        progress.new_bucket_num,
+                        str(bucket_id),
+                    ) for bucket_id, (start, end) in snapshot.items()
+                ]
+                for future in asyncio.as_completed(futures):
+                    progress.processed_size += await future
+            finally:
+                await asyncio.to_thread(executor.shutdown, cancel_futures=True)
+
+            def commit():
+                """
+                在新旧全部语料桶文件锁内拆分快照之后追加的语料并完成切换
+
+                其他进程的写入在锁内等待，切换后其写入器发现语料桶文件已被替换，重新读取分桶数并重新路由
+                """
+                bucket_file_paths = [
+                    self.get_bucket_file_path(dataset_name, bucket_id)
+                    for bucket_id in range(1, max(progress.old_bucket_num, progress.new_bucket_num) + 1)
+                ]
+                with bucket_locks(bucket_file_paths):
+                    tails = {
+                        bucket_id: (end, get_bucket_size(self.get_bucket_file_path(dataset_name, bucket_id)))
+                        for bucket_id, (_, end) in snapshot.items()
+                    }
+                    progress.total_size += sum(end - start for start, end in tails.values() if end > start)
+                    for bucket_id, (start, end) in tails.items():
+                        if end > start:
+                            progress.processed_size += split_bucket_range(
+                                str(self.get_bucket_file_path(dataset_name, bucket_id)),
+                                start,
+                                end,
+                                str(reshard_dir),
+                                progress.new_bucket_num,
+                                f'tail{bucket_id}',
+                            )
+                    new_bucket_ids = merge_parts(
+                        reshard_dir,
+                        progress.new_bucket_num,
+                        [tag for bucket_id in old_bucket_ids for tag in (str(bucket_id), f'tail{bucket_id}')],
+                    )
+                    commit_reshard(
+                        dataset_dir,
+                        dataset_info.model_copy(update={'bucket_num': progress.new_bucket_num}).model_dump_json(),
+                        new_bucket_ids,
+                    )
+                    for bucket_file_path in bucket_file_paths:
+                        for hook in self.writer_pool.hooks:
+                            hook.discard(bucket_file_path)
+
+            progress.status = 'committing'
+            async with self.writer_pool.exclusive(dataset_dir):
+                await asyncio.to_thread(commit)
+                self.info_cache.invalidate(dataset_name)
+                await self._resubmit(dataset_name, self.writer_pool.take_pending(dataset_dir))
+            progress.status = 'finished'
+            logger.success(
+                f"数据集 {dataset_name} 重新分桶完成，分桶数 {progress.old_bucket_num} -> {progress.new_bucket_num}。"
+            )
+        except Exception as e:
+            progress.status = 'failed'
+            progress.error = repr(e)
+            logger.error(f"数据集 {dataset_name} 重新分桶失败：{e!r}")
+            await asyncio.to_thread(recover_reshard, dataset_dir)
+        finally:
+            progress.end_timestamp = int(datetime.now().timestamp() * 1000)
+
+    async def seal(self, dataset_name: str, bucket_ids: list[int] | None = None) -> DatasetDetail:
+        """
+        封存数据集语料桶(默认为全部)中的现有语料
+
+        压缩阶段不暂停写入，仅在提交阶段暂停提交以替换块索引与 JSONL 文件；封存不改变语料的逻辑偏移，已有快照仍然有效
+        """
+        dataset_info = await self.load_info(dataset_name)
+        if bucket_ids is None:
+            bucket_ids = await self.get_bucket_ids(dataset_name)
+        for bucket_id in bucket_ids:
+            if not 1 <= bucket_id <= dataset_info.bucket_num:
+                raise ValueError(f"数据集 {dataset_name} 不存在分桶 {bucket_id}。")
+        self._check_maintenance(dataset_name)
+        dataset_dir = self.corpus_data_dir / dataset_name
+        self._sealing.add(dataset_name)
+        try:
+            await self.writer_pool.flush(dataset_dir, sync=True)
+            sealed = []
+            for bucket_id in bucket_ids:
+                bucket_file_path = self.get_bucket_file_path(dataset_name, bucket_id)
+                layout = await asyncio.to_thread(get_bucket_layout, bucket_file_path)
+                if layout.live_end <= layout.live_start:
+                    continue
+                blocks, end = await asyncio.to_thread(
+                    compress_blocks,
+                    bucket_file_path,
+                    layout,
+                    settings.corpus_seal_block_size,
+                    settings.corpus_seal_compress_level,
+                )
+                if blocks:
+                    sealed.append((bucket_file_path, blocks, end))
+            async with self.writer_pool.exclusive(dataset_dir):
+                for bucket_file_path, blocks, end in sealed:
+                    await asyncio.to_thread(commit_seal, bucket_file_path, blocks, end)
+                    await asyncio.to_thread(self.stats_index.rebuild, bucket_file_path)
+        finally:
+            self._sealing.discard(dataset_name)
+        logger.success(f"数据集 {dataset_name} 封存完成，共封存 {len(sealed)} 个语料桶。")
+        return await self.get_info(dataset_name)
+
+    async def scan(self, dataset_name: str, repair: bool = False) -> DatasetScanResult:
+        """
+        在后台校验数据集全部语料桶，返回进度对象
+
+        各语料桶按快照切分为若干范围在进程池中并行校验格式与所属分桶，快照之后的新写入在暂停提交后补充校验，
+        以区分末尾正在写入的行与崩溃截断的行。repair 为真时改写存在问题的语料桶，丢弃无效与截断的语料，
+        不属于该分桶的语料在改写后按分桶规则重新写入；改写后的语料桶逻辑偏移改变，此前的快照失效
+        """
+        dataset_info = await self.load_info(dataset_name)
+        self._check_maintenance(dataset_name)
+        result = self.scan_results[dataset_name] = DatasetScanResult(
+            dataset_name=dataset_name,
+            repair=repair,
+            buckets=[BucketScanResult(bucket_id=bucket_id) for bucket_id in range(1, dataset_info.bucket_num + 1)],
+            start_timestamp=int(datetime.now().timestamp() * 1000),
+        )
+        self._scan_tasks[dataset_name] = asyncio.create_task(self._scan(dataset_info, result))
+        return result
+
+    def get_scan_result(self, dataset_name: str) -> DatasetScanResult:
+        result = self.scan_results.get(dataset_name)
+        if result is None:
+            raise ValueError(f"数据集 {dataset_name} 没有校验记录。")
+        return result
+
+    async def _scan(self, dataset_info: DatasetInfo, result: DatasetScanResult):
+        dataset_name = dataset_info.name
+        dataset_dir = self.corpus_data_dir / dataset_name
+        scan_dir = dataset_dir / SCAN_DIRNAME
+        bucket_results = {bucket_result.bucket_id: bucket_result for bucket_result in result.buckets}
+        next_offsets: dict[int, int] = dict()
+
+        def merge_result(bucket_id: int, range_result):
+            bucket_result = bucket_results[bucket_id]
+            bucket_result.corpus_num += range_result.corpus_num
+            bucket_result.invalid_num += range_result.invalid_num
+            bucket_result.misplaced_num += range_result.misplaced_num
+            bucket_result.truncated = bucket_result.truncated or range_result.truncated
+            result.issues.extend(range_result.issues[:SCAN_MAX_ISSUES - len(result.issues)])
+
+        def has_issue(bucket_id: int) -> bool:
+            bucket_result = bucket_results[bucket_id]
+            return bool(bucket_result.invalid_num or bucket_result.misplaced_num or bucket_result.truncated)
+
+        def get_part_path(bucket_id: int, tag: int | str) -> Path | None:
+            return scan_dir / f'{bucket_id}_{tag}.part' if result.repair else None
+
+        try:
+            await asyncio.to_thread(recover_scan, dataset_dir)
+            if result.repair:
+                await asyncio.to_thread(scan_dir.mkdir)
+            snapshot = await self.snapshot(dataset_name, list(bucket_results))
+            tasks = [
+                (bucket_id, index, start, end, limit)
+                for bucket_id, (_, limit) in snapshot.items()
+                for index, (start, end) in enumerate(split_scan_ranges(limit))
+            ]
+            range_num = {bucket_id: 0 for bucket_id in snapshot}
+            for bucket_id, *_ in tasks:
+                range_num[bucket_id] += 1
+            result.total_size = sum(end - start for start, end in snapshot.values())
+            loop = asyncio.get_running_loop()
+            executor = ProcessPoolExecutor(
+                max_workers=min(settings.corpus_scan_workers or os.cpu_count() or 1, len(tasks))
+            )
+
+            async def run(bucket_id: int, index: int, start: int, end: int, limit: int):
+                part_path = get_part_path(bucket_id, index)
+                range_result = await loop.run_in_executor(
+                    executor,
+                    scan_bucket_range,
+                    str(self.get_bucket_file_path(dataset_name, bucket_id)),
+                    start,
+                    end,
+                    limit,
+                    bucket_id,
+                    dataset_info.bucket_num,
+                    None if part_path is None else str(part_path),
+                )
+                return bucket_id, index, end - start, range_result
+
+            try:
+                for future in asyncio.as_completed([run(*task) for task in tasks]):
+                    bucket_id, index, size, range_result = await future
+                    merge_result(bucket_id, range_result)
+                    if index == range_num[bucket_id] - 1:
+                        next_offsets[bucket_id] = range_result.next_offset
+                    result.processed_size += size
+            finally:
+                await asyncio.to_thread(executor.shutdown, cancel_futures=True)
+
+            async def merge_parts(bucket_id: int, tags: list[int | str], append: bool = False):
+                await asyncio.to_thread(
+                    merge_scan_parts,
+                    [get_part_path(bucket_id, tag) for tag in tags],
+                    scan_dir / str(bucket_id),
+                    append,
+                )
+
+            issue_bucket_ids = [bucket_id for bucket_id in bucket_results if result.repair and has_issue(bucket_id)]
+            for bucket_id in issue_bucket_ids:
+                await merge_parts(bucket_id, list(range(range_num[bucket_id])))
+
+            def commit(bucket_id: int) -> bool:
+                """
+                在语料桶文件锁内校验快照之后追加的语料，需要修复时以修复结果替换语料桶，返回是否已修复
+
+                其他进程对该语料桶的写入在锁内等待，不会在扫描末尾与替换之间写入而丢失
+                """
+                bucket_file_path = self.get_bucket_file_path(dataset_name, bucket_id)
+                with bucket_lock(bucket_file_path):
+                    size = get_bucket_size(bucket_file_path)
+                    start = next_offsets.get(bucket_id, size)
+                    result.total_size += size - start
+                    tail_part_path = get_part_path(bucket_id, 'tail')
+                    range_result = scan_bucket_range(
+                        str(bucket_file_path),
+                        start,
+                        size,
+                        size,
+                        bucket_id,
+                        dataset_info.bucket_num,
+                        None if tail_part_path is None else str(tail_part_path),
+                        True,
+                    )
+                    merge_result(bucket_id, range_result)
+                    result.processed_size += size - start
+                    if not result.repair or not has_issue(bucket_id):
+                        return False
+                    if bucket_id not in issue_bucket_ids:
+                        part_paths = [get_part_path(bucket_id, tag) for tag in range(range_num[bucket_id])]
+                        merge_scan_parts(part_paths, scan_dir / str(bucket_id))
+                    merge_scan_parts([tail_part_path], scan_dir / str(bucket_id), True)
+                    commit_rewrite(bucket_file_path, scan_dir / str(bucket_id))
+                    for hook in self.writer_pool.hooks:
+                        hook.rebuild(bucket_file_path)
+                    if self.offset_index not in self.writer_pool.hooks:
+                        self.offset_index.discard(bucket_file_path)
+                    return True
+
+            result.status = 'committing'
+            repaired_bucket_ids = []
+            async with self.writer_pool.exclusive(dataset_dir):
+                for bucket_id in bucket_results:
+                    if await asyncio.to_thread(commit, bucket_id):
+                        bucket_results[bucket_id].repaired = True
+                        repaired_bucket_ids.append(bucket_id)
+
+            bucket_num = (await self.load_info(dataset_name)).bucket_num
+            for bucket_id in repaired_bucket_ids:
+                misplaced_path = scan_dir / (str(bucket_id) + MISPLACED_SUFFIX)
+                lines = (await asyncio.to_thread(misplaced_path.read_bytes)).splitlines()
+                for index in range(0, len(lines), settings.corpus_bulk_window):
+                    futures = [
+                        self._submit_line(dataset_name, line, bucket_num)[1]
+                        for line in lines[index:index + settings.corpus_bulk_window]
+                    ]
+                    await asyncio.wait(futures)
+                    result.relocated_num += sum(future.exception() is None for future in futures)
+            result.status = 'finished'
+            logger.success(
+                f"数据集 {dataset_name} 校验完成，有效语料 {sum(item.corpus_num for item in result.buckets)} 条，"
+                f"问题语料桶 {sum(has_issue(bucket_id) for bucket_id in bucket_results)} 个，"
+                f"已修复 {len(repaired_bucket_ids)} 个。"
+            )
+        except Exception as e:
+            result.status = 'failed'
+            result.error = repr(e)
+            logger.error(f"数据集 {dataset_name} 校验失败：{e!r}")
+        finally:
+            await asyncio.to_thread(shutil.rmtree, scan_dir, True)
+            result.end_timestamp = int(datetime.now().timestamp() * 1000)
+
+    async def recover(self):
+        """并行处理各数据集中断的重新分桶、封存与修复"""
+        if self.corpus_data_dir is None:
+            return
+
+        async def recover_dataset(dataset_name: str):
+            dataset_dir = self.corpus_data_dir / dataset_name
+            await asyncio.to_thread(recover_dataset_seal, dataset_dir)
+            await asyncio.to_thread(recover_scan, dataset_dir)
+            if await asyncio.to_thread(recover_reshard, dataset_dir):
+                self.info_cache.invalidate(dataset_name)
+
+        dataset_names = await asyncio.to_thread(self.info_cache.list_dataset_names, self.corpus_data_dir)
+        await asyncio.gather(*(recover_dataset(dataset_name) for dataset_name in dataset_names))
+
+    async def get_bucket_ids(
+        self,
+        dataset_name: str,
+        bucket_start: int | None = None,
+        bucket_end: int | None = None,
+    ) -> list[int]:
+        """获取数据集 [bucket_start, bucket_end] 范围内的分桶 id 列表，用于分片读取"""
+        dataset_info = await self.load_info(dataset_name)
+        bucket_start = max(bucket_start or 1, 1)
+        bucket_end = min(bucket_end or dataset_info.bucket_num, dataset_info.bucket_num)
+        return list(range(bucket_start, bucket_end + 1))
+
+    async def snapshot(self, dataset_name: str, bucket_ids: list[int]) -> dict[int, tuple[int, int]]:
+        """
+        提交数据集待写入语料后，记录各语料桶当前的数据范围
+
+        返回分桶 id 与 [start, end) 逻辑字节范围映射表，基于同一快照的读取结果保持一致，不受后续写入与封存影响
+        """
+        if self.corpus_data_dir is None:
+            raise ValueError("语料库目录配置项为空。")
+        await self.writer_pool.flush(self.corpus_data_dir / dataset_name, sync=True)
+        sizes = await asyncio.to_thread(
+            lambda: [get_bucket_size(self.get_bucket_file_path(dataset_name, bucket_id)) for bucket_id in bucket_ids]
+        )
+        return {bucket_id: (0, size) for bucket_id, size in zip(bucket_ids, sizes)}
+
+    async def check_snapshot(self, dataset_name: str, snapshot: dict[int, tuple[int, int]]):
+        """
+        校验客户端传回的数据集快照与语料桶当前布局一致
+
+        各范围需满足 0 <= start <= end <= 语料桶当前逻辑大小；语料桶被修复改写或重新分桶后变短时快照失效，
+        否则按快照读取的内容将少于快照声明的字节数
+        """
+        sizes = await asyncio.to_thread(
+            lambda: {
+                bucket_id: get_bucket_size(self.get_bucket_file_path(dataset_name, bucket_id))
+                for bucket_id in snapshot
+            }
+        )
+        for bucket_id, (start, end) in snapshot.items():
+            if not 0 <= start <= end <= sizes[bucket_id]:
+                raise ValueError(
+                    f"数据集快照中分桶 {bucket_id} 的范围 {start}-{end} 与语料桶当前数据(大小 {sizes[bucket_id]})不一致，"
+                    "请重新获取快照。"
+                )
+
+    async def iter_corpus_lines(
+        self,
+        dataset_name: str,
+        snapshot: dict[int, tuple[int, int]],
+        shuffle: bool = False,
+        seed: int | None = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        按快照惰性读取数据集语料行(不含换行符)
+
+        默认按分桶 id 顺序读取；shuffle 为真时每行随机选择一个未读完的语料桶，相同 seed 下顺序确定
+        """
+        iterators = {
+            bucket_id: aiter(iter_bucket_lines(self.get_bucket_file_path(dataset_name, bucket_id), start, end))
+            for bucket_id, (start, end) in sorted(snapshot.items())
+        }
+        if not shuffle:
+            for iterator in iterators.values():
+                async for _, line in iterator:
+                    yield line
+            return
+        rng = random.Random(seed)
+        active = list(iterators.values())
+        while active:
+            index = rng.randrange(len(active))
+            try:
+                _, line = await anext(active[index])
+            except StopAsyncIteration:
+                active.pop(index)
+                continue
+            yield line
+
+    async def iter_corpus(
+        self,
+        dataset_name: str,
+        bucket_start: int | None = None,
+        bucket_end: int | None = None,
+        shuffle: bool = False,
+        seed: int | None = None,
+    ) -> AsyncIterator[Corpus]:
+        """惰性读取数据集中 [bucket_start, bucket_end] 分桶内的全部语料"""
+        bucket_ids = await self.get_bucket_ids(dataset_name, bucket_start, bucket_end)
+        snapshot = await self.snapshot(dataset_name, bucket_ids)
+        async for line in self.iter_corpus_lines(dataset_name, snapshot, shuffle=shuffle, seed=seed):
+            yield Corpus.model_validate_json(line)
+
+    async def read_page(
+        self,
+        dataset_name: str,
+        offset: int = 0,
+        limit: int = 100,
+        bucket_start: int | None = None,
+        bucket_end: int | None = None,
+        snapshot: dict[int, tuple[int, int]] | None = None,
+    ) -> CorpusPage:
+        """
+        按序号读取数据集 [bucket_start, bucket_end] 分桶内第 offset 条起的至多 limit 条语料
+
+        语料按分桶 id 与写入顺序编号；读取前将各语料桶的行偏移索引追平至快照(索引缺失时即全量重建)，
+        再由索引直接定位本页语料的逻辑偏移范围，读取耗时与 offset 无关。snapshot 为空时取当前快照
+        """
+        if offset < 0:
+            raise ValueError("起始序号不能为负数。")
+        if limit < 1:
+            raise ValueError("读取条数必须为正整数。")
+        bucket_ids = await self.get_bucket_ids(dataset_name, bucket_start, bucket_end)
+        if snapshot is None:
+            snapshot = await self.snapshot(dataset_name, bucket_ids)
+        else:
+            snapshot = {bucket_id: span for bucket_id, span in snapshot.items() if bucket_id in bucket_ids}
+            await self.check_snapshot(dataset_name, snapshot)
+
+        def run() -> tuple[int, list[Corpus]]:
+            total = 0
+            items = []
+            for bucket_id, (start, end) in sorted(snapshot.items()):
+                path = self.get_bucket_file_path(dataset_name, bucket_id)
+                self.offset_index.catch_up(path, end)
+                with self.offset_index.view(path) as view:
+                    first = view.count(start)
+                    num = view.count(end) - first
+                    page_start = min(max(offset - total, 0), num)
+                    page_end = min(offset + limit - total, num)
+                    if page_start < page_end:
+                        span_start = view.get_span(first + page_start)[0]
+                        span_end = view[first + page_end - 1]
+                        for _, line in iter_bucket_lines_sync(path, span_start, span_end):
+                            items.append(Corpus.model_validate_json(line))
+                total += num
+            return total, items
+
+        total, items = await asyncio.to_thread(run)
+        return CorpusPage(
+            dataset_name=dataset_name,
+            snapshot=format_snapshot(snapshot),
+            total=total,
+            offset=offset,
+            items=items,
+        )
+
+    async def sample(
+        self,
+        dataset_name: str,
+        num: int,
+        seed: int = 0,
+        splits: dict[str, float] | None = None,
+        split: str | None = None,
+        weight_field: str | None = None,
+        manifest: bool = False,
+        bucket_start: int | None = None,
+        bucket_end: int | None = None,
+    ) -> CorpusSampleResult:
+        """
+        对数据集 [bucket_start, bucket_end] 分桶内(split 不为空时仅该划分内)的语料确定性抽样
+
+        各语料桶按快照切分为若干范围在进程池中并行扫描，每个范围只保留抽样键值最大的 num 条位置，内存占用与数据集大小无关；
+        相同参数下对同一批语料的抽样结果不变。manifest 为假时再按位置读取语料内容
+        """
+        if not 1 <= num <= SAMPLE_MAX_NUM:
+            raise ValueError(f"抽样条数必须在 1 ~ {SAMPLE_MAX_NUM} 之间。")
+        bounds = None if split is None else self._get_split_bounds(splits, split)
+        bucket_ids = await self.get_bucket_ids(dataset_name, bucket_start, bucket_end)
+        snapshot = await self.snapshot(dataset_name, bucket_ids)
+        tasks = [
+            (bucket_id, start, end, size)
+            for bucket_id, (_, size) in snapshot.items()
+            for start, end in split_scan_ranges(size)
+        ]
+        loop = asyncio.get_running_loop()
+        executor = ProcessPoolExecutor(
+            max_workers=min(settings.corpus_sample_workers or os.cpu_count() or 1, len(tasks))
+        )
+        try:
+            results = await asyncio.gather(
+                *(
+                    loop.run_in_executor(
+                        executor,
+                        sample_bucket_range,
+                        str(self.get_bucket_file_path(dataset_name, bucket_id)),
+                        start,
+                        end,
+                        size,
+                        bucket_id,
+                        num,
+                        seed,
+                        bounds,
+                        split,
+                        weight_field,
+                    ) for bucket_id, start, end, size in tasks
+                )
+            )
+        finally:
+            await asyncio.to_thread(executor.shutdown, cancel_futures=True)
+        eligible_num = sum(range_eligible_num for _, range_eligible_num, _ in results)
+        split_counts: dict[str, int] = dict()
+        for _, _, range_split_counts in results:
+            for name, count in range_split_counts.items():
+                split_counts[name] = split_counts.get(name, 0) + count
+        pointers = merge_samples([heap for heap, _, _ in results], num)
+
+        def read() -> list[CorpusSampleItem]:
+            items = []
+            for bucket_id, offset in pointers:
+                path = self.get_bucket_file_path(dataset_name, bucket_id)
+                _, line = next(iter_bucket_lines_sync(path, offset, snapshot[bucket_id][1]))
+                items.append(
+                    CorpusSampleItem(bucket_id=bucket_id, offset=offset, corpus=Corpus.model_validate_json(line))
+                )
+            return items
+
+        if manifest:
+            items = [CorpusSampleItem(bucket_id=bucket_id, offset=offset) for bucket_id, offset in pointers]
+        else:
+            items = await asyncio.to_thread(read)
+        logger.info(f"数据集 {dataset_name} 抽样完成，{eligible_num} 条语料中抽取 {len(items)} 条。")
+        return CorpusSampleResult(
+            dataset_name=dataset_name,
+            snapshot=format_snapshot(snapshot),
+            eligible_num=eligible_num,
+            split_counts=split_counts,
+            items=items,
+        )
+
+    @staticmethod
+    def _get_split_bounds(splits: dict[str, float] | None, split: str) -> list[tuple[float, str]]:
+        if splits is None:
+            raise ValueError("未指定划分比例。")
+        if split not in splits:
+            raise ValueError(f"划分比例中不存在划分 {split}。")
+        return get_split_bounds(splits)
+
+    def iter_split_lines(
+        self,
+        dataset_name: str,
+        snapshot: dict[int, tuple[int, int]],
+        splits: dict[str, float],
+        split: str,
+        seed: int = 0,
+    ) -> AsyncIterator[tuple[int, int, bytes]]:
+        """
+        按快照顺序读取数据集中属于 split 划分的语料行，产出 (分桶 id, 逻辑偏移, 语料行)
+
+        划分参数在调用时即校验，便于在开始流式响应前返回错误
+        """
+        bounds = self._get_split_bounds(splits, split)
+
+        async def iterate():
+            for bucket_id, (start, end) in sorted(snapshot.items()):
+                path = self.get_bucket_file_path(dataset_name, bucket_id)
+                async for offset, line in iter_bucket_lines(path, start, end):
+                    if get_split_name(line, bounds, seed) == split:
+                        yield bucket_id, offset, line
+
+        return iterate()
+
+    async def iter_export_chunks(
+        self,
+        dataset_name: str,
+        snapshot: dict[int, tuple[int, int]],
+        offset: int = 0,
+    ) -> AsyncIterator[bytes]:
+        """
+        按快照顺序读取数据集原始字节，用于导出
+
+        导出内容为各语料桶数据(不含 BOM)按分桶 id 顺序拼接，offset 为导出内容中的字节偏移，用于断点续传
+        """
+        for bucket_id, (start, end) in sorted(snapshot.items()):
+            if offset >= end - start:
+                offset -= end - start
+                continue
+            bucket_file_path = self.get_bucket_file_path(dataset_name, bucket_id)
+            async for chunk in iter_bucket_chunks(bucket_file_path, start + offset, end):
+                yield chunk
+            offset = 0
+
+    def start_watch(self):
+        """开始监听语料库目录变更以失效数据集信息缓存，需在事件循环中调用"""
+        if self.corpus_data_dir is not None and settings.corpus_info_watch:
+            self.info_cache.start_watch(self.corpus_data_dir)
+
+    async def close(self):
+        """提交剩余语料、关闭全部语料桶文件句柄、写回统计信息并停止目录监听"""
+        await self.info_cache.stop_watch()
+        await self.writer_pool.close()
+        await asyncio.to_thread(self.stats_index.close)
+
+
+def _chain_future(source: Future, target: Future):
+    """将 source 的结果转交给 target"""
+    if target.done():
+        return
+    if source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+def format_snapshot(snapshot: dict[int, tuple[int, int]]) -> str:
+    """将数据集快照序列化为 `分桶id:起始偏移-结束偏移` 逗号分隔的字符串"""
+    return ','.join(f"{bucket_id}:{start}-{end}" for bucket_id, (start, end) in sorted(snapshot.items()))
+
+
+def parse_snapshot(text: str) -> dict[int, tuple[int, int]]:
+    """解析 format_snapshot 序列化的数据集快照"""
+    try:
+        snapshot = dict()
+        for item in filter(None, text.split(',')):
+            bucket_id, span = item.split(':')
+            start, end = span.split('-')
+            snapshot[int(bucket_id)] = (int(start), int(end))
+        return snapshot
+    except ValueError:
+        raise ValueError(f"数据集快照 {text} 格式错误。")
 
 
 corpus_dataset_manager = CorpusDatasetManager()
@@ -102,4 +1099,6 @@ corpus_dataset_manager = CorpusDatasetManager()
 
 __all__ = [
     "corpus_dataset_manager",
+    "format_snapshot",
+    "parse_snapshot",
 ]
@@ -0,0 +1,141 @@
+"""语料数据集信息缓存"""
+
+from typing import Callable
+from asyncio import Task
+from pathlib import Path
+import asyncio
+import os
+
+try:
+    from watchfiles import awatch
+except ImportError:
+    awatch = None
+
+from app.common.models.corpus import DatasetInfo
+from app.utils.log import logger
+
+from .const import DATASET_INFO_FILENAME
+
+
+class DatasetInfoCache:
+    """
+    语料数据集信息缓存
+
+    启用目录监听(inotify 等)时按文件变更事件失效缓存，热路径不触碰磁盘；
+    监听不可用时退化为 mtime 轮询，每次读取仅需一次 stat 而无需读取并解析 INFO.json
+    """
+
+    info_map: dict[str, tuple[int, DatasetInfo]]
+    """数据集名称与 (INFO.json mtime_ns, 数据集信息) 映射表"""
+
+    dataset_names: tuple[int, list[str]] | None
+    """(语料库目录 mtime_ns, 数据集名称列表)"""
+
+    watching: bool
+    """目录监听是否生效，监听器建立并首次产出后才置为 True"""
+
+    def __init__(self):
+        self.info_map = dict()
+        self.dataset_names = None
+        self.watching = False
+        self._watch_task: Task | None = None
+
+    def get(self, dataset_dir: Path, loader: Callable[[], DatasetInfo]) -> DatasetInfo:
+        """获取数据集信息，缓存失效时调用 loader 重新读取"""
+        cached = self.info_map.get(dataset_dir.name)
+        if cached is not None and self.watching:
+            return cached[1]
+        try:
+            mtime_ns = os.stat(dataset_dir / DATASET_INFO_FILENAME).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+        dataset_info = loader()
+        if mtime_ns is not None:
+            self.info_map[dataset_dir.name] = (mtime_ns, dataset_info)
+        return dataset_info
+
+    def peek(self, dataset_name: str) -> DatasetInfo | None:
+        """获取已缓存的数据集信息，不触碰磁盘也不校验 mtime，未缓存时返回 None"""
+        cached = self.info_map.get(dataset_name)
+        return None if cached is None else cached[1]
+
+    def list_dataset_names(self, corpus_data_dir: Path) -> list[str]:
+        """获取语料库目录下的数据集目录名称列表"""
+        if self.dataset_names is not None and self.watching:
+            return self.dataset_names[1]
+        mtime_ns = os.stat(corpus_data_dir).st_mtime_ns
+        if self.dataset_names is not None and self.dataset_names[0] == mtime_ns:
+            return self.dataset_names[1]
+        names = sorted(entry.name for entry in os.scandir(corpus_data_dir) if entry.is_dir())
+        self.dataset_names = (mtime_ns, names)
+        return names
+
+    def invalidate(self, dataset_name: str | None = None):
+        """失效某数据集(为 None 时为全部)的缓存"""
+        if dataset_name is None:
+            self.info_map.clear()
+        else:
+            self.info_map.pop(dataset_name, None)
+        self.dataset_names = None
+
+    def start_watch(self, corpus_data_dir: Path):
+        """开始监听语料库目录变更，需在事件循环中调用"""
+        if awatch is None:
+            logger.warning("未安装 watchfiles，数据集信息缓存将退化为 mtime 轮询。")
+            return
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch(corpus_data_dir))
+
+    async def stop_watch(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+        self.watching = False
+
+    async def _watch(self, corpus_data_dir: Path):
+        """
+        监听语料库目录变更并失效对应缓存
+
+        监听器在首次迭代时才真正建立，超时也会产出空集合；首次产出后才清空缓存并切换到事件失效模式，
+        建立监听前的变更由此前的 mtime 轮询与此时的清空覆盖
+        """
+        corpus_data_dir = corpus_data_dir.resolve()
+
+        def watch_filter(_, path: str) -> bool:
+            parts = Path(path).relative_to(corpus_data_dir).parts
+            return len(parts) == 1 or (len(parts) == 2 and parts[1] == DATASET_INFO_FILENAME)
+
+        try:
+            watcher = awatch(
+                corpus_data_dir,
+                watch_filter=watch_filter,
+                debounce=200,
+                step=20,
+                rust_timeout=1000,
+                yield_on_timeout=True,
+            )
+            async for changes in watcher:
+                if not self.watching:
+                    self.invalidate()
+                    self.watching = True
+                    logger.debug(f"开始监听语料库目录 {corpus_data_dir} 变更。")
+                for _, path in changes:
+                    parts = Path(path).relative_to(corpus_data_dir).parts
+                    self.invalidate(parts[0])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"语料库目录监听失败，数据集信息缓存将退化为 mtime 轮询：{e!r}")
+        finally:
+            self.watching = False
+
+
+__all__ = [
+    "DatasetInfoCache",
+]
@@ -0,0 +1,68 @@
+"""语料库文件命名与分桶规则"""
+
+import hashlib
+
+DATASET_INFO_FILENAME = 'INFO.json'
+"""语料数据集信息文件"""
+
+BUCKET_FILE_PREFIX = 'bucket_'
+"""语料桶文件前缀"""
+
+BUCKET_FILE_SUFFIX = '.jsonl'
+"""语料桶文件后缀"""
+
+SEALED_FILE_SUFFIX = '.sealed'
+"""语料桶封存块文件后缀，与语料桶文件同名"""
+
+SEALED_INDEX_SUFFIX = '.sidx'
+"""语料桶封存块索引文件后缀，与语料桶文件同名"""
+
+SEAL_LIVE_SUFFIX = '.seal'
+"""封存提交时新语料桶文件的临时后缀，附加于语料桶文件名之后"""
+
+STATS_FILENAME = 'STATS.json'
+"""语料数据集统计信息文件，与 INFO.json 同目录"""
+
+SEARCH_INDEX_FILENAME = 'SEARCH.db'
+"""语料数据集全文检索索引数据库(SQLite)，与 INFO.json 同目录"""
+
+DATASET_SIDECAR_FILENAMES = [
+    STATS_FILENAME,
+    SEARCH_INDEX_FILENAME,
+    SEARCH_INDEX_FILENAME + '-wal',
+    SEARCH_INDEX_FILENAME + '-shm',
+]
+"""数据集级别的附属文件，语料桶整体改写后需删除并重建"""
+
+
+def get_line_bucket_id(line: bytes, bucket_num: int) -> int:
+    """按语料行(不含换行符)的 sha256 计算其所属分桶 id"""
+    return int.from_bytes(hashlib.sha256(line).digest()) % bucket_num + 1
+
+
+def get_bucket_file_name(bucket_id: int) -> str:
+    return BUCKET_FILE_PREFIX + str(bucket_id) + BUCKET_FILE_SUFFIX
+
+
+def parse_bucket_id(file_name: str) -> int | None:
+    """由语料桶文件名解析分桶 id，不是语料桶文件时返回 None"""
+    if not (file_name.startswith(BUCKET_FILE_PREFIX) and file_name.endswith(BUCKET_FILE_SUFFIX)):
+        return None
+    bucket_id = file_name.removeprefix(BUCKET_FILE_PREFIX).removesuffix(BUCKET_FILE_SUFFIX)
+    return int(bucket_id) if bucket_id.isdigit() else None
+
+
+__all__ = [
+    "DATASET_INFO_FILENAME",
+    "BUCKET_FILE_PREFIX",
+    "BUCKET_FILE_SUFFIX",
+    "SEALED_FILE_SUFFIX",
+    "SEALED_INDEX_SUFFIX",
+    "SEAL_LIVE_SUFFIX",
+    "STATS_FILENAME",
+    "SEARCH_INDEX_FILENAME",
+    "DATASET_SIDECAR_FILENAMES",
+    "get_line_bucket_id",
+    "get_bucket_file_name",
+    "parse_bucket_id",
+]
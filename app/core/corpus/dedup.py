@@ -0,0 +1,198 @@
+"""语料内容哈希去重索引"""
+
+from collections import OrderedDict
+from threading import RLock
+from pathlib import Path
+import hashlib
+import os
+
+from app.utils.log import logger
+
+from .lock import is_locking
+from .reader import get_bucket_size, iter_bucket_lines_sync
+from .writer import BucketCommitHook
+
+DIGEST_FILE_SUFFIX = '.digest'
+"""去重摘要文件后缀，与语料桶文件同名"""
+
+DIGEST_SIZE = 16
+"""单条语料摘要长度(字节)，取 sha256 前 16 字节"""
+
+
+class DuplicateCorpusError(ValueError):
+    """语料在数据集中已存在"""
+
+
+def get_digest(line: bytes) -> bytes:
+    """计算语料行(不含换行符)的去重摘要"""
+    return hashlib.sha256(line).digest()[:DIGEST_SIZE]
+
+
+def get_digest_file_path(bucket_file_path: Path) -> Path:
+    return bucket_file_path.with_suffix(DIGEST_FILE_SUFFIX)
+
+
+class CorpusDedupIndex(BucketCommitHook):
+    """
+    语料去重索引
+
+    每个语料桶对应一个定长摘要文件，按需载入内存集合以 O(1) 判重，已载入的摘要总数超过上限时按最近最少使用淘汰
+    """
+
+    max_digests: int
+    """内存中最多保留的摘要条数"""
+
+    digest_sets: OrderedDict[Path, set[bytes]]
+    """语料桶文件路径与已载入摘要集合映射表，按最近使用排序"""
+
+    signatures: dict[Path, tuple[int, int]]
+    """
+    语料桶文件路径与已载入摘要文件的 (inode, 已载入大小) 映射表
+
+    多进程写入时据此追平其他进程追加的摘要，inode 变化或文件变小说明摘要文件已被重建，需全量重新载入
+    """
+
+    def __init__(self, max_digests: int):
+        self.max_digests = max_digests
+        self.digest_sets = OrderedDict()
+        self.signatures = dict()
+        self._loaded_num = 0
+        self._lock = RLock()
+
+    def contains(self, bucket_file_path: Path, digest: bytes) -> bool | None:
+        """仅查询内存中已载入的摘要集合，未载入时返回 None"""
+        with self._lock:
+            digest_set = self.digest_sets.get(bucket_file_path)
+        if digest_set is None:
+            return None
+        return digest in digest_set
+
+    def check(self, path: Path, lines: list[bytes]) -> list[Exception | None]:
+        digest_set = self._load(path)
+        batch_digests = set()
+        errors: list[Exception | None] = []
+        for line in lines:
+            digest = get_digest(line.rstrip(b'\n'))
+            if digest in digest_set or digest in batch_digests:
+                errors.append(DuplicateCorpusError("该语料在数据集中已存在。"))
+            else:
+                batch_digests.add(digest)
+                errors.append(None)
+        return errors
+
+    def committed(self, path: Path, lines: list[bytes], offsets: list[int]):
+        digests = [get_digest(line.rstrip(b'\n')) for line in lines]
+        with open(get_digest_file_path(path), 'ab') as f:
+            f.write(b''.join(digests))
+            signature = (os.fstat(f.fileno()).st_ino, f.tell())
+        with self._lock:
+            digest_set = self.digest_sets.get(path)
+            if digest_set is not None:
+                digest_set.update(digests)
+                self.signatures[path] = signature
+                self._loaded_num += len(digests)
+                self._evict(keep=path)
+
+    def rebuild(self, path: Path) -> int:
+        """由语料桶文件重建其去重摘要文件，返回摘要条数"""
+        digests = [get_digest(line) for _, line in iter_bucket_lines_sync(path, 0, get_bucket_size(path))]
+        digest_file_path = get_digest_file_path(path)
+        tmp_path = digest_file_path.with_name(digest_file_path.name + '.tmp')
+        tmp_path.write_bytes(b''.join(digests))
+        os.replace(tmp_path, digest_file_path)
+        self.drop(path)
+        logger.debug(f"语料桶文件 {path} 去重摘要重建完成，共 {len(digests)} 条。")
+        return len(digests)
+
+    def discard(self, path: Path):
+        self.drop(path)
+        get_digest_file_path(path).unlink(missing_ok=True)
+
+    def drop(self, path: Path):
+        """释放语料桶在内存中的摘要集合"""
+        with self._lock:
+            digest_set = self.digest_sets.pop(path, None)
+            self.signatures.pop(path, None)
+            if digest_set is not None:
+                self._loaded_num -= len(digest_set)
+
+    def _load(self, path: Path) -> set[bytes]:
+        with self._lock:
+            digest_set = self.digest_sets.get(path)
+            if digest_set is not None:
+                self.digest_sets.move_to_end(path)
+        if digest_set is not None:
+            if not is_locking() or self._catch_up(path, digest_set):
+                return digest_set
+            self.drop(path)
+        digest_file_path = get_digest_file_path(path)
+        data, signature = self._read(digest_file_path)
+        if (data is None and path.is_file()) or (data is not None and len(data) % DIGEST_SIZE != 0):
+            logger.warning(f"语料桶文件 {path} 的去重摘要文件缺失或不完整，将重新构建。")
+            self.rebuild(path)
+            data, signature = self._read(digest_file_path)
+        data = data or b''
+        digest_set = {data[i:i + DIGEST_SIZE] for i in range(0, len(data), DIGEST_SIZE)}
+        with self._lock:
+            self.digest_sets[path] = digest_set
+            if signature is not None:
+                self.signatures[path] = signature
+            self._loaded_num += len(digest_set)
+            self._evict(keep=path)
+        return digest_set
+
+    def _catch_up(self, path: Path, digest_set: set[bytes]) -> bool:
+        """
+        载入其他进程追加至摘要文件的摘要，需在语料桶文件锁内调用
+
+        摘要文件缺失、被替换或变小时返回 False，由调用方全量重新载入
+        """
+        with self._lock:
+            signature = self.signatures.get(path)
+        if signature is None:
+            return False
+        inode, size = signature
+        try:
+            with open(get_digest_file_path(path), 'rb') as f:
+                stat = os.fstat(f.fileno())
+                if stat.st_ino != inode or stat.st_size < size:
+                    return False
+                if stat.st_size == size:
+                    return True
+                f.seek(size)
+                data = f.read()
+        except FileNotFoundError:
+            return False
+        data = data[:len(data) - len(data) % DIGEST_SIZE]
+        with self._lock:
+            digest_set.update(data[i:i + DIGEST_SIZE] for i in range(0, len(data), DIGEST_SIZE))
+            self._loaded_num += len(data) // DIGEST_SIZE
+            self.signatures[path] = (inode, size + len(data))
+            self._evict(keep=path)
+        return True
+
+    @staticmethod
+    def _read(digest_file_path: Path) -> tuple[bytes | None, tuple[int, int] | None]:
+        """读取摘要文件内容及其 (inode, 大小)，文件不存在时均为 None"""
+        try:
+            with open(digest_file_path, 'rb') as f:
+                data = f.read()
+                return data, (os.fstat(f.fileno()).st_ino, len(data))
+        except FileNotFoundError:
+            return None, None
+
+    def _evict(self, keep: Path):
+        while self._loaded_num > self.max_digests and len(self.digest_sets) > 1:
+            path = next(iter(self.digest_sets))
+            if path == keep:
+                self.digest_sets.move_to_end(path)
+                continue
+            self._loaded_num -= len(self.digest_sets.pop(path))
+            self.signatures.pop(path, None)
+
+
+__all__ = [
+    "DuplicateCorpusError",
+    "CorpusDedupIndex",
+    "get_digest",
+]
@@ -0,0 +1,87 @@
+"""语料库跨进程文件锁"""
+
+from contextlib import ExitStack, contextmanager
+from typing import Iterable
+from pathlib import Path
+import threading
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from app.utils.config import settings
+
+LOCK_DIRNAME = '.lock'
+"""数据集目录下存放锁文件的子目录，锁文件不随语料桶改写而删除"""
+
+STATS_LOCK_FILENAME = 'STATS.lock'
+"""统计信息文件锁"""
+
+_held = threading.local()
+"""当前线程已持有的锁文件路径，用于同一线程内重入"""
+
+
+def get_bucket_lock_path(bucket_file_path: Path) -> Path:
+    return bucket_file_path.parent / LOCK_DIRNAME / (bucket_file_path.name + '.lock')
+
+
+@contextmanager
+def file_lock(lock_path: Path):
+    """
+    持有 lock_path 的排他 flock 锁
+
+    锁随文件描述符关闭而释放，进程崩溃时由操作系统自动释放；同一进程内的不同线程同样互斥，同一线程内可重入。
+    未启用 corpus_write_lock 或平台不支持 fcntl 时不加锁，此时仅支持单进程写入
+    """
+    if fcntl is None or not settings.corpus_write_lock:
+        yield
+        return
+    held: set[Path] = _held.__dict__.setdefault('paths', set())
+    if lock_path in held:
+        yield
+        return
+    lock_path.parent.mkdir(exist_ok=True)
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        held.add(lock_path)
+        yield
+    finally:
+        held.discard(lock_path)
+        os.close(fd)
+
+
+def bucket_lock(bucket_file_path: Path):
+    """语料桶文件锁，追加写入与替换语料桶文件时持有"""
+    return file_lock(get_bucket_lock_path(bucket_file_path))
+
+
+@contextmanager
+def bucket_locks(bucket_file_paths: Iterable[Path]):
+    """按路径顺序持有多个语料桶文件锁，整体替换数据集语料桶时持有，期间其他进程无法写入这些语料桶"""
+    with ExitStack() as stack:
+        for path in sorted(set(bucket_file_paths)):
+            stack.enter_context(bucket_lock(path))
+        yield
+
+
+def stats_lock(dataset_dir: Path):
+    """数据集统计信息文件锁，读取合并并写回 STATS.json 时持有"""
+    return file_lock(dataset_dir / LOCK_DIRNAME / STATS_LOCK_FILENAME)
+
+
+def is_locking() -> bool:
+    """跨进程文件锁是否生效"""
+    return fcntl is not None and settings.corpus_write_lock
+
+
+__all__ = [
+    "LOCK_DIRNAME",
+    "file_lock",
+    "bucket_lock",
+    "bucket_locks",
+    "stats_lock",
+    "is_locking",
+]
@@ -0,0 +1,88 @@
+"""NDJSON 流式解析工具"""
+
+from typing import AsyncIterable, AsyncIterator
+import codecs
+import zlib
+
+DECOMPRESS_CHUNK_SIZE = 1 << 16
+"""gzip 单次解压输出上限(字节)"""
+
+
+async def _gunzip(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """流式解压 gzip 数据，支持多成员拼接，单次输出不超过 DECOMPRESS_CHUNK_SIZE"""
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    async for chunk in chunks:
+        while chunk:
+            try:
+                data = decompressor.decompress(chunk, DECOMPRESS_CHUNK_SIZE)
+            except zlib.error as e:
+                raise ValueError(f"gzip 数据解压失败：{e}")
+            if data:
+                yield data
+            if decompressor.eof:
+                chunk = decompressor.unused_data
+                decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+            else:
+                chunk = decompressor.unconsumed_tail
+    data = decompressor.flush()
+    if data:
+        yield data
+
+
+async def iter_ndjson_lines(
+    chunks: AsyncIterable[bytes],
+    gzipped: bool = False,
+    max_line_bytes: int = 1 << 20,
+) -> AsyncIterator[tuple[int, bytes | None]]:
+    """
+    将字节流逐行切分为 NDJSON 记录
+
+    依次产出 (行号, 行内容)，行号从 1 开始，空行将被跳过；超过 max_line_bytes 的行内容为 None，
+    其剩余部分将被直接丢弃，因此内存占用与上传总大小无关
+    """
+    if gzipped:
+        chunks = _gunzip(chunks)
+    buffer = bytearray()
+    line_no = 0
+    oversized = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b'\n', start)
+            if end < 0:
+                if not oversized:
+                    buffer += chunk[start:]
+                    if len(buffer) > max_line_bytes:
+                        oversized = True
+                        buffer.clear()
+                break
+            line_no += 1
+            if oversized:
+                oversized = False
+                yield line_no, None
+            else:
+                buffer += chunk[start:end]
+                line = bytes(buffer).strip()
+                buffer.clear()
+                if line_no == 1:
+                    line = line.removeprefix(codecs.BOM_UTF8)
+                if len(line) > max_line_bytes:
+                    yield line_no, None
+                elif line:
+                    yield line_no, line
+            start = end + 1
+    if oversized:
+        yield line_no + 1, None
+    else:
+        line = bytes(buffer).strip()
+        if line_no == 0:
+            line = line.removeprefix(codecs.BOM_UTF8)
+        if len(line) > max_line_bytes:
+            yield line_no + 1, None
+        elif line:
+            yield line_no + 1, line
+
+
+__all__ = [
+    "iter_ndjson_lines",
+]
@@ -0,0 +1,158 @@
+"""
+语料桶行偏移索引
+
+每个语料桶对应一个定长偏移索引文件，第 i 项(uint64 小端序)为第 i 条语料行末尾(含换行符)的逻辑偏移，
+第 i 条语料即位于 [第 i - 1 项, 第 i 项)；按序号读取语料时以内存映射 O(1) 定位，无需从头扫描语料桶
+"""
+
+from threading import Lock
+from pathlib import Path
+import bisect
+import mmap
+import os
+
+from app.utils.log import logger
+
+from .lock import bucket_lock
+from .reader import get_bucket_size, iter_bucket_lines_sync
+from .writer import BucketCommitHook
+
+OFFSET_INDEX_SUFFIX = '.oidx'
+"""行偏移索引文件后缀，与语料桶文件同名"""
+
+OFFSET_ENTRY_SIZE = 8
+"""单项行偏移长度(字节)"""
+
+
+def get_offset_index_path(bucket_file_path: Path) -> Path:
+    return bucket_file_path.with_suffix(OFFSET_INDEX_SUFFIX)
+
+
+def pack_ends(ends: list[int]) -> bytes:
+    return b''.join(end.to_bytes(OFFSET_ENTRY_SIZE, 'little') for end in ends)
+
+
+def scan_line_ends(path: Path, start: int, end: int) -> list[int]:
+    """扫描语料桶 [start, end) 范围内的完整语料行，返回各行末尾的逻辑偏移"""
+    ends = []
+    for offset, line in iter_bucket_lines_sync(path, start, end):
+        if offset + len(line) >= end:
+            break
+        ends.append(offset + len(line) + 1)
+    return ends
+
+
+class OffsetIndexView:
+    """以内存映射只读访问行偏移索引文件，支持下标访问与二分查找"""
+
+    def __init__(self, index_path: Path):
+        self._mmap = None
+        try:
+            with open(index_path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size // OFFSET_ENTRY_SIZE * OFFSET_ENTRY_SIZE
+                if size > 0:
+                    self._mmap = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            pass
+
+    def __len__(self) -> int:
+        return 0 if self._mmap is None else len(self._mmap) // OFFSET_ENTRY_SIZE
+
+    def __getitem__(self, index: int) -> int:
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        start = index * OFFSET_ENTRY_SIZE
+        return int.from_bytes(self._mmap[start:start + OFFSET_ENTRY_SIZE], 'little')
+
+    def get_span(self, index: int) -> tuple[int, int]:
+        """第 index 条语料的 [起始, 结束) 逻辑偏移"""
+        return self[index - 1] if index > 0 else 0, self[index]
+
+    def count(self, end: int) -> int:
+        """逻辑偏移 end 之前的完整语料条数"""
+        return bisect.bisect_right(self, end)
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class CorpusOffsetIndex(BucketCommitHook):
+    """
+    语料桶行偏移索引
+
+    随语料桶提交追加各语料行末尾偏移；追加前比对索引末项与本批起始偏移，不一致(如索引缺失、其他进程未启用索引)时
+    由语料桶文件补齐或重建。读取前的追平在语料桶文件锁内进行，与各进程的提交互斥
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+
+    def _append(self, path: Path, start: int, ends: list[int]):
+        """
+        将已索引范围补齐至 start 后追加 ends，需持有语料桶文件锁
+
+        ends 为空(仅追平)且索引已覆盖 start 时不做改动；追加时索引超出 start 说明语料桶已被改写，需重新构建
+        """
+        index_path = get_offset_index_path(path)
+        with self._lock, open(os.open(index_path, os.O_RDWR | os.O_CREAT, 0o644), 'r+b') as f:
+            size = f.seek(0, os.SEEK_END)
+            if size % OFFSET_ENTRY_SIZE:
+                size -= size % OFFSET_ENTRY_SIZE
+                f.truncate(size)
+            last = 0
+            if size > 0:
+                f.seek(size - OFFSET_ENTRY_SIZE)
+                last = int.from_bytes(f.read(OFFSET_ENTRY_SIZE), 'little')
+            if last > start:
+                if not ends:
+                    return
+                logger.warning(f"语料桶文件 {path} 的行偏移索引与语料桶不一致，将重新构建。")
+                f.truncate(0)
+                size = last = 0
+            if last < start:
+                ends = scan_line_ends(path, last, start) + ends
+            f.seek(size)
+            f.write(pack_ends(ends))
+
+    def committed(self, path: Path, lines: list[bytes], offsets: list[int]):
+        self._append(path, offsets[0], [offset + len(line) for line, offset in zip(lines, offsets)])
+
+    def catch_up(self, path: Path, end: int):
+        """将语料桶行偏移索引追平至逻辑偏移 end，读取前调用；索引缺失时即为全量重建"""
+        with OffsetIndexView(get_offset_index_path(path)) as view:
+            if len(view) > 0 and view[len(view) - 1] >= end:
+                return
+        with bucket_lock(path):
+            self._append(path, end, [])
+
+    def rebuild(self, path: Path):
+        """由语料桶文件重建其行偏移索引"""
+        index_path = get_offset_index_path(path)
+        tmp_path = index_path.with_name(index_path.name + '.tmp')
+        ends = scan_line_ends(path, 0, get_bucket_size(path))
+        with self._lock:
+            tmp_path.write_bytes(pack_ends(ends))
+            os.replace(tmp_path, index_path)
+        logger.debug(f"语料桶文件 {path} 行偏移索引重建完成，共 {len(ends)} 条。")
+
+    def discard(self, path: Path):
+        get_offset_index_path(path).unlink(missing_ok=True)
+
+    @staticmethod
+    def view(path: Path) -> OffsetIndexView:
+        """以内存映射打开语料桶的行偏移索引"""
+        return OffsetIndexView(get_offset_index_path(path))
+
+
+__all__ = [
+    "CorpusOffsetIndex",
+    "OffsetIndexView",
+]
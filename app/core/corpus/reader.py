@@ -0,0 +1,245 @@
+"""
+语料桶文件流式读取工具
+
+语料桶由已封存的压缩块文件与仍在追加的 JSONL 文件两部分组成，二者拼接(不含 BOM)构成该桶的逻辑字节流；
+本模块中的偏移均为逻辑偏移，封存不会改变已有语料的逻辑偏移
+"""
+
+from typing import AsyncIterator, BinaryIO, Iterator, NamedTuple
+from pathlib import Path
+import asyncio
+import codecs
+import struct
+import time
+import zlib
+import os
+
+from .const import SEAL_LIVE_SUFFIX, SEALED_FILE_SUFFIX, SEALED_INDEX_SUFFIX
+
+READ_CHUNK_SIZE = 1 << 18
+"""单次读取语料桶文件的字节数"""
+
+SEALED_BLOCK_ENTRY = struct.Struct('<QQIII')
+"""封存块索引项：逻辑偏移、压缩文件偏移、压缩长度、原始长度、语料行数"""
+
+OPEN_BUCKET_TIMEOUT = 10
+"""等待进行中的封存提交完成的最长时间(秒)，超时说明存在中断后未清理的封存"""
+
+
+class SealedBlock(NamedTuple):
+    """封存块索引项"""
+
+    raw_offset: int
+    """块内首条语料的逻辑偏移"""
+
+    comp_offset: int
+    """块在封存文件中的偏移"""
+
+    comp_len: int
+    """块压缩后长度"""
+
+    raw_len: int
+    """块原始长度"""
+
+    line_num: int
+    """块内语料行数"""
+
+
+class BucketLayout(NamedTuple):
+    """语料桶文件布局"""
+
+    blocks: list[SealedBlock]
+    """封存块索引"""
+
+    live_start: int
+    """JSONL 文件中语料数据的起始偏移(跳过 BOM)"""
+
+    live_end: int
+    """JSONL 文件大小"""
+
+    @property
+    def sealed_size(self) -> int:
+        """已封存部分的逻辑大小"""
+        return self.blocks[-1].raw_offset + self.blocks[-1].raw_len if self.blocks else 0
+
+    @property
+    def size(self) -> int:
+        """语料桶逻辑大小"""
+        return self.sealed_size + self.live_end - self.live_start
+
+
+def get_sealed_file_path(path: Path) -> Path:
+    return path.with_suffix(SEALED_FILE_SUFFIX)
+
+
+def get_sealed_index_path(path: Path) -> Path:
+    return path.with_suffix(SEALED_INDEX_SUFFIX)
+
+
+def read_sealed_blocks(path: Path) -> list[SealedBlock]:
+    """读取语料桶的封存块索引，忽略末尾不完整的索引项"""
+    try:
+        data = get_sealed_index_path(path).read_bytes()
+    except FileNotFoundError:
+        return []
+    data = data[:len(data) - len(data) % SEALED_BLOCK_ENTRY.size]
+    return [SealedBlock(*entry) for entry in SEALED_BLOCK_ENTRY.iter_unpack(data)]
+
+
+def get_bucket_data_start(path: Path) -> int:
+    """获取 JSONL 文件中语料数据的起始偏移(跳过 BOM)"""
+    try:
+        with open(path, 'rb') as f:
+            return len(codecs.BOM_UTF8) if f.read(len(codecs.BOM_UTF8)) == codecs.BOM_UTF8 else 0
+    except FileNotFoundError:
+        return 0
+
+
+def open_bucket(path: Path) -> tuple[BucketLayout, BinaryIO | None]:
+    """
+    获取语料桶文件布局并打开 JSONL 文件，文件不存在时为 None
+
+    封存提交会依次替换块索引与 JSONL 文件，二者不一致时重试，保证返回的布局与打开的文件相对应；
+    超过 OPEN_BUCKET_TIMEOUT 仍不一致时抛出 ValueError，而不是一直等待
+    """
+    deadline = time.monotonic() + OPEN_BUCKET_TIMEOUT
+    while True:
+        blocks = read_sealed_blocks(path)
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            f = None
+        if (
+            f is None or len(read_sealed_blocks(path)) == len(blocks)
+            and not path.with_name(path.name + SEAL_LIVE_SUFFIX).exists()
+            and os.fstat(f.fileno()).st_ino == os.stat(path).st_ino
+        ):
+            break
+        f.close()
+        if time.monotonic() > deadline:
+            raise ValueError(f"语料桶文件 {path} 存在未完成的封存，请校验数据集或重启服务以恢复。")
+        time.sleep(0.01)
+    if f is None:
+        return BucketLayout(blocks=blocks, live_start=0, live_end=0), None
+    live_end = os.fstat(f.fileno()).st_size
+    live_start = len(codecs.BOM_UTF8) if f.read(len(codecs.BOM_UTF8)) == codecs.BOM_UTF8 else 0
+    return BucketLayout(blocks=blocks, live_start=min(live_start, live_end), live_end=live_end), f
+
+
+def get_bucket_layout(path: Path) -> BucketLayout:
+    layout, f = open_bucket(path)
+    if f is not None:
+        f.close()
+    return layout
+
+
+def get_bucket_size(path: Path) -> int:
+    """获取语料桶逻辑大小"""
+    return get_bucket_layout(path).size
+
+
+def read_sealed_block(path: Path, block: SealedBlock) -> bytes:
+    with open(get_sealed_file_path(path), 'rb') as f:
+        f.seek(block.comp_offset)
+        return zlib.decompress(f.read(block.comp_len), zlib.MAX_WBITS | 16)
+
+
+def iter_bucket_chunks_sync(path: Path, start: int, end: int) -> Iterator[bytes]:
+    """按块读取语料桶逻辑字节流 [start, end) 范围内的原始字节"""
+    layout, f = open_bucket(path)
+    try:
+        end = min(end, layout.size)
+        for block in layout.blocks:
+            if start >= end:
+                return
+            if block.raw_offset + block.raw_len <= start:
+                continue
+            data = read_sealed_block(path, block)
+            yield data[start - block.raw_offset:end - block.raw_offset]
+            start = block.raw_offset + block.raw_len
+        if f is None:
+            return
+        f.seek(start - layout.sealed_size + layout.live_start)
+        remain = end - start
+        while remain > 0:
+            chunk = f.read(min(READ_CHUNK_SIZE, remain))
+            if not chunk:
+                break
+            remain -= len(chunk)
+            yield chunk
+    finally:
+        if f is not None:
+            f.close()
+
+
+def iter_bucket_lines_sync(
+    path: Path,
+    start: int,
+    end: int,
+) -> Iterator[tuple[int, bytes]]:
+    """
+    逐行读取语料桶逻辑字节流 [start, end) 范围内的语料
+
+    依次产出 (行逻辑偏移, 行内容)，行内容不含换行符，范围末尾不完整的行同样会被产出
+    """
+    buffer = b''
+    offset = start
+    for chunk in iter_bucket_chunks_sync(path, start, end):
+        buffer += chunk
+        line_start = 0
+        while True:
+            line_end = buffer.find(b'\n', line_start)
+            if line_end < 0:
+                break
+            if line_end > line_start:
+                yield offset + line_start, buffer[line_start:line_end]
+            line_start = line_end + 1
+        offset += line_start
+        buffer = buffer[line_start:]
+    if buffer:
+        yield offset, buffer
+
+
+async def iter_bucket_chunks(path: Path, start: int, end: int) -> AsyncIterator[bytes]:
+    """iter_bucket_chunks_sync 的异步版本，文件读取与解压在线程池中进行"""
+    iterator = iter_bucket_chunks_sync(path, start, end)
+    while (chunk := await asyncio.to_thread(next, iterator, None)) is not None:
+        yield chunk
+
+
+async def iter_bucket_lines(path: Path, start: int, end: int) -> AsyncIterator[tuple[int, bytes]]:
+    """iter_bucket_lines_sync 的异步版本"""
+    buffer = b''
+    offset = start
+    async for chunk in iter_bucket_chunks(path, start, end):
+        buffer += chunk
+        line_start = 0
+        while True:
+            line_end = buffer.find(b'\n', line_start)
+            if line_end < 0:
+                break
+            if line_end > line_start:
+                yield offset + line_start, buffer[line_start:line_end]
+            line_start = line_end + 1
+        offset += line_start
+        buffer = buffer[line_start:]
+    if buffer:
+        yield offset, buffer
+
+
+__all__ = [
+    "SEALED_BLOCK_ENTRY",
+    "SealedBlock",
+    "BucketLayout",
+    "get_sealed_file_path",
+    "get_sealed_index_path",
+    "read_sealed_blocks",
+    "get_bucket_data_start",
+    "open_bucket",
+    "get_bucket_layout",
+    "get_bucket_size",
+    "iter_bucket_chunks_sync",
+    "iter_bucket_lines_sync",
+    "iter_bucket_chunks",
+    "iter_bucket_lines",
+]
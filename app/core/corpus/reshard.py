@@ -0,0 +1,141 @@
+"""语料数据集重新分桶"""
+
+from pathlib import Path
+import codecs
+import shutil
+import json
+import os
+
+from app.utils.log import logger
+
+from .const import (
+    DATASET_INFO_FILENAME,
+    DATASET_SIDECAR_FILENAMES,
+    BUCKET_FILE_PREFIX,
+    get_bucket_file_name,
+    get_line_bucket_id,
+    parse_bucket_id,
+)
+from .reader import iter_bucket_lines_sync
+
+RESHARD_DIRNAME = '.reshard'
+"""重新分桶临时目录，位于数据集目录下"""
+
+RESHARD_COMMIT_FILENAME = 'COMMIT'
+"""
+重新分桶提交标记文件
+
+该文件写入后新语料桶即视为生效，中断后将继续完成切换；不存在时临时目录将被直接丢弃
+"""
+
+PART_BUFFER_SIZE = 1 << 16
+"""每个分片文件的写缓冲大小(字节)"""
+
+
+def split_bucket_range(src_path: str, start: int, end: int, out_dir: str, bucket_num: int, tag: str) -> int:
+    """
+    将语料桶逻辑字节流 [start, end) 范围内的完整语料按新分桶数拆分到分片文件 `{tag}_{分桶id}.part`
+
+    在进程池中执行，逐行流式处理，内存占用仅为各分片文件的写缓冲；返回处理的字节数
+    """
+    handles = dict()
+    try:
+        for offset, line in iter_bucket_lines_sync(Path(src_path), start, end):
+            if offset + len(line) >= end:
+                break
+            bucket_id = get_line_bucket_id(line, bucket_num)
+            handle = handles.get(bucket_id)
+            if handle is None:
+                handle = handles[bucket_id] = open(
+                    os.path.join(out_dir, f'{tag}_{bucket_id}.part'),
+                    'wb',
+                    buffering=PART_BUFFER_SIZE,
+                )
+            handle.write(line + b'\n')
+    finally:
+        for handle in handles.values():
+            handle.close()
+    return end - start
+
+
+def merge_parts(reshard_dir: Path, bucket_num: int, tags: list[str]) -> list[int]:
+    """按 tags 顺序将分片文件合并为新语料桶文件，返回有语料的新分桶 id 列表"""
+    bucket_ids = []
+    for bucket_id in range(1, bucket_num + 1):
+        part_paths = [reshard_dir / f'{tag}_{bucket_id}.part' for tag in tags]
+        part_paths = [path for path in part_paths if path.is_file()]
+        if not part_paths:
+            continue
+        with open(reshard_dir / get_bucket_file_name(bucket_id), 'wb') as f:
+            f.write(codecs.BOM_UTF8)
+            for part_path in part_paths:
+                with open(part_path, 'rb') as part:
+                    shutil.copyfileobj(part, f, 1 << 20)
+                part_path.unlink()
+            f.flush()
+            os.fsync(f.fileno())
+        bucket_ids.append(bucket_id)
+    return bucket_ids
+
+
+def commit_reshard(dataset_dir: Path, dataset_info_json: str, bucket_ids: list[int]):
+    """写入提交标记后将新语料桶切换至数据集目录"""
+    reshard_dir = dataset_dir / RESHARD_DIRNAME
+    (reshard_dir / DATASET_INFO_FILENAME).write_text(dataset_info_json, encoding='utf-8-sig')
+    commit_path = reshard_dir / RESHARD_COMMIT_FILENAME
+    with open(commit_path.with_name(RESHARD_COMMIT_FILENAME + '.tmp'), 'w', encoding='utf-8') as f:
+        json.dump({'bucket_ids': bucket_ids}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(commit_path.with_name(RESHARD_COMMIT_FILENAME + '.tmp'), commit_path)
+    roll_forward(dataset_dir)
+
+
+def roll_forward(dataset_dir: Path):
+    """
+    根据提交标记完成新语料桶切换，可重复执行
+
+    先删除依赖旧语料桶内容的附属文件，再替换语料桶文件与 INFO.json，附属文件将在下次访问时重建
+    """
+    reshard_dir = dataset_dir / RESHARD_DIRNAME
+    bucket_ids = set(json.loads((reshard_dir / RESHARD_COMMIT_FILENAME).read_text(encoding='utf-8'))['bucket_ids'])
+    for path in dataset_dir.iterdir():
+        if path.name in DATASET_SIDECAR_FILENAMES or (
+            path.name.startswith(BUCKET_FILE_PREFIX) and parse_bucket_id(path.name) is None and path.is_file()
+        ):
+            path.unlink()
+    for bucket_id in bucket_ids:
+        new_path = reshard_dir / get_bucket_file_name(bucket_id)
+        if new_path.is_file():
+            os.replace(new_path, dataset_dir / get_bucket_file_name(bucket_id))
+    for path in dataset_dir.iterdir():
+        bucket_id = parse_bucket_id(path.name)
+        if bucket_id is not None and bucket_id not in bucket_ids:
+            path.unlink()
+    new_info_path = reshard_dir / DATASET_INFO_FILENAME
+    if new_info_path.is_file():
+        os.replace(new_info_path, dataset_dir / DATASET_INFO_FILENAME)
+    shutil.rmtree(reshard_dir)
+
+
+def recover_reshard(dataset_dir: Path) -> bool:
+    """处理中断的重新分桶：已提交的继续完成切换，未提交的丢弃临时目录；返回是否存在中断的重新分桶"""
+    reshard_dir = dataset_dir / RESHARD_DIRNAME
+    if not reshard_dir.is_dir():
+        return False
+    if (reshard_dir / RESHARD_COMMIT_FILENAME).is_file():
+        logger.warning(f"数据集目录 {dataset_dir} 存在已提交但未完成切换的重新分桶，将继续完成。")
+        roll_forward(dataset_dir)
+    else:
+        logger.warning(f"数据集目录 {dataset_dir} 存在未提交的重新分桶临时目录，已丢弃。")
+        shutil.rmtree(reshard_dir)
+    return True
+
+
+__all__ = [
+    "RESHARD_DIRNAME",
+    "split_bucket_range",
+    "merge_parts",
+    "commit_reshard",
+    "recover_reshard",
+]
@@ -0,0 +1,128 @@
+"""
+语料数据集划分与抽样
+
+划分与抽样均只取决于语料行内容与 seed：同一语料在相同比例与 seed 下始终落入同一划分、得到同一抽样键值，
+与分桶数、读取顺序及并行方式无关，重新分桶或追加语料后已有语料的划分结果不变
+"""
+
+from pathlib import Path
+from itertools import chain
+import hashlib
+import heapq
+import json
+import math
+
+from .reader import iter_bucket_lines_sync
+
+SAMPLE_MAX_NUM = 100_000
+"""单次抽样的最大语料条数"""
+
+SPLIT_HASH_DOMAIN = b'split'
+"""划分哈希的域前缀，使划分与抽样键值相互独立"""
+
+SAMPLE_HASH_DOMAIN = b'sample'
+"""抽样键值哈希的域前缀"""
+
+
+def get_hash_point(domain: bytes, seed: int, line: bytes) -> float:
+    """由 seed 与语料行(不含换行符)计算 [0, 1) 内均匀分布的确定性取值"""
+    digest = hashlib.sha256(domain + seed.to_bytes(8, 'big', signed=True) + line).digest()
+    return int.from_bytes(digest[:8]) / (1 << 64)
+
+
+def get_split_bounds(splits: dict[str, float]) -> list[tuple[float, str]]:
+    """将划分比例归一化为 (累计上界, 划分名称) 列表"""
+    if not splits:
+        raise ValueError("划分比例不能为空。")
+    if any(ratio <= 0 or not math.isfinite(ratio) for ratio in splits.values()):
+        raise ValueError("划分比例必须为正数。")
+    total = sum(splits.values())
+    bounds = []
+    cumulative = 0.0
+    for name, ratio in splits.items():
+        cumulative += ratio / total
+        bounds.append((cumulative, name))
+    bounds[-1] = (1.0, bounds[-1][1])
+    return bounds
+
+
+def get_split_name(line: bytes, bounds: list[tuple[float, str]], seed: int) -> str:
+    """获取语料行(不含换行符)所属的划分名称"""
+    point = get_hash_point(SPLIT_HASH_DOMAIN, seed, line)
+    for bound, name in bounds:
+        if point < bound:
+            return name
+    return bounds[-1][1]
+
+
+def get_line_weight(line: bytes, weight_field: str) -> float | None:
+    """读取语料行中以 `.` 分隔路径指定的数值字段作为抽样权重，字段缺失或不是正数时返回 None"""
+    try:
+        value = json.loads(line)
+    except ValueError:
+        return None
+    for key in weight_field.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    if isinstance(value, bool) or not isinstance(value, int | float) or not 0 < value < math.inf:
+        return None
+    return float(value)
+
+
+def sample_bucket_range(
+    src_path: str,
+    start: int,
+    end: int,
+    limit: int,
+    bucket_id: int,
+    num: int,
+    seed: int,
+    bounds: list[tuple[float, str]] | None = None,
+    split: str | None = None,
+    weight_field: str | None = None,
+) -> tuple[list[tuple[float, int, int]], int, dict[str, int]]:
+    """
+    对语料桶中起始偏移位于 [start, end) 的语料行抽样，行内容最多读取至 limit
+
+    在进程池中执行，仅保留键值最大的 num 条，内存占用与语料桶大小无关。键值为 log(u) / 权重(A-ES 加权水塘抽样，
+    不加权时即均匀抽样)，u 由语料内容哈希确定。
+    返回 (键值, 分桶 id, 逻辑偏移) 列表、符合划分与权重条件的语料条数以及各划分的语料条数
+    """
+    heap: list[tuple[float, int, int]] = []
+    eligible_num = 0
+    split_counts: dict[str, int] = dict()
+    for offset, line in iter_bucket_lines_sync(Path(src_path), max(start - 1, 0), limit):
+        if offset < start:
+            continue
+        if offset >= end or offset + len(line) >= limit:
+            break
+        if bounds is not None:
+            name = get_split_name(line, bounds, seed)
+            split_counts[name] = split_counts.get(name, 0) + 1
+            if split is not None and name != split:
+                continue
+        weight = 1.0
+        if weight_field is not None and (weight := get_line_weight(line, weight_field)) is None:
+            continue
+        eligible_num += 1
+        key = math.log(1 - get_hash_point(SAMPLE_HASH_DOMAIN, seed, line)) / weight
+        if len(heap) < num:
+            heapq.heappush(heap, (key, bucket_id, offset))
+        elif key > heap[0][0]:
+            heapq.heapreplace(heap, (key, bucket_id, offset))
+    return heap, eligible_num, split_counts
+
+
+def merge_samples(samples: list[list[tuple[float, int, int]]], num: int) -> list[tuple[int, int]]:
+    """合并各范围的抽样结果，按键值从大到小返回前 num 条 (分桶 id, 逻辑偏移)"""
+    return [(bucket_id, offset) for _, bucket_id, offset in heapq.nlargest(num, chain(*samples))]
+
+
+__all__ = [
+    "SAMPLE_MAX_NUM",
+    "get_split_bounds",
+    "get_split_name",
+    "sample_bucket_range",
+    "merge_samples",
+]
@@ -0,0 +1,159 @@
+"""语料桶校验与修复"""
+
+from typing import NamedTuple
+from pathlib import Path
+import codecs
+import shutil
+import os
+
+from pydantic import ValidationError
+
+from app.common.models.corpus import Corpus
+from app.utils.log import logger
+from app.models.corpus import CorpusScanIssue
+
+from .const import get_line_bucket_id
+from .reader import iter_bucket_lines_sync
+
+SCAN_DIRNAME = '.scan'
+"""修复语料桶时的临时目录，位于数据集目录下"""
+
+SCAN_RANGE_SIZE = 1 << 28
+"""单个校验任务处理的逻辑字节数，较大的语料桶将被切分为多个任务并行校验"""
+
+SCAN_MAX_ISSUES = 100
+"""校验结果中最多记录的问题语料条数"""
+
+MISPLACED_SUFFIX = '.misplaced'
+"""修复时不属于所在分桶的语料的暂存文件后缀"""
+
+PART_BUFFER_SIZE = 1 << 16
+"""修复时每个分片文件的写缓冲大小(字节)"""
+
+
+class ScanRangeResult(NamedTuple):
+    """语料桶范围校验结果"""
+
+    corpus_num: int
+    """有效语料条数"""
+
+    invalid_num: int
+    """格式校验失败的语料条数"""
+
+    misplaced_num: int
+    """不属于该分桶的语料条数"""
+
+    truncated: bool
+    """末尾是否存在不完整的行"""
+
+    issues: list[CorpusScanIssue]
+    """问题语料明细"""
+
+    next_offset: int
+    """首条未处理语料的逻辑偏移，即下一个范围的起始偏移"""
+
+
+def split_scan_ranges(size: int) -> list[tuple[int, int]]:
+    """将大小为 size 的语料桶切分为若干校验范围"""
+    return [(start, min(start + SCAN_RANGE_SIZE, size)) for start in range(0, size, SCAN_RANGE_SIZE)] or [(0, 0)]
+
+
+def scan_bucket_range(
+    src_path: str,
+    start: int,
+    end: int,
+    limit: int,
+    bucket_id: int,
+    bucket_num: int,
+    out_path: str | None = None,
+    final: bool = False,
+) -> ScanRangeResult:
+    """
+    校验语料桶中起始偏移位于 [start, end) 的语料行，行内容最多读取至 limit
+
+    在进程池中执行，逐行流式处理；out_path 不为空时将有效语料写入该文件，不属于该分桶的语料写入其 .misplaced 文件。
+    超出 limit 的不完整行在 final 为真时视为截断，否则留待后续范围处理
+    """
+    corpus_num = invalid_num = misplaced_num = 0
+    truncated = False
+    issues: list[CorpusScanIssue] = []
+    next_offset = end
+    out = misplaced = None
+    if out_path is not None:
+        out = open(out_path, 'wb', buffering=PART_BUFFER_SIZE)
+        misplaced = open(out_path + MISPLACED_SUFFIX, 'wb', buffering=PART_BUFFER_SIZE)
+    try:
+        for offset, line in iter_bucket_lines_sync(Path(src_path), max(start - 1, 0), limit):
+            if offset < start:
+                continue
+            if offset >= end:
+                break
+            if offset + len(line) >= limit:
+                if final:
+                    truncated = True
+                    issues.append(CorpusScanIssue(bucket_id=bucket_id, offset=offset, kind='truncated'))
+                else:
+                    next_offset = offset
+                break
+            try:
+                Corpus.model_validate_json(line)
+            except ValidationError as e:
+                invalid_num += 1
+                if len(issues) < SCAN_MAX_ISSUES:
+                    reason = str(e.errors(include_url=False, include_input=False))
+                    issues.append(CorpusScanIssue(bucket_id=bucket_id, offset=offset, kind='invalid', reason=reason))
+                continue
+            if get_line_bucket_id(line, bucket_num) != bucket_id:
+                misplaced_num += 1
+                if len(issues) < SCAN_MAX_ISSUES:
+                    reason = f"语料应属于分桶 {get_line_bucket_id(line, bucket_num)}。"
+                    issues.append(CorpusScanIssue(bucket_id=bucket_id, offset=offset, kind='misplaced', reason=reason))
+                if misplaced is not None:
+                    misplaced.write(line + b'\n')
+                continue
+            corpus_num += 1
+            if out is not None:
+                out.write(line + b'\n')
+    finally:
+        if out is not None:
+            out.close()
+            misplaced.close()
+    return ScanRangeResult(corpus_num, invalid_num, misplaced_num, truncated, issues, next_offset)
+
+
+def merge_scan_parts(part_paths: list[Path], dest_path: Path, append: bool = False):
+    """按顺序将修复分片文件(及其 .misplaced 文件)合并至 dest_path，新建的 dest_path 以 BOM 开头"""
+    mode = 'ab' if append else 'wb'
+    with open(dest_path, mode) as f, open(str(dest_path) + MISPLACED_SUFFIX, mode) as misplaced:
+        if not append:
+            f.write(codecs.BOM_UTF8)
+        for part_path in part_paths:
+            for src_path, dst in ((part_path, f), (Path(str(part_path) + MISPLACED_SUFFIX), misplaced)):
+                with open(src_path, 'rb') as part:
+                    shutil.copyfileobj(part, dst, 1 << 20)
+                src_path.unlink()
+        for dst in (f, misplaced):
+            dst.flush()
+            os.fsync(dst.fileno())
+
+
+def recover_scan(dataset_dir: Path) -> bool:
+    """丢弃中断的修复留下的临时目录，返回是否存在该目录"""
+    scan_dir = dataset_dir / SCAN_DIRNAME
+    if not scan_dir.is_dir():
+        return False
+    logger.warning(f"数据集目录 {dataset_dir} 存在未完成的语料修复临时目录，已丢弃。")
+    shutil.rmtree(scan_dir)
+    return True
+
+
+__all__ = [
+    "SCAN_DIRNAME",
+    "SCAN_MAX_ISSUES",
+    "MISPLACED_SUFFIX",
+    "ScanRangeResult",
+    "split_scan_ranges",
+    "scan_bucket_range",
+    "merge_scan_parts",
+    "recover_scan",
+]
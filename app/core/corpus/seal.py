@@ -0,0 +1,177 @@
+"""
+语料桶封存
+
+将语料桶 JSONL 文件中的语料按行对齐切分为独立的 gzip 块追加至封存文件，并在块索引中记录各块的逻辑偏移，
+读取时按块随机解压；封存前后语料的逻辑偏移保持不变
+"""
+
+from pathlib import Path
+import codecs
+import shutil
+import zlib
+import os
+
+from app.utils.log import logger
+
+from .const import BUCKET_FILE_PREFIX, BUCKET_FILE_SUFFIX, SEAL_LIVE_SUFFIX, SEALED_INDEX_SUFFIX
+from .lock import bucket_lock
+from .reader import (
+    SEALED_BLOCK_ENTRY,
+    SealedBlock,
+    BucketLayout,
+    get_sealed_file_path,
+    get_sealed_index_path,
+)
+
+SEAL_INDEX_SUFFIX = '.new'
+"""封存时新块索引文件的临时后缀"""
+
+
+def _fsync_write(path: Path, data: bytes):
+    with open(path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def compress_blocks(
+    path: Path,
+    layout: BucketLayout,
+    block_size: int,
+    level: int,
+) -> tuple[list[SealedBlock], int]:
+    """
+    将 JSONL 文件中的完整语料压缩为块并追加至封存文件，返回新块索引项与已压缩范围的结束偏移(文件偏移)
+
+    此时新块尚未写入块索引，对读取方不可见，因此无需暂停写入；末尾可能正在写入的不完整行留待下次封存
+    """
+    sealed_path = get_sealed_file_path(path)
+    comp_offset = layout.blocks[-1].comp_offset + layout.blocks[-1].comp_len if layout.blocks else 0
+    raw_offset = layout.sealed_size
+    position = layout.live_start
+    blocks = []
+    with open(path, 'rb') as src, open(sealed_path, 'r+b' if sealed_path.exists() else 'wb') as dst:
+        dst.truncate(comp_offset)
+        dst.seek(comp_offset)
+        src.seek(position)
+        while position < layout.live_end:
+            raw = src.read(min(block_size, layout.live_end - position))
+            if not raw.endswith(b'\n'):
+                raw += src.readline(layout.live_end - position - len(raw))
+                raw = raw[:raw.rfind(b'\n') + 1]
+            if not raw:
+                break
+            position += len(raw)
+            compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+            comp = compressor.compress(raw) + compressor.flush()
+            dst.write(comp)
+            blocks.append(SealedBlock(raw_offset, comp_offset, len(comp), len(raw), raw.count(b'\n')))
+            raw_offset += len(raw)
+            comp_offset += len(comp)
+        dst.flush()
+        os.fsync(dst.fileno())
+    return blocks, position
+
+
+def _abort_commit(path: Path):
+    """提交出错后立即回滚或完成封存并清理临时文件，避免读取方与写入方一直等待临时文件消失"""
+    try:
+        recover_seal(path)
+    except OSError as e:
+        logger.error(f"语料桶文件 {path} 的封存临时文件清理失败，需重启服务以恢复：{e!r}")
+
+
+def commit_seal(path: Path, blocks: list[SealedBlock], end: int):
+    """
+    提交封存：写入新块索引并以 JSONL 文件 end 之后的内容替换原文件，调用方需保证期间没有写入
+
+    先写入新块索引与新 JSONL 临时文件，以块索引替换作为提交点；进程中断后由 recover_seal 回滚或完成，
+    提交出错时立即回滚或完成后重新抛出异常
+    """
+    with bucket_lock(path):
+        try:
+            _commit_seal(path, blocks, end)
+        except BaseException:
+            _abort_commit(path)
+            raise
+
+
+def _commit_seal(path: Path, blocks: list[SealedBlock], end: int):
+    index_path = get_sealed_index_path(path)
+    new_index_path = index_path.with_name(index_path.name + SEAL_INDEX_SUFFIX)
+    new_live_path = path.with_name(path.name + SEAL_LIVE_SUFFIX)
+    old_index = index_path.read_bytes() if index_path.is_file() else b''
+    old_index = old_index[:len(old_index) - len(old_index) % SEALED_BLOCK_ENTRY.size]
+    _fsync_write(new_index_path, old_index + b''.join(SEALED_BLOCK_ENTRY.pack(*block) for block in blocks))
+    with open(path, 'rb') as src, open(new_live_path, 'wb') as dst:
+        src.seek(end)
+        dst.write(codecs.BOM_UTF8)
+        shutil.copyfileobj(src, dst, 1 << 20)
+        dst.flush()
+        os.fsync(dst.fileno())
+        stat = os.fstat(src.fileno())
+    os.utime(new_live_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(new_index_path, index_path)
+    os.replace(new_live_path, path)
+
+
+def commit_rewrite(path: Path, new_path: Path):
+    """
+    以 new_path(以 BOM 开头)替换语料桶全部内容并移除封存块，调用方需保证期间没有写入
+
+    与 commit_seal 相同以空块索引替换作为提交点，中断后由 recover_seal 回滚或完成，提交出错时立即回滚或完成
+    """
+    with bucket_lock(path):
+        try:
+            _commit_rewrite(path, new_path)
+        except BaseException:
+            _abort_commit(path)
+            raise
+
+
+def _commit_rewrite(path: Path, new_path: Path):
+    index_path = get_sealed_index_path(path)
+    new_index_path = index_path.with_name(index_path.name + SEAL_INDEX_SUFFIX)
+    new_live_path = path.with_name(path.name + SEAL_LIVE_SUFFIX)
+    _fsync_write(new_index_path, b'')
+    os.replace(new_path, new_live_path)
+    os.replace(new_index_path, index_path)
+    os.replace(new_live_path, path)
+    index_path.unlink()
+    get_sealed_file_path(path).unlink(missing_ok=True)
+
+
+def recover_seal(path: Path) -> bool:
+    """处理语料桶中断的封存：未提交的回滚，已提交的完成替换；返回是否存在中断的封存"""
+    index_path = get_sealed_index_path(path)
+    new_index_path = index_path.with_name(index_path.name + SEAL_INDEX_SUFFIX)
+    new_live_path = path.with_name(path.name + SEAL_LIVE_SUFFIX)
+    if new_index_path.exists():
+        new_index_path.unlink()
+        new_live_path.unlink(missing_ok=True)
+        logger.warning(f"语料桶文件 {path} 存在未提交的封存，已回滚。")
+        return True
+    if new_live_path.exists():
+        os.replace(new_live_path, path)
+        logger.warning(f"语料桶文件 {path} 存在已提交但未完成替换的封存，已继续完成。")
+        return True
+    return False
+
+
+def recover_dataset_seal(dataset_dir: Path) -> bool:
+    """处理数据集各语料桶中断的封存，返回是否存在中断的封存"""
+    recovered = False
+    for path in dataset_dir.glob(BUCKET_FILE_PREFIX + '*'):
+        if path.name.endswith(SEAL_LIVE_SUFFIX) or path.name.endswith(SEALED_INDEX_SUFFIX + SEAL_INDEX_SUFFIX):
+            bucket_path = path.with_name(path.name.split('.', 1)[0] + BUCKET_FILE_SUFFIX)
+            recovered = recover_seal(bucket_path) or recovered
+    return recovered
+
+
+__all__ = [
+    "compress_blocks",
+    "commit_seal",
+    "commit_rewrite",
+    "recover_seal",
+    "recover_dataset_seal",
+]
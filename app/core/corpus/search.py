@@ -0,0 +1,255 @@
+"""
+语料全文检索索引
+
+每个数据集对应一个 SQLite FTS5 附属数据库，每个语料桶一张无内容(contentless)全文表，以语料的逻辑偏移作为 rowid；
+检索只返回 (分桶 id, 逻辑偏移)，再直接定位读取语料桶中的语料行。中日韩文字按字符二元组切分，其余文字按单词切分
+"""
+
+from contextlib import contextmanager
+from pathlib import Path
+import sqlite3
+import json
+import re
+
+from app.utils.log import logger
+
+from .const import SEARCH_INDEX_FILENAME, parse_bucket_id
+from .reader import get_bucket_size, iter_bucket_lines_sync
+from .writer import BucketCommitHook
+
+SEARCH_BUSY_TIMEOUT = 30
+"""等待其他连接(线程或进程)释放数据库写锁的最长时间(秒)"""
+
+CJK_CHARS = '぀-ヿ㐀-䶿一-鿿가-힯豈-﫿'
+"""按字符二元组切分的中日韩文字范围"""
+
+TOKEN_PATTERN = re.compile(f'([{CJK_CHARS}]+)|([^\\W_{CJK_CHARS}]+)')
+"""中日韩文字连续段或其他文字单词"""
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    将文本切分为检索词元
+
+    中日韩文字连续段切分为相邻字符二元组并附加末字，使任意连续子串均可按词组匹配、任意单字均可按前缀匹配；
+    其他文字按单词切分并转为小写
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text):
+        run = match[1]
+        if run is None:
+            tokens.append(match[2].lower())
+            continue
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        tokens.append(run[-1])
+    return tokens
+
+
+def build_match_query(query: str) -> str:
+    """
+    将检索文本转换为 FTS5 MATCH 表达式，以空白分隔的各部分须全部命中
+
+    多字中日韩文字段按相邻二元组组成词组，单字按前缀匹配，其他单词精确匹配
+    """
+    parts = []
+    for match in TOKEN_PATTERN.finditer(query):
+        run = match[1]
+        if run is None:
+            parts.append(f'"{match[2].lower()}"')
+        elif len(run) == 1:
+            parts.append(f'"{run}" *')
+        else:
+            parts.append('"' + ' '.join(run[i:i + 2] for i in range(len(run) - 1)) + '"')
+    if not parts:
+        raise ValueError("检索内容不能为空。")
+    return ' AND '.join(parts)
+
+
+def iter_strings(value) -> list[str]:
+    """递归取出 JSON 值中的全部字符串(不含键名)"""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        return [text for item in value.values() for text in iter_strings(item)]
+    if isinstance(value, list):
+        return [text for item in value for text in iter_strings(item)]
+    return []
+
+
+def get_line_tokens(line: bytes) -> str:
+    """语料行(不含换行符)中全部字符串值的检索词元，以空格拼接；无法解析的语料行返回空字符串"""
+    try:
+        value = json.loads(line)
+    except ValueError:
+        return ''
+    return ' '.join(token for text in iter_strings(value) for token in tokenize(text))
+
+
+def get_search_index_path(dataset_dir: Path) -> Path:
+    return dataset_dir / SEARCH_INDEX_FILENAME
+
+
+def get_table_name(bucket_id: int) -> str:
+    return f'bucket_{bucket_id}'
+
+
+class CorpusSearchIndex(BucketCommitHook):
+    """
+    语料全文检索索引
+
+    随语料桶提交增量写入，并在 indexed 表中记录各语料桶已索引的逻辑大小；每次写入均在 IMMEDIATE 事务中先比对该大小，
+    落后时(如附属数据库被删除、其他进程未启用索引)由语料桶文件补齐，因此写入与检索前的追平可以安全地交错进行
+    """
+
+    @contextmanager
+    def _transaction(self, dataset_dir: Path):
+        """在数据集检索数据库上开启写事务，退出时提交或回滚并关闭连接"""
+        conn = sqlite3.connect(get_search_index_path(dataset_dir), timeout=SEARCH_BUSY_TIMEOUT, isolation_level=None)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS indexed (bucket_id INTEGER PRIMARY KEY, size INTEGER NOT NULL)'
+                )
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _get_indexed_size(conn: sqlite3.Connection, bucket_id: int) -> int:
+        row = conn.execute('SELECT size FROM indexed WHERE bucket_id = ?', (bucket_id,)).fetchone()
+        return 0 if row is None else row[0]
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, bucket_id: int, rows: list[tuple[int, str]], end: int):
+        """写入 (逻辑偏移, 检索词元) 并将已索引大小更新为 end"""
+        table_name = get_table_name(bucket_id)
+        conn.execute(f'CREATE VIRTUAL TABLE IF NOT EXISTS {table_name} USING fts5(tokens, content=\'\')')
+        conn.executemany(f'INSERT INTO {table_name} (rowid, tokens) VALUES (?, ?)', rows)
+        conn.execute(
+            'INSERT INTO indexed (bucket_id, size) VALUES (?, ?) '
+            'ON CONFLICT (bucket_id) DO UPDATE SET size = excluded.size',
+            (bucket_id, end),
+        )
+
+    @staticmethod
+    def _reset(conn: sqlite3.Connection, bucket_id: int):
+        conn.execute(f'DROP TABLE IF EXISTS {get_table_name(bucket_id)}')
+        conn.execute('DELETE FROM indexed WHERE bucket_id = ?', (bucket_id,))
+
+    def _index_range(self, conn: sqlite3.Connection, path: Path, bucket_id: int, start: int, end: int) -> int:
+        """由语料桶文件索引 [start, end) 范围内的完整语料行，返回实际索引至的逻辑偏移"""
+        rows = []
+        for offset, line in iter_bucket_lines_sync(path, start, end):
+            if offset + len(line) >= end:
+                break
+            rows.append((offset, get_line_tokens(line)))
+            start = offset + len(line) + 1
+        self._insert(conn, bucket_id, rows, start)
+        return start
+
+    def committed(self, path: Path, lines: list[bytes], offsets: list[int]):
+        bucket_id = parse_bucket_id(path.name)
+        end = offsets[-1] + len(lines[-1])
+        with self._transaction(path.parent) as conn:
+            size = self._get_indexed_size(conn, bucket_id)
+            if size >= end:
+                return
+            if size < offsets[0]:
+                size = self._index_range(conn, path, bucket_id, size, offsets[0])
+            rows = [
+                (offset, get_line_tokens(line.rstrip(b'\n'))) for line, offset in zip(lines, offsets) if offset >= size
+            ]
+            self._insert(conn, bucket_id, rows, end)
+
+    def catch_up(self, path: Path, end: int):
+        """将语料桶已索引范围追平至逻辑偏移 end，检索前调用；附属数据库缺失时即为全量重建"""
+        bucket_id = parse_bucket_id(path.name)
+        with self._transaction(path.parent) as conn:
+            size = self._get_indexed_size(conn, bucket_id)
+            if size > end:
+                logger.warning(f"语料桶文件 {path} 的检索索引超出语料桶大小，将重新构建。")
+                self._reset(conn, bucket_id)
+                size = 0
+            if size < end:
+                self._index_range(conn, path, bucket_id, size, end)
+
+    def rebuild(self, path: Path):
+        """由语料桶文件重建其检索索引"""
+        bucket_id = parse_bucket_id(path.name)
+        with self._transaction(path.parent) as conn:
+            self._reset(conn, bucket_id)
+            self._index_range(conn, path, bucket_id, 0, get_bucket_size(path))
+        logger.debug(f"语料桶文件 {path} 检索索引重建完成。")
+
+    def discard(self, path: Path):
+        if not get_search_index_path(path.parent).is_file():
+            return
+        with self._transaction(path.parent) as conn:
+            self._reset(conn, parse_bucket_id(path.name))
+
+    def search(
+        self,
+        dataset_dir: Path,
+        match_query: str,
+        bucket_ids: list[int],
+        limit: int,
+        after: tuple[int, int] | None = None,
+    ) -> list[tuple[int, int]]:
+        """
+        按分桶 id、逻辑偏移顺序检索命中的语料位置，调用方需先追平各语料桶
+
+        after 为上一页最后一条命中的 (分桶 id, 逻辑偏移)，返回至多 limit 条 (分桶 id, 逻辑偏移)
+        """
+        hits = []
+        conn = sqlite3.connect(get_search_index_path(dataset_dir), timeout=SEARCH_BUSY_TIMEOUT)
+        try:
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            for bucket_id in sorted(bucket_ids):
+                if after is not None and bucket_id < after[0]:
+                    continue
+                table_name = get_table_name(bucket_id)
+                if table_name not in tables:
+                    continue
+                start = after[1] if after is not None and bucket_id == after[0] else -1
+                rows = conn.execute(
+                    f'SELECT rowid FROM {table_name} WHERE {table_name} MATCH ? AND rowid > ? ORDER BY rowid LIMIT ?',
+                    (match_query, start, limit - len(hits)),
+                )
+                hits.extend((bucket_id, row[0]) for row in rows)
+                if len(hits) >= limit:
+                    break
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"检索表达式无效：{e}")
+        finally:
+            conn.close()
+        return hits
+
+
+def format_search_cursor(bucket_id: int, offset: int) -> str:
+    """将检索命中位置序列化为 `分桶id:逻辑偏移` 形式的分页游标"""
+    return f"{bucket_id}:{offset}"
+
+
+def parse_search_cursor(text: str) -> tuple[int, int]:
+    """解析 format_search_cursor 序列化的分页游标"""
+    try:
+        bucket_id, offset = text.split(':')
+        return int(bucket_id), int(offset)
+    except ValueError:
+        raise ValueError(f"检索游标 {text} 格式错误。")
+
+
+__all__ = [
+    "CorpusSearchIndex",
+    "tokenize",
+    "build_match_query",
+    "format_search_cursor",
+    "parse_search_cursor",
+]
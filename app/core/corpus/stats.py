@@ -0,0 +1,312 @@
+"""语料数据集统计信息的增量维护"""
+
+from threading import RLock, Timer
+from datetime import datetime
+from pathlib import Path
+import json
+import os
+
+from app.utils.log import logger
+from app.models.corpus import BucketStats
+
+from .const import BUCKET_FILE_PREFIX, BUCKET_FILE_SUFFIX, STATS_FILENAME, get_bucket_file_name, parse_bucket_id
+from .lock import is_locking, stats_lock
+from .reader import get_bucket_size, iter_bucket_chunks_sync, open_bucket
+from .writer import BucketCommitHook
+
+SCAN_CHUNK_SIZE = 1 << 20
+"""扫描语料桶文件时单次读取的字节数"""
+
+
+def scan_bucket_stats(path: Path) -> BucketStats:
+    """扫描语料桶文件，统计完整语料行数、逻辑大小与最后修改时间；已封存部分的行数直接取自块索引"""
+    bucket_id = parse_bucket_id(path.name)
+    layout, f = open_bucket(path)
+    if f is None and not layout.blocks:
+        return BucketStats(bucket_id=bucket_id)
+    corpus_num = sum(block.line_num for block in layout.blocks)
+    last_write_timestamp = None
+    if f is not None:
+        with f:
+            last_write_timestamp = int(os.fstat(f.fileno()).st_mtime * 1000)
+            while chunk := f.read(SCAN_CHUNK_SIZE):
+                corpus_num += chunk.count(b'\n')
+    return BucketStats(
+        bucket_id=bucket_id,
+        corpus_num=corpus_num,
+        size=layout.size,
+        sealed_size=layout.sealed_size,
+        last_write_timestamp=last_write_timestamp,
+    )
+
+
+def count_bucket_lines(path: Path, start: int, end: int) -> int:
+    """统计语料桶逻辑字节流 [start, end) 范围内的语料行数，范围需以完整行为边界"""
+    return sum(chunk.count(b'\n') for chunk in iter_bucket_chunks_sync(path, start, end))
+
+
+class CorpusStatsIndex(BucketCommitHook):
+    """
+    语料数据集统计信息索引
+
+    随语料桶提交在内存中增量更新各桶语料条数、大小与最后写入时间，每隔 flush_interval 秒及关闭时以原子替换的方式写回 STATS.json；
+    首次载入时校验各桶逻辑大小，不一致(如写入后统计写回前崩溃)的语料桶将被重新扫描；
+    多进程写入时各进程补数已知大小之后其他进程追加的语料行，写回前在统计信息文件锁内与 STATS.json 合并
+    """
+
+    stats_map: dict[Path, dict[int, BucketStats]]
+    """数据集目录与各桶统计信息映射表"""
+
+    signatures: dict[Path, tuple[int, int, int] | None]
+    """数据集目录与最近一次读取或写入的 STATS.json (inode, 修改时间, 大小) 映射表，变化时说明已被其他进程更新"""
+
+    dirty: dict[Path, set[int]]
+    """数据集目录与内存中已更新但尚未写回 STATS.json 的分桶 id 映射表"""
+
+    inodes: dict[Path, int | None]
+    """语料桶文件路径与本进程最近一次更新其统计信息时的文件 inode 映射表，仅多进程写入时用于发现语料桶已被其他进程改写"""
+
+    flush_interval: float
+    """统计信息写回 STATS.json 的最大间隔(秒)，为 0 时每次提交后立即写回"""
+
+    def __init__(self, flush_interval: float = 0):
+        self.stats_map = dict()
+        self.signatures = dict()
+        self.dirty = dict()
+        self.inodes = dict()
+        self.flush_interval = flush_interval
+        self._lock = RLock()
+        self._timer: Timer | None = None
+
+    def get(self, dataset_dir: Path, bucket_num: int) -> list[BucketStats]:
+        """获取数据集 1 ~ bucket_num 各桶统计信息，包含本进程尚未写回的更新"""
+        with stats_lock(dataset_dir), self._lock:
+            bucket_stats_map = self._get_map(dataset_dir, bucket_num)
+            return [
+                self._get_bucket(dataset_dir, bucket_stats_map, bucket_id) for bucket_id in range(1, bucket_num + 1)
+            ]
+
+    def committed(self, path: Path, lines: list[bytes], offsets: list[int]):
+        """
+        在内存中累加该批语料，不读写 STATS.json
+
+        在语料桶文件锁内调用，已知大小之前的数据不会改变：已知大小小于本批起始偏移时，
+        缺口为其他进程追加的语料行，直接由语料桶文件补数；语料桶文件已被替换时重新扫描
+        """
+        dataset_dir = path.parent
+        bucket_id = parse_bucket_id(path.name)
+        inode = self._get_inode(path) if is_locking() else None
+        if dataset_dir not in self.stats_map:
+            with stats_lock(dataset_dir), self._lock:
+                self._get_map(dataset_dir)
+        with self._lock:
+            bucket_stats_map = self.stats_map.setdefault(dataset_dir, dict())
+            bucket_stats = self._get_bucket(dataset_dir, bucket_stats_map, bucket_id)
+            end = offsets[-1] + len(lines[-1])
+            if self.inodes.get(path, inode) != inode:
+                bucket_stats = bucket_stats_map[bucket_id] = scan_bucket_stats(path)
+            elif bucket_stats.size <= offsets[0]:
+                if bucket_stats.size < offsets[0]:
+                    bucket_stats.corpus_num += count_bucket_lines(path, bucket_stats.size, offsets[0])
+                bucket_stats.corpus_num += len(lines)
+                bucket_stats.size = end
+            elif bucket_stats.size != end:
+                bucket_stats = bucket_stats_map[bucket_id] = scan_bucket_stats(path)
+            bucket_stats.last_write_timestamp = int(datetime.now().timestamp() * 1000)
+            if inode is not None:
+                self.inodes[path] = inode
+            self.dirty.setdefault(dataset_dir, set()).add(bucket_id)
+            if self.flush_interval > 0:
+                self._schedule_flush()
+        if self.flush_interval <= 0:
+            self.flush(dataset_dir)
+
+    def rebuild(self, path: Path):
+        """扫描语料桶文件，重建其统计信息并立即写回"""
+        bucket_stats = scan_bucket_stats(path)
+        inode = self._get_inode(path) if is_locking() else None
+        with stats_lock(path.parent), self._lock:
+            bucket_stats_map = self._get_map(path.parent)
+            bucket_stats_map[bucket_stats.bucket_id] = bucket_stats
+            if inode is not None:
+                self.inodes[path] = inode
+            else:
+                self.inodes.pop(path, None)
+            self._dump(path.parent, bucket_stats_map)
+        logger.debug(f"语料桶文件 {path} 统计信息重建完成。")
+
+    def discard(self, path: Path):
+        with stats_lock(path.parent), self._lock:
+            self.inodes.pop(path, None)
+            if path.parent in self.stats_map:
+                self._get_map(path.parent)
+            bucket_stats_map = self.stats_map.get(path.parent)
+            if bucket_stats_map is not None and bucket_stats_map.pop(parse_bucket_id(path.name), None) is not None:
+                self._dump(path.parent, bucket_stats_map)
+
+    def flush(self, dataset_dir: Path | None = None):
+        """将所有(或某数据集)内存中尚未写回的统计信息写回 STATS.json"""
+        with self._lock:
+            dataset_dirs = list(self.dirty) if dataset_dir is None else [dataset_dir]
+        for dataset_dir in dataset_dirs:
+            with stats_lock(dataset_dir), self._lock:
+                if not self.dirty.get(dataset_dir):
+                    continue
+                bucket_stats_map = self._get_map(dataset_dir)
+                if self.dirty.get(dataset_dir):
+                    self._dump(dataset_dir, bucket_stats_map)
+
+    def close(self):
+        """停止定时写回，并写回全部尚未写回的统计信息"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        self.flush()
+
+    def drop(self, dataset_dir: Path):
+        """写回并释放数据集在内存中的统计信息"""
+        self.flush(dataset_dir)
+        with self._lock:
+            self.stats_map.pop(dataset_dir, None)
+            self.signatures.pop(dataset_dir, None)
+            self.dirty.pop(dataset_dir, None)
+            for path in [path for path in self.inodes if path.parent == dataset_dir]:
+                del self.inodes[path]
+
+    def _schedule_flush(self):
+        """flush_interval 秒后写回统计信息，已有待执行的写回时不重复安排，需在 self._lock 内调用"""
+        if self._timer is None:
+            self._timer = Timer(self.flush_interval, self._flush_later)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_later(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"数据集统计信息写回失败：{e!r}")
+
+    def _get_map(self, dataset_dir: Path, bucket_num: int = 0) -> dict[int, BucketStats]:
+        """
+        获取数据集各桶统计信息，未载入时载入，STATS.json 已被其他进程更新时合并，需在统计信息文件锁内调用
+
+        合并时不再校验各桶大小，否则其他进程正在提交的语料桶将被误判为不一致而反复扫描
+        """
+        bucket_stats_map = self.stats_map.get(dataset_dir)
+        if bucket_stats_map is None:
+            bucket_stats_map = self._load(dataset_dir, bucket_num)
+        elif is_locking() and self.signatures.get(dataset_dir) != self._get_signature(dataset_dir):
+            self._merge(dataset_dir, bucket_stats_map)
+        return bucket_stats_map
+
+    def _merge(self, dataset_dir: Path, bucket_stats_map: dict[int, BucketStats]):
+        """
+        将其他进程写回的 STATS.json 合并至内存
+
+        双方均为自语料桶起始处的全量统计，本进程尚未写回的分桶保留大小更大的一方；
+        该语料桶文件在本进程更新后已被其他进程替换(重新分桶、校验修复)时以 STATS.json 为准
+        """
+        loaded = self._read(dataset_dir)
+        dirty = self.dirty.setdefault(dataset_dir, set())
+        for bucket_id in list(bucket_stats_map):
+            if bucket_id not in loaded and bucket_id not in dirty:
+                del bucket_stats_map[bucket_id]
+        for bucket_id, bucket_stats in loaded.items():
+            current = bucket_stats_map.get(bucket_id)
+            path = dataset_dir / get_bucket_file_name(bucket_id)
+            if (
+                bucket_id in dirty
+                and current is not None
+                and current.size >= bucket_stats.size
+                and self.inodes.get(path) in (None, self._get_inode(path))
+            ):
+                continue
+            bucket_stats_map[bucket_id] = bucket_stats
+            dirty.discard(bucket_id)
+            self.inodes.pop(path, None)
+
+    @staticmethod
+    def _get_signature(dataset_dir: Path) -> tuple[int, int, int] | None:
+        try:
+            stat = os.stat(dataset_dir / STATS_FILENAME)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def _get_inode(path: Path) -> int | None:
+        try:
+            return os.stat(path).st_ino
+        except FileNotFoundError:
+            return None
+
+    def _get_bucket(self, dataset_dir: Path, bucket_stats_map: dict[int, BucketStats], bucket_id: int) -> BucketStats:
+        """获取某桶统计信息，不存在时(如语料桶被改写后)扫描语料桶文件补全"""
+        bucket_stats = bucket_stats_map.get(bucket_id)
+        if bucket_stats is None:
+            bucket_stats = scan_bucket_stats(dataset_dir / get_bucket_file_name(bucket_id))
+            bucket_stats_map[bucket_id] = bucket_stats
+        return bucket_stats
+
+    def _read(self, dataset_dir: Path) -> dict[int, BucketStats]:
+        """读取 STATS.json 并记录其签名，文件不存在或损坏时返回空表"""
+        bucket_stats_map: dict[int, BucketStats] = dict()
+        self.signatures[dataset_dir] = self._get_signature(dataset_dir)
+        try:
+            data = json.loads((dataset_dir / STATS_FILENAME).read_text(encoding='utf-8-sig'))
+            for item in data.get('buckets', []):
+                bucket_stats = BucketStats.model_validate(item)
+                bucket_stats_map[bucket_stats.bucket_id] = bucket_stats
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            logger.warning(f"数据集目录 {dataset_dir} 中的 {STATS_FILENAME} 文件损坏，将重新扫描。")
+            bucket_stats_map.clear()
+        return bucket_stats_map
+
+    def _load(self, dataset_dir: Path, bucket_num: int) -> dict[int, BucketStats]:
+        bucket_stats_map = self._read(dataset_dir)
+        bucket_ids = set(bucket_stats_map.keys()) | set(range(1, bucket_num + 1))
+        bucket_ids |= {
+            bucket_id
+            for path in dataset_dir.glob(BUCKET_FILE_PREFIX + '*' + BUCKET_FILE_SUFFIX)
+            if (bucket_id := parse_bucket_id(path.name)) is not None
+        }
+        repaired = False
+        for bucket_id in bucket_ids:
+            path = dataset_dir / get_bucket_file_name(bucket_id)
+            size = get_bucket_size(path)
+            bucket_stats = bucket_stats_map.get(bucket_id)
+            if bucket_stats is not None and bucket_stats.size == size:
+                continue
+            if bucket_stats is None and size == 0:
+                bucket_stats_map[bucket_id] = BucketStats(bucket_id=bucket_id)
+                continue
+            bucket_stats_map[bucket_id] = scan_bucket_stats(path)
+            repaired = True
+        if repaired:
+            logger.warning(f"数据集目录 {dataset_dir} 统计信息与语料桶文件不一致，已重新扫描修复。")
+            self._dump(dataset_dir, bucket_stats_map)
+        self.stats_map[dataset_dir] = bucket_stats_map
+        return bucket_stats_map
+
+    def _dump(self, dataset_dir: Path, bucket_stats_map: dict[int, BucketStats]):
+        """将统计信息同步至磁盘后原子替换 STATS.json，并清除该数据集的未写回标记"""
+        stats_path = dataset_dir / STATS_FILENAME
+        tmp_path = stats_path.with_name(STATS_FILENAME + '.tmp')
+        buckets = [bucket_stats_map[bucket_id].model_dump() for bucket_id in sorted(bucket_stats_map)]
+        with open(tmp_path, 'w', encoding='utf-8-sig') as f:
+            json.dump({'buckets': buckets}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, stats_path)
+        self.signatures[dataset_dir] = self._get_signature(dataset_dir)
+        self.dirty.pop(dataset_dir, None)
+
+
+__all__ = [
+    "CorpusStatsIndex",
+]
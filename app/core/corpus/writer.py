@@ -0,0 +1,421 @@
+"""语料桶文件写入器，为每个语料桶维持常驻文件句柄并分组提交写入"""
+
+from contextlib import asynccontextmanager
+from asyncio import Event, Future, Task
+from pathlib import Path
+from typing import Awaitable, BinaryIO, Callable
+import asyncio
+import codecs
+import time
+import json
+import os
+
+from app.utils.config import settings
+from app.utils.log import logger
+from app.utils.metrics import corpus_lock_wait, corpus_write, corpus_written_lines
+
+from .const import DATASET_INFO_FILENAME
+from .lock import bucket_lock, is_locking
+from .reader import get_bucket_layout
+
+
+class BucketRoutingError(ValueError):
+    """语料行按过期的分桶数路由，其他进程已重新分桶"""
+
+
+RerouteCallback = Callable[[Path, list[tuple[bytes, Future]]], Awaitable[None]]
+"""按过期分桶数路由的一批 (语料行, 等待者) 的异步重新提交回调，语料行自带换行符"""
+
+
+def read_bucket_num(dataset_dir: Path) -> int | None:
+    """读取数据集 INFO.json 中的分桶数，文件不存在时返回 None"""
+    try:
+        return json.loads((dataset_dir / DATASET_INFO_FILENAME).read_text(encoding='utf-8-sig'))['bucket_num']
+    except FileNotFoundError:
+        return None
+
+
+class BucketCommitHook:
+    """
+    语料桶写入钩子
+
+    在写入线程中于每批语料提交前后被调用，用于维护去重、统计、索引等语料桶附属文件
+    """
+
+    def check(self, path: Path, lines: list[bytes]) -> list[Exception | None]:
+        """提交前检查一批语料行，返回与 lines 等长的列表，非 None 的语料行将被拒绝写入"""
+        return [None] * len(lines)
+
+    def committed(self, path: Path, lines: list[bytes], offsets: list[int]):
+        """语料行写入后调用，offsets 为各语料行在语料桶逻辑字节流中的起始偏移"""
+
+    def rebuild(self, path: Path):
+        """由语料桶文件全量重建附属数据，调用方需保证期间没有写入"""
+
+    def discard(self, path: Path):
+        """语料桶文件被移除后清理其附属数据"""
+
+
+class BucketWriter:
+    """
+    单个语料桶文件写入器
+
+    写入请求先进入内存队列，由后台任务合并为一次写入提交，提交完成后再通知各写入方
+    """
+
+    path: Path
+    """语料桶文件路径"""
+
+    batch_size: int
+    """单次提交最大语料条数"""
+
+    delay: float
+    """凑批最大等待时间(秒)"""
+
+    durability: str
+    """提交持久化级别"""
+
+    hooks: list[BucketCommitHook]
+    """写入钩子"""
+
+    gate: Event
+    """写入闸门，关闭时暂停提交"""
+
+    _file: BinaryIO | None
+    """常驻文件句柄"""
+
+    _offset_base: int
+    """文件偏移与逻辑偏移之差，打开文件时由封存块索引与 BOM 确定"""
+
+    _pending: list[bytes]
+    """待提交语料行"""
+
+    _waiters: list[Future]
+    """待提交语料行对应的等待者"""
+
+    _routes: list[int | None]
+    """待提交语料行路由时所依据的分桶数"""
+
+    _bucket_num: int | None
+    """打开语料桶文件时在文件锁内读取的数据集分桶数，仅多进程写入时用于校验路由"""
+
+    reroute: RerouteCallback | None
+    """按过期分桶数路由的语料行的重新提交回调，为 None 时该语料行以 BucketRoutingError 失败"""
+
+    def __init__(
+        self,
+        path: Path,
+        batch_size: int,
+        delay: float,
+        durability: str,
+        hooks: list[BucketCommitHook] | None = None,
+        gate: Event | None = None,
+        reroute: RerouteCallback | None = None,
+    ):
+        self.path = path
+        self.batch_size = max(batch_size, 1)
+        self.delay = delay
+        self.durability = durability
+        self.hooks = hooks or []
+        if gate is None:
+            gate = Event()
+            gate.set()
+        self.gate = gate
+        self.reroute = reroute
+        self._file = None
+        self._offset_base = 0
+        self._pending = []
+        self._waiters = []
+        self._routes = []
+        self._bucket_num = None
+        self._wakeup = Event()
+        self._full = Event()
+        self._idle = Event()
+        self._idle.set()
+        self._released = Event()
+        self._released.set()
+        self._task: Task | None = None
+        labels = (path.parent.name, path.stem)
+        self._lock_wait_metric = corpus_lock_wait.labels(*labels)
+        self._write_metric = corpus_write.labels(*labels)
+        self._written_metric = corpus_written_lines.labels(*labels)
+
+    @property
+    def pending(self) -> int:
+        """待提交语料条数"""
+        return len(self._pending)
+
+    async def write(self, line: bytes, bucket_num: int | None = None):
+        """写入一行语料(需自带换行符)，在所在批次提交后返回"""
+        await self.submit(line, bucket_num)
+
+    def submit(self, line: bytes, bucket_num: int | None = None) -> Future:
+        """
+        提交一行语料(需自带换行符)至写入队列，返回在所在批次提交后完成的 Future
+
+        bucket_num 为路由该语料行时所依据的分桶数，多进程写入时与文件锁内读取的分桶数不一致的语料行不会写入
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(line)
+        self._waiters.append(future)
+        self._routes.append(bucket_num)
+        self._idle.clear()
+        if len(self._pending) >= self.batch_size:
+            self._full.set()
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return future
+
+    async def flush(self, sync: bool = False):
+        """等待已入队语料全部提交，sync 为真时额外将缓冲区写入操作系统"""
+        if not self._idle.is_set():
+            self._wakeup.set()
+            await self._idle.wait()
+        if sync and self._file is not None:
+            await asyncio.to_thread(self._file.flush)
+
+    def take_pending(self) -> list[tuple[bytes, Future]]:
+        """取出尚未提交的语料行及其等待者，用于改写路由后重新提交"""
+        pending = list(zip(self._pending, self._waiters))
+        self._pending, self._waiters, self._routes = [], [], []
+        return pending
+
+    async def release(self):
+        """等待进行中的提交完成后关闭文件句柄，闸门关闭期间可用于让出语料桶文件"""
+        await self._released.wait()
+        if self._file is not None:
+            file, self._file = self._file, None
+            await asyncio.to_thread(file.close)
+
+    async def close(self):
+        """提交剩余语料并关闭文件句柄"""
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._file is not None:
+            file, self._file = self._file, None
+            await asyncio.to_thread(file.close)
+
+    async def _run(self):
+        while True:
+            if not self._pending:
+                self._idle.set()
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            if self.delay > 0 and len(self._pending) < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.delay)
+                except TimeoutError:
+                    pass
+            self._full.clear()
+            await self.gate.wait()
+            self._released.clear()
+            lines, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+            waiters, self._waiters = self._waiters[:self.batch_size], self._waiters[self.batch_size:]
+            routes, self._routes = self._routes[:self.batch_size], self._routes[self.batch_size:]
+            try:
+                errors = await asyncio.to_thread(self._commit, lines, routes)
+            except Exception as e:
+                logger.error(f"语料桶文件 {self.path} 写入失败：{e!r}")
+                errors = [e] * len(waiters)
+            finally:
+                self._released.set()
+            rerouted = []
+            for line, waiter, error in zip(lines, waiters, errors):
+                if waiter.done():
+                    continue
+                if error is None:
+                    waiter.set_result(None)
+                elif isinstance(error, BucketRoutingError) and self.reroute is not None:
+                    rerouted.append((line, waiter))
+                else:
+                    waiter.set_exception(error)
+            if rerouted:
+                await self.reroute(self.path, rerouted)
+
+    def _commit(self, lines: list[bytes], routes: list[int | None]) -> list[Exception | None]:
+        """
+        在语料桶文件锁内检查并追加一批语料行
+
+        多进程写入同一语料桶时，检查、追加与钩子更新均在锁内完成；锁内以文件实际末尾计算偏移，
+        并在释放锁前写入操作系统，保证各进程的批次整体相邻而不会交错出半行。等待锁与锁内的耗时分别计入运行指标
+        """
+        start = time.perf_counter()
+        with bucket_lock(self.path):
+            locked = time.perf_counter()
+            try:
+                return self._commit_locked(lines, routes)
+            finally:
+                self._lock_wait_metric.observe(locked - start)
+                self._write_metric.observe(time.perf_counter() - locked)
+
+    def _commit_locked(self, lines: list[bytes], routes: list[int | None]) -> list[Exception | None]:
+        """
+        检查并追加一批语料行，需持有语料桶文件锁
+
+        多进程写入时，语料桶文件被其他进程替换(重新分桶或修复)后在锁内重新读取分桶数，
+        路由所依据的分桶数与之不一致的语料行以 BucketRoutingError 拒绝，由调用方按新分桶数重新提交
+        """
+        errors: list[Exception | None] = [None] * len(lines)
+        locking = is_locking()
+        if locking and (self._file is None or not self._is_current()):
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._bucket_num = read_bucket_num(self.path.parent)
+        if locking and self._bucket_num is not None:
+            for i, bucket_num in enumerate(routes):
+                if bucket_num is not None and bucket_num != self._bucket_num:
+                    errors[i] = BucketRoutingError("数据集已重新分桶，语料需按新分桶数重新提交。")
+        indexes = [i for i, error in enumerate(errors) if error is None]
+        checked = [lines[i] for i in indexes]
+        for hook in self.hooks:
+            for i, error in zip(indexes, hook.check(self.path, checked)):
+                if error is not None and errors[i] is None:
+                    errors[i] = error
+        lines = [line for line, error in zip(lines, errors) if error is None]
+        if not lines:
+            return errors
+        if self._file is None:
+            layout = get_bucket_layout(self.path)
+            self._file = open(self.path, 'ab')
+            if self._file.tell() == 0:
+                self._file.write(codecs.BOM_UTF8)
+                layout = layout._replace(live_start=len(codecs.BOM_UTF8))
+            self._offset_base = layout.sealed_size - layout.live_start
+        if locking:
+            offset = self._file.seek(0, os.SEEK_END) + self._offset_base
+        else:
+            offset = self._file.tell() + self._offset_base
+        self._file.write(b''.join(lines))
+        if self.durability != 'none' or locking:
+            self._file.flush()
+        if self.durability == 'fsync':
+            os.fsync(self._file.fileno())
+        offsets = []
+        for line in lines:
+            offsets.append(offset)
+            offset += len(line)
+        for hook in self.hooks:
+            hook.committed(self.path, lines, offsets)
+        self._written_metric.inc(len(lines))
+        return errors
+
+    def _is_current(self) -> bool:
+        """常驻文件句柄是否仍指向语料桶文件，其他进程封存或改写语料桶后需重新打开"""
+        try:
+            return os.stat(self.path).st_ino == os.fstat(self._file.fileno()).st_ino
+        except FileNotFoundError:
+            return False
+
+
+class BucketWriterPool:
+    """语料桶文件写入器池，按文件路径复用写入器"""
+
+    writers: dict[Path, BucketWriter]
+    """语料桶文件路径与写入器映射表"""
+
+    hooks: list[BucketCommitHook]
+    """各写入器共用的写入钩子"""
+
+    gates: dict[Path, Event]
+    """数据集目录与写入闸门映射表"""
+
+    reroute: RerouteCallback | None
+    """各写入器共用的重新提交回调"""
+
+    def __init__(
+        self,
+        hooks: list[BucketCommitHook] | None = None,
+        reroute: RerouteCallback | None = None,
+    ):
+        self.writers = dict()
+        self.hooks = hooks or []
+        self.gates = dict()
+        self.reroute = reroute
+
+    def get_gate(self, dataset_dir: Path) -> Event:
+        gate = self.gates.get(dataset_dir)
+        if gate is None:
+            gate = self.gates[dataset_dir] = Event()
+            gate.set()
+        return gate
+
+    def get_writer(self, path: Path) -> BucketWriter:
+        writer = self.writers.get(path)
+        if writer is None:
+            writer = self.writers[path] = BucketWriter(
+                path,
+                batch_size=settings.corpus_write_batch_size,
+                delay=settings.corpus_write_delay,
+                durability=settings.corpus_write_durability,
+                hooks=self.hooks,
+                gate=self.get_gate(path.parent),
+                reroute=self.reroute,
+            )
+        return writer
+
+    async def write(self, path: Path, line: bytes, bucket_num: int | None = None):
+        await self.get_writer(path).write(line, bucket_num)
+
+    def submit(self, path: Path, line: bytes, bucket_num: int | None = None) -> Future:
+        return self.get_writer(path).submit(line, bucket_num)
+
+    def get_queue_depths(self) -> dict[str, int]:
+        """各语料桶写入器的待提交语料条数，以 `数据集名称/分桶文件名` 为键"""
+        return {f"{path.parent.name}/{path.name}": writer.pending for path, writer in list(self.writers.items())}
+
+    async def flush(self, dataset_dir: Path | None = None, sync: bool = False):
+        """提交所有(或某数据集目录下)写入器的剩余语料"""
+        await asyncio.gather(
+            *(
+                writer.flush(sync=sync)
+                for path, writer in list(self.writers.items())
+                if dataset_dir is None or path.parent == dataset_dir
+            )
+        )
+
+    @asynccontextmanager
+    async def exclusive(self, dataset_dir: Path):
+        """
+        独占某数据集目录下的语料桶文件
+
+        进入时等待进行中的提交完成并关闭文件句柄，期间写入请求仅入队而不提交，退出后恢复提交
+        """
+        gate = self.get_gate(dataset_dir)
+        while not gate.is_set():
+            await gate.wait()
+        gate.clear()
+        try:
+            await asyncio.gather(
+                *(writer.release() for path, writer in list(self.writers.items()) if path.parent == dataset_dir)
+            )
+            yield
+        finally:
+            gate.set()
+
+    def take_pending(self, dataset_dir: Path) -> list[tuple[bytes, Future]]:
+        """取出某数据集目录下全部写入器尚未提交的语料行及其等待者"""
+        pending = []
+        for path, writer in self.writers.items():
+            if path.parent == dataset_dir:
+                pending.extend(writer.take_pending())
+        return pending
+
+    async def close(self, dataset_dir: Path | None = None):
+        """关闭所有(或某数据集目录下)写入器"""
+        paths = [path for path in self.writers if dataset_dir is None or path.parent == dataset_dir]
+        await asyncio.gather(*(self.writers.pop(path).close() for path in paths))
+        if paths:
+            logger.debug(f"已关闭 {len(paths)} 个语料桶文件写入器。")
+
+
+__all__ = [
+    "BucketCommitHook",
+    "BucketRoutingError",
+    "BucketWriter",
+    "BucketWriterPool",
+]
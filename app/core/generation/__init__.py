@@ -0,0 +1,46 @@
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import select
+from sqlalchemy.sql import Select
+
+from app.models.db import Generation
+from app.core.query import apply_keyset, apply_time_range, query_all
+
+from .export import *
+
+
+def select_generations(
+    scene_id: int | None = None,
+    interaction_id: int | None = None,
+    start_timestamp: int | None = None,
+    end_timestamp: int | None = None,
+    after: tuple[int, int] | None = None,
+    desc: bool = False,
+) -> Select:
+    """
+    构建生成内容查询语句，按 (timestamp, id) 键集分页排序
+
+    scene_id 与 interaction_id 至少指定其一，以命中 (scene_id, timestamp) 或 interaction_id 索引
+    """
+    if scene_id is None and interaction_id is None:
+        raise ValueError("scene_id 与 interaction_id 至少需要指定其一。")
+    statement = select(Generation)
+    if scene_id is not None:
+        statement = statement.where(Generation.scene_id == scene_id)
+    if interaction_id is not None:
+        statement = statement.where(Generation.interaction_id == interaction_id)
+    statement = apply_time_range(statement, Generation.timestamp, start_timestamp, end_timestamp)
+    return apply_keyset(statement, Generation.timestamp, Generation.id, after, desc)
+
+
+async def query_generations(session: AsyncSession, limit: int = 100, **filters) -> list[Generation]:
+    """查询生成内容，filters 同 select_generations"""
+    return await query_all(session, select_generations(**filters), limit)
+
+
+__all__ = [
+    "select_generations",
+    "query_generations",
+    "GENERATION_EXPORT_FILENAME",
+    "GenerationCorpusExporter",
+    "generation_corpus_exporter",
+]
@@ -0,0 +1,180 @@
+"""生成内容导出至语料数据集"""
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import select
+from typing import AsyncIterator
+from asyncio import Task
+from datetime import datetime
+from pathlib import Path
+import asyncio
+import json
+import os
+
+from app.core.corpus import corpus_dataset_manager
+from app.models.corpus import CorpusBulkAddResult
+from app.models.db import Generation
+from app.models.generation import GenerationExport, GenerationExportProgress
+from app.utils.config import settings
+from app.utils.log import logger
+from app.utils import db
+
+GENERATION_EXPORT_FILENAME = 'GENERATION_EXPORT.json'
+"""生成内容导出进度标记文件，与 INFO.json 同目录，按场景记录已导出的最后一条生成内容"""
+
+GENERATION_EXPORT_QUEUE_SIZE = 4
+"""已序列化、等待写入的批次数上限"""
+
+ExportBatch = list[tuple[int, int, bytes]]
+"""(生成内容 id, 时间戳, 语料 JSON) 列表"""
+
+
+class GenerationCorpusExporter:
+    """
+    生成内容导出器
+
+    以服务端游标按 id 顺序流式读取生成内容，序列化在线程池中进行，与语料桶写入流水线并行；
+    每批写入完成后保存进度标记，再次导出时仅导出标记之后的生成内容
+    """
+
+    progress: dict[str, GenerationExportProgress]
+    """数据集名称与最近一次导出进度映射表"""
+
+    def __init__(self):
+        self.progress = dict()
+        self._tasks: dict[str, Task] = dict()
+
+    async def export(self, model: GenerationExport) -> GenerationExportProgress:
+        """在后台将生成内容导出至语料数据集，返回进度对象"""
+        if db.get_async_engine() is None:
+            raise ValueError("异步 Engine 对象不存在，无法导出生成内容。")
+        unknown = set(model.field_map.values()) - set(Generation.model_fields)
+        if unknown:
+            raise ValueError(f"生成内容不存在字段 {', '.join(sorted(unknown))}。")
+        await corpus_dataset_manager.get_info(model.dataset_name)
+        mark_path = corpus_dataset_manager.corpus_data_dir / model.dataset_name / GENERATION_EXPORT_FILENAME
+        mark = (await asyncio.to_thread(read_marks, mark_path)).get(get_mark_key(model.scene_id), dict())
+        task = self._tasks.get(model.dataset_name)
+        if task is not None and not task.done():
+            raise ValueError(f"数据集 {model.dataset_name} 正在导出生成内容。")
+        start_id = 0 if model.restart else mark.get('id', 0)
+        progress = self.progress[model.dataset_name] = GenerationExportProgress(
+            dataset_name=model.dataset_name,
+            scene_id=model.scene_id,
+            start_id=start_id,
+            last_id=start_id,
+            last_timestamp=None if model.restart else mark.get('timestamp'),
+            result=CorpusBulkAddResult(dataset_name=model.dataset_name),
+            start_timestamp=int(datetime.now().timestamp() * 1000),
+        )
+        self._tasks[model.dataset_name] = asyncio.create_task(self._export(model, progress, mark_path))
+        return progress
+
+    def get_progress(self, dataset_name: str) -> GenerationExportProgress:
+        progress = self.progress.get(dataset_name)
+        if progress is None:
+            raise ValueError(f"数据集 {dataset_name} 没有生成内容导出记录。")
+        return progress
+
+    async def _export(self, model: GenerationExport, progress: GenerationExportProgress, mark_path: Path):
+        dataset_name = model.dataset_name
+        statement = select(Generation).where(Generation.id > progress.start_id)
+        if model.scene_id is not None:
+            statement = statement.where(Generation.scene_id == model.scene_id)
+        if model.edited_only:
+            statement = statement.where(Generation.edited_content != '')
+        statement = statement.order_by(Generation.id).execution_options(
+            yield_per=settings.generation_export_batch_size
+        )
+        queue: asyncio.Queue[ExportBatch | Exception | None] = asyncio.Queue(GENERATION_EXPORT_QUEUE_SIZE)
+
+        async def produce():
+            try:
+                async with AsyncSession(db.async_engine) as session:
+                    result = await session.stream_scalars(statement)
+                    async for rows in result.partitions():
+                        records = [
+                            (row.id, row.timestamp, {name: getattr(row, key) for name, key in model.field_map.items()})
+                            for row in rows
+                        ]
+                        await queue.put(await asyncio.to_thread(serialize_records, records))
+            except Exception as e:
+                await queue.put(e)
+                return
+            await queue.put(None)
+
+        async def iter_lines(batch: ExportBatch) -> AsyncIterator[tuple[int, bytes]]:
+            for id, _, line in batch:
+                yield id, line
+
+        producer = asyncio.create_task(produce())
+        try:
+            while (batch := await queue.get()) is not None:
+                if isinstance(batch, Exception):
+                    raise batch
+                await corpus_dataset_manager.add_corpus_lines(dataset_name, iter_lines(batch), progress.result)
+                if progress.result.failed:
+                    raise ValueError(f"{progress.result.failed} 条语料写入失败，导出进度停留在该批次之前。")
+                progress.last_id, progress.last_timestamp, _ = batch[-1]
+                await asyncio.to_thread(
+                    write_mark,
+                    mark_path,
+                    get_mark_key(model.scene_id),
+                    progress.last_id,
+                    progress.last_timestamp,
+                )
+            progress.status = 'finished'
+            logger.success(
+                f"生成内容导出至数据集 {dataset_name} 完成，"
+                f"写入 {progress.result.accepted} 条，拒绝 {progress.result.rejected} 条，进度标记为 {progress.last_id}。"
+            )
+        except Exception as e:
+            producer.cancel()
+            progress.status = 'failed'
+            progress.error = repr(e)
+            logger.error(f"生成内容导出至数据集 {dataset_name} 失败，进度标记为 {progress.last_id}：{e!r}")
+        finally:
+            progress.end_timestamp = int(datetime.now().timestamp() * 1000)
+
+    async def close(self):
+        """取消进行中的导出，已写入批次的进度标记均已保存"""
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+
+
+def get_mark_key(scene_id: int | None) -> str:
+    return 'all' if scene_id is None else str(scene_id)
+
+
+def read_marks(mark_path: Path) -> dict[str, dict]:
+    try:
+        return json.loads(mark_path.read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        return dict()
+
+
+def write_mark(mark_path: Path, key: str, last_id: int, last_timestamp: int):
+    """原子更新进度标记文件中的一项"""
+    marks = read_marks(mark_path)
+    marks[key] = {'id': last_id, 'timestamp': last_timestamp}
+    tmp_path = mark_path.with_name(mark_path.name + '.tmp')
+    tmp_path.write_text(json.dumps(marks), encoding='utf-8')
+    os.replace(tmp_path, mark_path)
+
+
+def serialize_records(records: list[tuple[int, int, dict]]) -> ExportBatch:
+    return [
+        (id, timestamp, json.dumps(fields, ensure_ascii=False).encode('utf-8'))
+        for id, timestamp, fields in records
+    ]
+
+
+generation_corpus_exporter = GenerationCorpusExporter()
+"""生成内容导出器实例"""
+
+__all__ = [
+    "GENERATION_EXPORT_FILENAME",
+    "GenerationCorpusExporter",
+    "generation_corpus_exporter",
+]
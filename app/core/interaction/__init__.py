@@ -0,0 +1,233 @@
+from sqlalchemy import insert
+from collections import deque
+from asyncio import Future, Task
+import asyncio
+import json
+
+from app.core.user.resolve import user_resolver
+from app.models.db import Interaction, InteractionBase
+from app.models.interaction import InteractionIngest
+from app.utils.config import settings
+from app.utils.log import logger
+from app.utils.metrics import register_queue_depth
+from app.utils import db
+
+from .query import *
+from .rollup import *
+
+
+class IngestBufferFullError(ValueError):
+    """交互行为缓冲区已满且等待超时"""
+
+
+class InteractionIngestBuffer:
+    """
+    交互行为批量写入缓冲区
+
+    写入请求只将交互行为追加至内存队列，后台任务按条数或时间阈值合并为批次，
+    以 COPY(PostgreSQL)或多行 INSERT 写入数据库；写入失败的批次按指数退避重试，
+    重试期间仍计入待写入条数，待写入条数超过上限时写入请求等待，形成反压
+    """
+
+    batch_size: int
+    """单次写入数据库的最大条数"""
+
+    flush_interval: float
+    """未满一批时的最大等待时间(秒)"""
+
+    max_pending: int
+    """最大待写入条数(含写入中)"""
+
+    max_retries: int
+    """批次写入失败时的最大重试次数"""
+
+    retry_delay: float
+    """首次重试前的等待时间(秒)，此后每次翻倍"""
+
+    def __init__(
+        self,
+        batch_size: int,
+        flush_interval: float,
+        max_pending: int,
+        max_retries: int = 0,
+        retry_delay: float = 0,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._rows: deque[dict] = deque()
+        self._enqueued = 0
+        self._flushed = 0
+        self._waiters: deque[tuple[int, int, Future]] = deque()
+        self._wakeup = asyncio.Event()
+        self._full = asyncio.Event()
+        self._space = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task: Task | None = None
+
+    @property
+    def pending(self) -> int:
+        """待写入条数(含写入中)"""
+        return self._enqueued - self._flushed
+
+    async def put(self, interactions: list[InteractionBase], wait: bool = False):
+        """
+        将交互行为加入缓冲区
+
+        待写入条数(含写入中与等待重试的批次)超过上限时等待至多 interaction_ingest_put_timeout 秒；
+        wait 为真时等待这些交互行为写入数据库后返回
+        """
+        if db.get_async_engine() is None:
+            raise ValueError("异步 Engine 对象不存在，无法写入交互行为。")
+        if not interactions:
+            return
+        try:
+            async with asyncio.timeout(settings.interaction_ingest_put_timeout):
+                while self.pending and self.pending + len(interactions) > self.max_pending:
+                    self._space.clear()
+                    await self._space.wait()
+        except TimeoutError:
+            raise IngestBufferFullError("交互行为缓冲区已满，请稍后重试。")
+        self._rows.extend(interaction.model_dump() for interaction in interactions)
+        self._enqueued += len(interactions)
+        future = None
+        if wait:
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append((self._enqueued - len(interactions), self._enqueued, future))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        self._idle.clear()
+        self._wakeup.set()
+        if len(self._rows) >= self.batch_size:
+            self._full.set()
+        if future is not None:
+            await future
+
+    async def flush(self):
+        """等待当前缓冲区内的交互行为全部写入数据库"""
+        if self.pending:
+            self._full.set()
+            await self._idle.wait()
+
+    async def close(self):
+        """写入剩余交互行为并停止后台任务"""
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            if not self._rows:
+                self._idle.set()
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            if len(self._rows) < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.flush_interval)
+                except TimeoutError:
+                    pass
+            self._full.clear()
+            rows = [self._rows.popleft() for _ in range(min(self.batch_size, len(self._rows)))]
+            start = self._flushed
+            error = await self._insert_with_retry(rows)
+            if error is not None:
+                logger.error(f"交互行为批量写入重试 {self.max_retries} 次后仍失败，丢弃 {len(rows)} 条：{error!r}")
+                for waiter_start, _, future in self._waiters:
+                    if waiter_start >= start + len(rows):
+                        break
+                    if not future.done():
+                        future.set_exception(error)
+            self._flushed += len(rows)
+            self._space.set()
+            while self._waiters and self._waiters[0][1] <= self._flushed:
+                *_, future = self._waiters.popleft()
+                if not future.done():
+                    future.set_result(None)
+
+    async def _insert_with_retry(self, rows: list[dict]) -> Exception | None:
+        """写入一批交互行为，失败时按指数退避重试，返回最后一次失败的异常，写入成功时返回 None"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self._insert(rows)
+                return None
+            except Exception as e:
+                if attempt == self.max_retries:
+                    return e
+                delay = self.retry_delay * 2 ** attempt
+                logger.warning(f"交互行为批量写入失败，{delay:.2f} 秒后第 {attempt + 1} 次重试：{e!r}")
+                await asyncio.sleep(delay)
+
+    async def _insert(self, rows: list[dict]):
+        """
+        写入一批交互行为，启用汇总时在同一事务中累加汇总表
+
+        汇总表先于 COPY 更新：asyncpg 连接在首条语句执行时才开启事务，COPY 随后在同一事务中执行
+        """
+        table = Interaction.__table__
+        async with db.async_engine.begin() as conn:
+            if settings.interaction_rollup:
+                await upsert_rollups(conn, rows)
+            if settings.interaction_ingest_copy and conn.dialect.name == 'postgresql':
+                columns = list(rows[0].keys())
+                raw_connection = await conn.get_raw_connection()
+                await raw_connection.driver_connection.copy_records_to_table(
+                    table.name,
+                    records=[
+                        tuple(json.dumps(row[column]) if column == 'fields' else row[column] for column in columns)
+                        for row in rows
+                    ],
+                    columns=columns,
+                )
+            else:
+                await conn.execute(insert(table), rows)
+
+
+async def resolve_ingest_users(interactions: list[InteractionIngest]) -> list[InteractionBase]:
+    """
+    将以媒体平台账号指定用户的交互行为解析为用户账号系统标识
+
+    同一请求中的账号合并为一次批量解析，命中解析缓存的账号不访问数据库；各字段已在请求校验时校验，直接构造写入模型
+    """
+    users = []
+    for i, interaction in enumerate(interactions):
+        if interaction.user_id is None:
+            if interaction.user is None:
+                raise ValueError(f"第 {i} 条交互行为的 user_id 与 user 均为空。")
+            users.append(interaction.user)
+    resolved = iter(await user_resolver.resolve(users) if users else [])
+    rows = []
+    for interaction in interactions:
+        user_id = next(resolved).id if interaction.user_id is None else interaction.user_id
+        fields = interaction.model_dump(exclude={'user', 'user_id'})
+        rows.append(InteractionBase.model_construct(**fields, user_id=user_id))
+    return rows
+
+
+interaction_ingest_buffer = InteractionIngestBuffer(
+    batch_size=settings.interaction_ingest_batch_size,
+    flush_interval=settings.interaction_ingest_flush_interval,
+    max_pending=settings.interaction_ingest_max_pending,
+    max_retries=settings.interaction_ingest_max_retries,
+    retry_delay=settings.interaction_ingest_retry_delay,
+)
+"""交互行为批量写入缓冲区实例"""
+
+register_queue_depth('interaction_ingest', lambda: {'db': interaction_ingest_buffer.pending})
+
+__all__ = [
+    "IngestBufferFullError",
+    "interaction_ingest_buffer",
+    "resolve_ingest_users",
+    "select_interactions",
+    "query_interactions",
+    "ROLLUP_MINUTE_MS",
+    "upsert_rollups",
+    "get_scene_activity",
+    "get_scene_summary",
+    "get_scene_top_users",
+]
@@ -0,0 +1,46 @@
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import select
+from sqlalchemy.sql import Select
+
+from app.models.db import Interaction
+from app.core.query import apply_json_fields, apply_keyset, apply_time_range, query_all
+
+
+def select_interactions(
+    scene_id: int | None = None,
+    user_id: int | None = None,
+    start_timestamp: int | None = None,
+    end_timestamp: int | None = None,
+    type: str | None = None,
+    fields: list[str] | None = None,
+    after: tuple[int, int] | None = None,
+    desc: bool = False,
+) -> Select:
+    """
+    构建交互行为查询语句，按 (timestamp, id) 键集分页排序
+
+    scene_id 与 user_id 至少指定其一，以命中 (scene_id, timestamp) 或 (user_id, timestamp) 索引
+    """
+    if scene_id is None and user_id is None:
+        raise ValueError("scene_id 与 user_id 至少需要指定其一。")
+    statement = select(Interaction)
+    if scene_id is not None:
+        statement = statement.where(Interaction.scene_id == scene_id)
+    if user_id is not None:
+        statement = statement.where(Interaction.user_id == user_id)
+    if type is not None:
+        statement = statement.where(Interaction.type == type)
+    statement = apply_time_range(statement, Interaction.timestamp, start_timestamp, end_timestamp)
+    statement = apply_json_fields(statement, Interaction.fields, fields)
+    return apply_keyset(statement, Interaction.timestamp, Interaction.id, after, desc)
+
+
+async def query_interactions(session: AsyncSession, limit: int = 100, **filters) -> list[Interaction]:
+    """查询交互行为，filters 同 select_interactions"""
+    return await query_all(session, select_interactions(**filters), limit)
+
+
+__all__ = [
+    "select_interactions",
+    "query_interactions",
+]
@@ -0,0 +1,147 @@
+"""交互行为增量汇总"""
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlmodel import select
+from sqlalchemy import func
+
+from app.models.db import Scene_Minute_Rollup, Scene_User_Rollup
+from app.models.interaction import SceneMinuteActivity, SceneTypeSummary
+from app.utils.db import get_upsert_insert
+
+ROLLUP_MINUTE_MS = 60 * 1000
+"""汇总时间粒度(毫秒)"""
+
+ROLLUP_MAX_LIMIT = 1000
+"""用户排行单次最多返回的条数"""
+
+
+async def upsert_rollups(conn: AsyncConnection, rows: list[dict]):
+    """
+    将一批交互行为累加至汇总表，需与交互行为写入在同一事务中执行
+
+    先在内存中按汇总键合并，每张汇总表仅执行一条多行 INSERT ... ON CONFLICT DO UPDATE；
+    汇总键按序写入，以避免多个进程并发累加同一批键时死锁
+    """
+    minutes: dict[tuple, list[int]] = dict()
+    users: dict[tuple, list[int]] = dict()
+    for row in rows:
+        amount, item_num, timestamp = row['amount'], row['item_num'], row['timestamp']
+        minute = minutes.setdefault(
+            (row['scene_id'], timestamp - timestamp % ROLLUP_MINUTE_MS, row['type']),
+            [0, 0, 0],
+        )
+        minute[0] += 1
+        minute[1] += amount
+        minute[2] += item_num
+        user = users.get((row['scene_id'], row['user_id']))
+        if user is None:
+            users[(row['scene_id'], row['user_id'])] = [1, amount, item_num, timestamp, timestamp]
+        else:
+            user[0] += 1
+            user[1] += amount
+            user[2] += item_num
+            user[3] = min(user[3], timestamp)
+            user[4] = max(user[4], timestamp)
+
+    insert = get_upsert_insert(conn.dialect.name)
+    least, greatest = (func.least, func.greatest) if conn.dialect.name == 'postgresql' else (func.min, func.max)
+    table = Scene_Minute_Rollup.__table__
+    statement = insert(table).values([
+        dict(scene_id=scene_id, minute=minute, type=type, interaction_num=num, amount=amount, item_num=item_num)
+        for (scene_id, minute, type), (num, amount, item_num) in sorted(minutes.items())
+    ])
+    await conn.execute(statement.on_conflict_do_update(
+        index_elements=[table.c.scene_id, table.c.minute, table.c.type],
+        set_={
+            'interaction_num': table.c.interaction_num + statement.excluded.interaction_num,
+            'amount': table.c.amount + statement.excluded.amount,
+            'item_num': table.c.item_num + statement.excluded.item_num,
+        },
+    ))
+    table = Scene_User_Rollup.__table__
+    statement = insert(table).values([
+        dict(
+            scene_id=scene_id,
+            user_id=user_id,
+            interaction_num=num,
+            amount=amount,
+            item_num=item_num,
+            first_timestamp=first_timestamp,
+            last_timestamp=last_timestamp,
+        )
+        for (scene_id, user_id), (num, amount, item_num, first_timestamp, last_timestamp) in sorted(users.items())
+    ])
+    await conn.execute(statement.on_conflict_do_update(
+        index_elements=[table.c.scene_id, table.c.user_id],
+        set_={
+            'interaction_num': table.c.interaction_num + statement.excluded.interaction_num,
+            'amount': table.c.amount + statement.excluded.amount,
+            'item_num': table.c.item_num + statement.excluded.item_num,
+            'first_timestamp': least(table.c.first_timestamp, statement.excluded.first_timestamp),
+            'last_timestamp': greatest(table.c.last_timestamp, statement.excluded.last_timestamp),
+        },
+    ))
+
+
+async def get_scene_activity(
+    session: AsyncSession,
+    scene_id: int,
+    start_timestamp: int | None = None,
+    end_timestamp: int | None = None,
+    type: str | None = None,
+) -> list[SceneMinuteActivity]:
+    """查询场景时间范围 [start_timestamp, end_timestamp) 内每分钟的交互行为汇总，type 为空时合并全部类型"""
+    table = Scene_Minute_Rollup.__table__
+    statement = select(
+        table.c.minute,
+        func.sum(table.c.interaction_num).label('interaction_num'),
+        func.sum(table.c.amount).label('amount'),
+        func.sum(table.c.item_num).label('item_num'),
+    ).where(table.c.scene_id == scene_id)
+    if start_timestamp is not None:
+        statement = statement.where(table.c.minute >= start_timestamp - start_timestamp % ROLLUP_MINUTE_MS)
+    if end_timestamp is not None:
+        statement = statement.where(table.c.minute < end_timestamp)
+    if type is not None:
+        statement = statement.where(table.c.type == type)
+    statement = statement.group_by(table.c.minute).order_by(table.c.minute)
+    return [SceneMinuteActivity.model_validate(row._mapping) for row in await session.exec(statement)]
+
+
+async def get_scene_summary(session: AsyncSession, scene_id: int) -> list[SceneTypeSummary]:
+    """查询场景各交互行为类型的汇总"""
+    table = Scene_Minute_Rollup.__table__
+    statement = select(
+        table.c.type,
+        func.sum(table.c.interaction_num).label('interaction_num'),
+        func.sum(table.c.amount).label('amount'),
+        func.sum(table.c.item_num).label('item_num'),
+    ).where(table.c.scene_id == scene_id).group_by(table.c.type).order_by(table.c.type)
+    return [SceneTypeSummary.model_validate(row._mapping) for row in await session.exec(statement)]
+
+
+async def get_scene_top_users(
+    session: AsyncSession,
+    scene_id: int,
+    order_by: str = 'amount',
+    limit: int = 100,
+) -> list[Scene_User_Rollup]:
+    """查询场景按总金额或交互行为条数排序的用户排行"""
+    if order_by not in ('amount', 'interaction_num'):
+        raise ValueError("order_by 仅支持 amount 与 interaction_num。")
+    if not 0 < limit <= ROLLUP_MAX_LIMIT:
+        raise ValueError(f"limit 需在 1 ~ {ROLLUP_MAX_LIMIT} 之间。")
+    column = getattr(Scene_User_Rollup, order_by)
+    statement = select(Scene_User_Rollup).where(Scene_User_Rollup.scene_id == scene_id)
+    statement = statement.order_by(column.desc(), Scene_User_Rollup.user_id).limit(limit)
+    return list(await session.exec(statement))
+
+
+__all__ = [
+    "ROLLUP_MINUTE_MS",
+    "upsert_rollups",
+    "get_scene_activity",
+    "get_scene_summary",
+    "get_scene_top_users",
+]
@@ -0,0 +1,138 @@
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.sql import ColumnElement, Select
+from sqlalchemy import and_, or_
+from typing import AsyncIterator
+import json
+
+from app.utils import db
+
+QUERY_MAX_LIMIT = 10000
+"""非流式查询单次最多返回的记录条数"""
+
+QUERY_STREAM_BATCH_SIZE = 1000
+"""流式查询时服务端游标单次取回的记录条数，同时为响应的分块单位"""
+
+
+def get_keyset_after(after_timestamp: int | None, after_id: int | None) -> tuple[int, int] | None:
+    """检查并组合键集分页游标，after_timestamp 与 after_id 需同时指定"""
+    if after_timestamp is None and after_id is None:
+        return None
+    if after_timestamp is None or after_id is None:
+        raise ValueError("after_timestamp 与 after_id 需同时指定。")
+    return after_timestamp, after_id
+
+
+def apply_time_range(
+    statement: Select,
+    time_column: ColumnElement,
+    start_timestamp: int | None,
+    end_timestamp: int | None,
+) -> Select:
+    """筛选时间戳范围 [start_timestamp, end_timestamp)"""
+    if start_timestamp is not None:
+        statement = statement.where(time_column >= start_timestamp)
+    if end_timestamp is not None:
+        statement = statement.where(time_column < end_timestamp)
+    return statement
+
+
+def apply_json_fields(statement: Select, column: ColumnElement, fields: list[str] | None) -> Select:
+    """
+    按 JSONB 字段筛选，fields 中每项形如 key=value 或 key
+
+    key=value 要求字段值等于 value(value 按 JSON 解析，解析失败时视为字符串)，多项合并为一次 @> 包含查询；
+    仅 key 时要求存在该字段(? 查询)。二者均可利用各 JSONB 字段列上的 GIN 索引
+    """
+    if not fields:
+        return statement
+    contains = dict()
+    for field in fields:
+        key, sep, value = field.partition('=')
+        if not key:
+            raise ValueError(f"字段筛选条件 {field} 格式错误，应为 key=value 或 key。")
+        if not sep:
+            statement = statement.where(column.has_key(key))
+            continue
+        try:
+            contains[key] = json.loads(value)
+        except ValueError:
+            contains[key] = value
+    if contains:
+        statement = statement.where(column.contains(contains))
+    return statement
+
+
+def apply_keyset(
+    statement: Select,
+    time_column: ColumnElement,
+    id_column: ColumnElement,
+    after: tuple[int, int] | None,
+    desc: bool = False,
+) -> Select:
+    """
+    按 (时间戳, id) 键集分页并排序
+
+    after 为上一页最后一条记录的 (时间戳, id)，结果从其后一条开始，避免 OFFSET 扫描并跳过前序记录
+    """
+    if after is not None:
+        after_timestamp, after_id = after
+        if desc:
+            statement = statement.where(
+                or_(time_column < after_timestamp, and_(time_column == after_timestamp, id_column < after_id))
+            )
+        else:
+            statement = statement.where(
+                or_(time_column > after_timestamp, and_(time_column == after_timestamp, id_column > after_id))
+            )
+    if desc:
+        return statement.order_by(time_column.desc(), id_column.desc())
+    return statement.order_by(time_column, id_column)
+
+
+def check_limit(limit: int | None, stream: bool = False):
+    """检查查询条数，非流式查询不得超过 QUERY_MAX_LIMIT，流式查询可不限制"""
+    if stream:
+        if limit is not None and limit <= 0:
+            raise ValueError("limit 需为正整数。")
+    elif limit is None or not 0 < limit <= QUERY_MAX_LIMIT:
+        raise ValueError(f"limit 需在 1 ~ {QUERY_MAX_LIMIT} 之间。")
+
+
+async def query_all(session: AsyncSession, statement: Select, limit: int) -> list:
+    check_limit(limit)
+    return list(await session.exec(statement.limit(limit)))
+
+
+def check_stream():
+    """检查流式查询所需的异步 Engine 对象，需在开始响应前调用"""
+    if db.get_async_engine() is None:
+        raise ValueError("异步 Engine 对象不存在，无法查询数据。")
+
+
+async def iter_ndjson_rows(statement: Select, limit: int | None = None) -> AsyncIterator[bytes]:
+    """
+    以服务端游标流式执行查询，逐批产出 NDJSON 数据块
+
+    每批至多 QUERY_STREAM_BATCH_SIZE 条记录，内存占用与结果总量无关；游标在独立的会话中打开，随迭代结束关闭
+    """
+    check_limit(limit, stream=True)
+    if limit is not None:
+        statement = statement.limit(limit)
+    async with AsyncSession(db.async_engine) as session:
+        result = await session.stream_scalars(statement.execution_options(yield_per=QUERY_STREAM_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield b''.join(row.model_dump_json().encode() + b'\n' for row in rows)
+
+
+__all__ = [
+    "QUERY_MAX_LIMIT",
+    "QUERY_STREAM_BATCH_SIZE",
+    "get_keyset_after",
+    "apply_time_range",
+    "apply_json_fields",
+    "apply_keyset",
+    "check_limit",
+    "query_all",
+    "check_stream",
+    "iter_ndjson_rows",
+]
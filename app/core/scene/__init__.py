@@ -0,0 +1,27 @@
+from sqlmodel import select
+from sqlalchemy.sql import Select
+
+from app.models.db import Scene_Info
+from app.core.query import apply_json_fields, apply_keyset, apply_time_range
+
+
+def select_scenes(
+    scene_type: str | None = None,
+    start_timestamp: int | None = None,
+    end_timestamp: int | None = None,
+    fields: list[str] | None = None,
+    after: tuple[int, int] | None = None,
+    desc: bool = False,
+) -> Select:
+    """构建场景实例查询语句，时间范围作用于场景开始时间，按 (start_timestamp, id) 键集分页排序"""
+    statement = select(Scene_Info)
+    if scene_type is not None:
+        statement = statement.where(Scene_Info.scene_type == scene_type)
+    statement = apply_time_range(statement, Scene_Info.start_timestamp, start_timestamp, end_timestamp)
+    statement = apply_json_fields(statement, Scene_Info.fields, fields)
+    return apply_keyset(statement, Scene_Info.start_timestamp, Scene_Info.id, after, desc)
+
+
+__all__ = [
+    "select_scenes",
+]
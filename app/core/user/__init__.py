@@ -0,0 +1,34 @@
+from sqlmodel import select
+from sqlalchemy.sql import Select
+
+from app.models.db import User_Info
+from app.core.query import apply_json_fields, apply_keyset, apply_time_range
+
+from .resolve import *
+
+
+def select_users(
+    platform: str | None = None,
+    main_id: int | None = None,
+    start_timestamp: int | None = None,
+    end_timestamp: int | None = None,
+    platform_fields: list[str] | None = None,
+    after: tuple[int, int] | None = None,
+    desc: bool = False,
+) -> Select:
+    """构建用户账号查询语句，时间范围作用于注册时间，按 (register_timestamp, id) 键集分页排序"""
+    statement = select(User_Info)
+    if platform is not None:
+        statement = statement.where(User_Info.platform == platform)
+    if main_id is not None:
+        statement = statement.where(User_Info.main_id == main_id)
+    statement = apply_time_range(statement, User_Info.register_timestamp, start_timestamp, end_timestamp)
+    statement = apply_json_fields(statement, User_Info.platform_fields, platform_fields)
+    return apply_keyset(statement, User_Info.register_timestamp, User_Info.id, after, desc)
+
+
+__all__ = [
+    "select_users",
+    "UserResolver",
+    "user_resolver",
+]
@@ -0,0 +1,66 @@
+"""用户账号解析缓存"""
+
+from collections import OrderedDict
+from typing import Iterable
+import time
+
+from app.models.user import ResolvedUser
+
+UserKey = tuple[str, str]
+"""(媒体平台, 用户媒体平台 id)"""
+
+
+class UserResolveCache:
+    """
+    用户账号解析 LRU 缓存
+
+    条目超过 ttl 秒后视为过期，以限制多进程部署时其他进程绑定账号造成的 main_id 不一致时长
+    """
+
+    maxsize: int
+    """最大缓存条目数"""
+
+    ttl: float
+    """缓存条目有效期(秒)"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[UserKey, tuple[float, ResolvedUser]] = OrderedDict()
+
+    def get(self, key: UserKey) -> ResolvedUser | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expire, user = entry
+        if expire < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return user
+
+    def put(self, user: ResolvedUser):
+        if self.maxsize <= 0:
+            return
+        key = (user.platform, user.user_platform_id)
+        self._entries[key] = (time.monotonic() + self.ttl, user)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, keys: Iterable[UserKey] | None = None):
+        """失效指定账号(为 None 时为全部)的缓存"""
+        if keys is None:
+            self._entries.clear()
+            return
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+__all__ = [
+    "UserKey",
+    "UserResolveCache",
+]
@@ -0,0 +1,116 @@
+"""媒体平台账号解析"""
+
+from sqlalchemy import select, update
+
+from app.models.db import User_Info
+from app.models.user import ResolvedUser, UserResolve
+from app.utils.config import settings
+from app.utils.db import get_upsert_insert
+from app.utils import db
+
+from .cache import UserKey, UserResolveCache
+
+USER_RESOLVE_BATCH_SIZE = 1000
+"""单条 INSERT ... ON CONFLICT 语句最多解析的账号数"""
+
+USER_UNIQUE_INDEX_NAME = 'ux_user_info_platform_user_platform_id'
+"""(媒体平台, 用户媒体平台 id) 唯一索引名称，INSERT ... ON CONFLICT 依赖该索引"""
+
+
+class UserResolver:
+    """
+    媒体平台账号解析器
+
+    将 (媒体平台, 用户媒体平台 id) 解析为用户账号系统标识与主账号系统标识，不存在的账号将被创建；
+    先查询进程内缓存，未命中的账号去重后以单条 INSERT ... ON CONFLICT ... RETURNING 语句批量获取或创建
+    """
+
+    cache: UserResolveCache
+    """账号解析缓存"""
+
+    def __init__(self, cache: UserResolveCache):
+        self.cache = cache
+        self._epoch = 0
+
+    async def resolve(self, users: list[UserResolve]) -> list[ResolvedUser]:
+        """批量解析账号，返回结果与 users 一一对应"""
+        if db.get_async_engine() is None:
+            raise ValueError("异步 Engine 对象不存在，无法解析用户账号。")
+        if USER_UNIQUE_INDEX_NAME in db.skipped_indexes:
+            raise ValueError(
+                f"用户信息表缺少唯一索引 {USER_UNIQUE_INDEX_NAME}(存在媒体平台与平台 id 均相同的重复账号)，无法解析用户账号；"
+                "请合并重复账号后重启服务以补建索引。"
+            )
+        resolved: dict[UserKey, ResolvedUser] = dict()
+        missing: dict[UserKey, UserResolve] = dict()
+        for user in users:
+            key = (user.platform, user.user_platform_id)
+            if key in resolved or key in missing:
+                continue
+            cached = self.cache.get(key)
+            if cached is None:
+                missing[key] = user
+            else:
+                resolved[key] = cached
+        if missing:
+            epoch = self._epoch
+            missing_users = list(missing.values())
+            async with db.async_engine.begin() as conn:
+                for i in range(0, len(missing_users), USER_RESOLVE_BATCH_SIZE):
+                    statement = get_or_create_statement(conn.dialect.name, missing_users[i:i + USER_RESOLVE_BATCH_SIZE])
+                    for row in await conn.execute(statement):
+                        resolved[(row.platform, row.user_platform_id)] = ResolvedUser.model_validate(row._mapping)
+            # 查询期间发生账号绑定时，结果中的 main_id 可能已过期，不写入缓存
+            if epoch == self._epoch:
+                for key in missing:
+                    self.cache.put(resolved[key])
+        return [resolved[(user.platform, user.user_platform_id)] for user in users]
+
+    async def bind(self, main_id: int, user_ids: list[int]) -> list[ResolvedUser]:
+        """将账号绑定至主账号，并失效这些账号的解析缓存"""
+        if db.get_async_engine() is None:
+            raise ValueError("异步 Engine 对象不存在，无法绑定用户账号。")
+        table = User_Info.__table__
+        async with db.async_engine.begin() as conn:
+            if (await conn.execute(select(table.c.id).where(table.c.id == main_id))).first() is None:
+                raise ValueError(f"主账号 {main_id} 不存在。")
+            rows = await conn.execute(
+                update(table)
+                .where(table.c.id.in_(user_ids))
+                .values(main_id=main_id)
+                .returning(table.c.platform, table.c.user_platform_id, table.c.id, table.c.main_id)
+            )
+            bound = [ResolvedUser.model_validate(row._mapping) for row in rows]
+        self._epoch += 1
+        self.cache.invalidate((user.platform, user.user_platform_id) for user in bound)
+        return bound
+
+
+def get_or_create_statement(dialect_name: str, users: list[UserResolve]):
+    """
+    构建批量获取或创建账号的语句
+
+    冲突时以空更新代替 DO NOTHING，使已存在的账号同样出现在 RETURNING 结果中；users 中不得有重复账号
+    """
+    table = User_Info.__table__
+    statement = get_upsert_insert(dialect_name)(table).values([
+        User_Info(
+            platform=user.platform,
+            user_platform_id=user.user_platform_id,
+            user_name=user.user_name,
+        ).model_dump(exclude={'id'})
+        for user in users
+    ])
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.platform, table.c.user_platform_id],
+        set_={'platform': statement.excluded.platform},
+    ).returning(table.c.platform, table.c.user_platform_id, table.c.id, table.c.main_id)
+
+
+user_resolver = UserResolver(UserResolveCache(settings.user_resolve_cache_size, settings.user_resolve_cache_ttl))
+"""媒体平台账号解析器实例"""
+
+__all__ = [
+    "UserResolver",
+    "user_resolver",
+]
@@ -0,0 +1,35 @@
+"""base prompt 接口相关模型"""
+
+from pydantic import BaseModel
+
+
+class BasePromptRender(BaseModel):
+    """渲染 base prompt 请求"""
+
+    name: str
+    """base prompt 名称"""
+
+    params: dict[str, str] = dict()
+    """参数名与参数值映射表"""
+
+
+class RenderedBasePrompt(BaseModel):
+    """渲染后的 base prompt"""
+
+    name: str
+    """base prompt 名称"""
+
+    text: str
+    """渲染结果，缺失的参数保留原占位符"""
+
+    param_names: list[str] = []
+    """模板中的参数名列表"""
+
+    missing_params: list[str] = []
+    """params 中缺失的参数名列表"""
+
+
+__all__ = [
+    "BasePromptRender",
+    "RenderedBasePrompt",
+]
@@ -0,0 +1,348 @@
+"""语料库接口相关模型"""
+
+from pydantic import BaseModel
+from typing import Literal
+
+from app.common.models.corpus import Corpus, DatasetInfo
+
+
+class CorpusBulkAddError(BaseModel):
+    """批量添加语料时单条语料的拒绝原因"""
+
+    line: int
+    """语料所在行号(从 1 开始)"""
+
+    reason: str
+    """拒绝原因"""
+
+
+class CorpusBulkAddResult(BaseModel):
+    """批量添加语料结果"""
+
+    dataset_name: str
+    """数据集名称"""
+
+    accepted: int = 0
+    """成功写入的语料条数"""
+
+    rejected: int = 0
+    """被拒绝的语料条数"""
+
+    failed: int = 0
+    """写入语料桶失败的语料条数，已计入 rejected"""
+
+    errors: list[CorpusBulkAddError] = []
+    """
+    被拒绝语料的详细原因
+
+    仅保留前若干条，总数以 rejected 为准
+    """
+
+
+class BucketStats(BaseModel):
+    """语料桶统计信息"""
+
+    bucket_id: int
+    """分桶 id"""
+
+    corpus_num: int = 0
+    """语料条数"""
+
+    size: int = 0
+    """语料桶逻辑大小(字节)，即已封存部分解压后与 JSONL 文件中语料数据的总大小"""
+
+    sealed_size: int = 0
+    """已封存部分的逻辑大小(字节)"""
+
+    last_write_timestamp: int | None = None
+    """最后写入时间戳(毫秒)，从未写入时为 None"""
+
+
+class DatasetDetail(DatasetInfo):
+    """带统计信息的语料数据集信息"""
+
+    corpus_num: int = 0
+    """语料总条数"""
+
+    size: int = 0
+    """语料桶总逻辑大小(字节)"""
+
+    last_write_timestamp: int | None = None
+    """最后写入时间戳(毫秒)，从未写入时为 None"""
+
+    buckets: list[BucketStats] = []
+    """各语料桶统计信息"""
+
+
+class ReshardProgress(BaseModel):
+    """数据集重新分桶进度"""
+
+    dataset_name: str
+    """数据集名称"""
+
+    old_bucket_num: int
+    """原分桶数"""
+
+    new_bucket_num: int
+    """目标分桶数"""
+
+    status: Literal['running', 'committing', 'finished', 'failed'] = 'running'
+    """
+    重新分桶状态
+
+    running 为并行改写各语料桶，committing 为暂停提交、追平改写期间的新写入并切换至新分桶
+    """
+
+    total_size: int = 0
+    """需改写的语料总大小(字节)"""
+
+    processed_size: int = 0
+    """已改写的语料大小(字节)"""
+
+    start_timestamp: int
+    """开始时间戳(毫秒)"""
+
+    end_timestamp: int | None = None
+    """结束时间戳(毫秒)"""
+
+    error: str | None = None
+    """失败原因"""
+
+
+class CorpusScanIssue(BaseModel):
+    """语料校验发现的问题"""
+
+    bucket_id: int
+    """分桶 id"""
+
+    offset: int
+    """问题语料行在语料桶中的逻辑偏移"""
+
+    kind: Literal['invalid', 'misplaced', 'truncated']
+    """
+    问题类型
+
+    invalid 为语料格式校验失败，misplaced 为语料不属于所在分桶，truncated 为语料桶末尾不完整的行
+    """
+
+    reason: str = ""
+    """问题描述"""
+
+
+class BucketScanResult(BaseModel):
+    """语料桶校验结果"""
+
+    bucket_id: int
+    """分桶 id"""
+
+    corpus_num: int = 0
+    """有效语料条数"""
+
+    invalid_num: int = 0
+    """格式校验失败的语料条数"""
+
+    misplaced_num: int = 0
+    """不属于该分桶的语料条数"""
+
+    truncated: bool = False
+    """末尾是否存在不完整的行"""
+
+    repaired: bool = False
+    """是否已改写修复"""
+
+
+class DatasetScanResult(BaseModel):
+    """数据集校验进度与结果"""
+
+    dataset_name: str
+    """数据集名称"""
+
+    repair: bool = False
+    """是否修复问题语料桶"""
+
+    status: Literal['running', 'committing', 'finished', 'failed'] = 'running'
+    """
+    校验状态
+
+    running 为并行校验各语料桶，committing 为暂停提交、校验期间的新写入并替换需修复的语料桶
+    """
+
+    total_size: int = 0
+    """需校验的语料总大小(字节)"""
+
+    processed_size: int = 0
+    """已校验的语料大小(字节)"""
+
+    buckets: list[BucketScanResult] = []
+    """各语料桶校验结果"""
+
+    issues: list[CorpusScanIssue] = []
+    """问题语料明细，最多记录 SCAN_MAX_ISSUES 条"""
+
+    relocated_num: int = 0
+    """修复时重新路由至所属分桶的语料条数"""
+
+    start_timestamp: int
+    """开始时间戳(毫秒)"""
+
+    end_timestamp: int | None = None
+    """结束时间戳(毫秒)"""
+
+    error: str | None = None
+    """失败原因"""
+
+
+class CorpusSearchHit(BaseModel):
+    """语料全文检索命中项"""
+
+    bucket_id: int
+    """分桶 id"""
+
+    offset: int
+    """语料在语料桶中的逻辑偏移"""
+
+    corpus: Corpus
+    """语料内容"""
+
+
+class CorpusSearchResult(BaseModel):
+    """语料全文检索结果"""
+
+    dataset_name: str
+    """数据集名称"""
+
+    hits: list[CorpusSearchHit] = []
+    """命中语料，按分桶 id 与逻辑偏移排序"""
+
+    cursor: str | None = None
+    """下一页游标，为 None 时表示没有更多结果"""
+
+
+class CorpusSplitSpec(BaseModel):
+    """
+    按内容哈希划分数据集的规则
+
+    语料所属划分只取决于语料内容、比例与 seed，与分桶数及写入顺序无关，追加语料不影响已有语料的划分
+    """
+
+    splits: dict[str, float] = {'train': 0.98, 'val': 0.01, 'test': 0.01}
+    """划分名称与比例，比例按总和归一化"""
+
+    seed: int = 0
+    """划分与抽样的随机种子"""
+
+
+class CorpusSplitExport(CorpusSplitSpec):
+    """导出数据集某一划分的请求"""
+
+    split: str
+    """导出的划分名称"""
+
+    manifest: bool = False
+    """为真时仅导出 (分桶 id, 逻辑偏移) 清单，不输出语料内容"""
+
+    bucket_start: int | None = None
+    """起始分桶 id"""
+
+    bucket_end: int | None = None
+    """结束分桶 id"""
+
+    snapshot: str | None = None
+    """数据集快照，续传时传回上次导出返回的 X-Corpus-Snapshot 以保证内容一致"""
+
+
+class CorpusSample(CorpusSplitSpec):
+    """数据集抽样请求"""
+
+    num: int
+    """抽样条数"""
+
+    split: str | None = None
+    """仅在该划分内抽样，为 None 时在全部语料中抽样"""
+
+    weight_field: str | None = None
+    """
+    权重字段，以 `.` 分隔的语料 JSON 字段路径
+
+    为 None 时均匀抽样；否则按该字段的数值加权抽样，字段缺失或不是正数的语料不参与抽样
+    """
+
+    manifest: bool = False
+    """为真时仅返回 (分桶 id, 逻辑偏移) 清单，不读取语料内容"""
+
+    bucket_start: int | None = None
+    """起始分桶 id"""
+
+    bucket_end: int | None = None
+    """结束分桶 id"""
+
+
+class CorpusSampleItem(BaseModel):
+    """抽样结果中的单条语料"""
+
+    bucket_id: int
+    """分桶 id"""
+
+    offset: int
+    """语料在语料桶中的逻辑偏移"""
+
+    corpus: Corpus | None = None
+    """语料内容，仅返回清单时为 None"""
+
+
+class CorpusSampleResult(BaseModel):
+    """数据集抽样结果"""
+
+    dataset_name: str
+    """数据集名称"""
+
+    snapshot: str
+    """抽样所基于的数据集快照，清单中的逻辑偏移在封存后仍然有效，重新分桶或修复后失效"""
+
+    eligible_num: int = 0
+    """参与抽样的语料条数"""
+
+    split_counts: dict[str, int] = {}
+    """各划分的语料条数，仅指定划分时统计"""
+
+    items: list[CorpusSampleItem] = []
+    """抽样结果，按抽样键值排序，即随机顺序"""
+
+
+class CorpusPage(BaseModel):
+    """按序号分页读取的数据集语料"""
+
+    dataset_name: str
+    """数据集名称"""
+
+    snapshot: str
+    """读取所基于的数据集快照，翻页时传回以保证各页序号一致"""
+
+    total: int = 0
+    """快照内的语料总条数"""
+
+    offset: int = 0
+    """本页首条语料的序号"""
+
+    items: list[Corpus] = []
+    """本页语料，按分桶 id 与写入顺序排列"""
+
+
+__all__ = [
+    "BucketStats",
+    "ReshardProgress",
+    "CorpusScanIssue",
+    "BucketScanResult",
+    "DatasetScanResult",
+    "DatasetDetail",
+    "CorpusBulkAddError",
+    "CorpusBulkAddResult",
+    "CorpusSearchHit",
+    "CorpusSearchResult",
+    "CorpusSplitSpec",
+    "CorpusSplitExport",
+    "CorpusSample",
+    "CorpusSampleItem",
+    "CorpusSampleResult",
+    "CorpusPage",
+]
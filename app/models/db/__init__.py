@@ -2,5 +2,6 @@ from app.common.models.db import *
 
 from .generation import *
 from .interaction import *
+from .rollup import *
 from .scene import *
 from .user import *
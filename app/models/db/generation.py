@@ -1,6 +1,7 @@
 """模型生成内容相关模型"""
 
 from sqlalchemy.dialects.postgresql import TEXT, BIGINT
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 from datetime import datetime
 
@@ -8,6 +9,11 @@ from datetime import datetime
 class Generation(SQLModel, table=True):
     """模型生成内容表模型"""
 
+    __table_args__ = (
+        Index('ix_generation_scene_id_timestamp', 'scene_id', 'timestamp'),
+        Index('ix_generation_interaction_id', 'interaction_id'),
+    )
+
     id: int | None = Field(default=None, primary_key=True, nullable=False)
     """生成内容主键 id"""
 
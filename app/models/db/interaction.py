@@ -1,6 +1,7 @@
 """用户的交互动作相关模型"""
 
 from sqlalchemy.dialects.postgresql import TEXT, JSONB, BIGINT
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 from datetime import datetime
 from typing import Annotated
@@ -9,11 +10,8 @@ from app.common.models.db.typing import JSONValue
 from app.common.models.db.enums import InteractionType
 
 
-class Interaction(SQLModel, table=True):
-    """交互行为记录表模型"""
-
-    id: int | None = Field(default=None, primary_key=True, nullable=False)
-    """交互行为主键 id"""
+class InteractionBase(SQLModel):
+    """交互行为记录模型，不含主键，用于批量写入"""
 
     timestamp: int = Field(
         default_factory=lambda: int(datetime.now().timestamp() * 1000),
@@ -68,6 +66,20 @@ class Interaction(SQLModel, table=True):
     """
 
 
+class Interaction(InteractionBase, table=True):
+    """交互行为记录表模型"""
+
+    __table_args__ = (
+        Index('ix_interaction_scene_id_timestamp', 'scene_id', 'timestamp'),
+        Index('ix_interaction_user_id_timestamp', 'user_id', 'timestamp'),
+        Index('ix_interaction_fields', 'fields', postgresql_using='gin'),
+    )
+
+    id: int | None = Field(default=None, primary_key=True, nullable=False)
+    """交互行为主键 id"""
+
+
 __all__ = [
+    "InteractionBase",
     "Interaction",
 ]
@@ -0,0 +1,71 @@
+"""交互行为汇总相关模型"""
+
+from sqlalchemy.dialects.postgresql import BIGINT
+from sqlalchemy import Index
+from sqlmodel import SQLModel, Field
+
+
+class Scene_Minute_Rollup(SQLModel, table=True):
+    """
+    场景每分钟交互行为汇总表模型
+
+    由交互行为批量写入时在同一事务中增量累加，场景活跃曲线与收入统计只读取本表
+    """
+
+    scene_id: int = Field(primary_key=True, nullable=False)
+    """应用场景实例系统标识"""
+
+    minute: int = Field(primary_key=True, sa_type=BIGINT, nullable=False)
+    """所在分钟起始时间戳(毫秒)"""
+
+    type: str = Field(primary_key=True, nullable=False)
+    """交互行为类型，取值同 InteractionType"""
+
+    interaction_num: int = Field(default=0, sa_type=BIGINT, nullable=False)
+    """交互行为条数"""
+
+    amount: int = Field(default=0, sa_type=BIGINT, nullable=False)
+    """交互行为总金额(分)"""
+
+    item_num: int = Field(default=0, sa_type=BIGINT, nullable=False)
+    """交互相关名称总数量"""
+
+
+class Scene_User_Rollup(SQLModel, table=True):
+    """
+    场景每用户交互行为汇总表模型
+
+    由交互行为批量写入时在同一事务中增量累加，场景用户排行只读取本表
+    """
+
+    __table_args__ = (
+        Index('ix_scene_user_rollup_scene_id_amount', 'scene_id', 'amount'),
+        Index('ix_scene_user_rollup_scene_id_interaction_num', 'scene_id', 'interaction_num'),
+    )
+
+    scene_id: int = Field(primary_key=True, nullable=False)
+    """应用场景实例系统标识"""
+
+    user_id: int = Field(primary_key=True, nullable=False)
+    """用户账号系统标识"""
+
+    interaction_num: int = Field(default=0, sa_type=BIGINT, nullable=False)
+    """交互行为条数"""
+
+    amount: int = Field(default=0, sa_type=BIGINT, nullable=False)
+    """交互行为总金额(分)"""
+
+    item_num: int = Field(default=0, sa_type=BIGINT, nullable=False)
+    """交互相关名称总数量"""
+
+    first_timestamp: int = Field(sa_type=BIGINT, nullable=False)
+    """首次交互时间戳(毫秒)"""
+
+    last_timestamp: int = Field(sa_type=BIGINT, nullable=False)
+    """最近交互时间戳(毫秒)"""
+
+
+__all__ = [
+    "Scene_Minute_Rollup",
+    "Scene_User_Rollup",
+]
@@ -1,6 +1,7 @@
 """场景相关模型"""
 
 from sqlalchemy.dialects.postgresql import JSONB, BIGINT
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 from datetime import datetime
 from typing import Annotated
@@ -16,6 +17,11 @@ class Scene_Info(SQLModel, table=True):
     应用场景指一段特定的应用区间，如一场直播、一段推文生成、一个社区回复主题等，不区分媒体平台
     """
 
+    __table_args__ = (
+        Index('ix_scene_info_start_timestamp_id', 'start_timestamp', 'id'),
+        Index('ix_scene_info_fields', 'fields', postgresql_using='gin'),
+    )
+
     id: int | None = Field(default=None, primary_key=True, nullable=False)
     """应用场景实例系统标识"""
 
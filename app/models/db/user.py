@@ -1,6 +1,7 @@
 """用户相关模型"""
 
 from sqlalchemy.dialects.postgresql import TEXT, JSONB, BIGINT
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 from datetime import datetime
 from typing import Annotated
@@ -16,6 +17,12 @@ class User_Info(SQLModel, table=True):
     本模型将存储用户多个媒体平台的账号，通过主副账号的方式提供跨平台的用户识别
     """
 
+    __table_args__ = (
+        Index('ix_user_info_register_timestamp_id', 'register_timestamp', 'id'),
+        Index('ux_user_info_platform_user_platform_id', 'platform', 'user_platform_id', unique=True),
+        Index('ix_user_info_platform_fields', 'platform_fields', postgresql_using='gin'),
+    )
+
     id: int | None = Field(default=None, primary_key=True, nullable=False)
     """
     用户账号系统标识
@@ -0,0 +1,69 @@
+"""生成内容接口相关模型"""
+
+from pydantic import BaseModel
+from typing import Literal
+
+from app.models.corpus import CorpusBulkAddResult
+
+
+class GenerationExport(BaseModel):
+    """导出生成内容至语料数据集请求"""
+
+    dataset_name: str
+    """目标数据集名称"""
+
+    scene_id: int | None = None
+    """仅导出该场景的生成内容，为空时导出全部场景"""
+
+    field_map: dict[str, str] = {'context': 'context', 'content': 'edited_content'}
+    """语料字段名与生成内容字段名映射表，映射后的对象需通过语料格式校验"""
+
+    edited_only: bool = True
+    """是否仅导出经人工修改的生成内容"""
+
+    restart: bool = False
+    """是否忽略导出进度标记，从头导出"""
+
+
+class GenerationExportProgress(BaseModel):
+    """生成内容导出进度"""
+
+    dataset_name: str
+    """目标数据集名称"""
+
+    scene_id: int | None = None
+    """导出的场景，为空时为全部场景"""
+
+    status: Literal['running', 'finished', 'failed'] = 'running'
+    """导出状态"""
+
+    start_id: int = 0
+    """本次导出的起点，仅导出 id 大于该值的生成内容"""
+
+    last_id: int = 0
+    """已写入完成的最后一条生成内容 id，即导出进度标记"""
+
+    last_timestamp: int | None = None
+    """已写入完成的最后一条生成内容时间戳(毫秒)"""
+
+    result: CorpusBulkAddResult
+    """
+    语料写入结果
+
+    被拒绝语料的 line 为对应生成内容 id
+    """
+
+    start_timestamp: int
+    """开始时间戳(毫秒)"""
+
+    end_timestamp: int | None = None
+    """结束时间戳(毫秒)"""
+
+    error: str | None = None
+    """失败原因"""
+
+
+__all__ = [
+    "GenerationExport",
+    "GenerationExportProgress",
+]
@@ -0,0 +1,66 @@
+"""交互行为接口相关模型"""
+
+from pydantic import BaseModel
+
+from app.models.db import InteractionBase
+from app.models.user import UserResolve
+
+
+class InteractionIngest(InteractionBase):
+    """批量写入的交互行为，可以媒体平台账号代替用户账号系统标识"""
+
+    user_id: int | None = None
+    """用户账号系统标识，为空时由 user 解析"""
+
+    user: UserResolve | None = None
+    """用户媒体平台账号，user_id 为空时经账号解析器获取(不存在时创建)用户账号系统标识"""
+
+
+class InteractionIngestResult(BaseModel):
+    """交互行为批量写入结果"""
+
+    accepted: int = 0
+    """本次接收的交互行为条数"""
+
+    pending: int = 0
+    """缓冲区中待写入数据库的交互行为条数"""
+
+
+class SceneMinuteActivity(BaseModel):
+    """场景每分钟交互行为汇总"""
+
+    minute: int
+    """所在分钟起始时间戳(毫秒)"""
+
+    interaction_num: int = 0
+    """交互行为条数"""
+
+    amount: int = 0
+    """交互行为总金额(分)"""
+
+    item_num: int = 0
+    """交互相关名称总数量"""
+
+
+class SceneTypeSummary(BaseModel):
+    """场景单一交互行为类型汇总"""
+
+    type: str
+    """交互行为类型"""
+
+    interaction_num: int = 0
+    """交互行为条数"""
+
+    amount: int = 0
+    """交互行为总金额(分)"""
+
+    item_num: int = 0
+    """交互相关名称总数量"""
+
+
+__all__ = [
+    "InteractionIngest",
+    "InteractionIngestResult",
+    "SceneMinuteActivity",
+    "SceneTypeSummary",
+]
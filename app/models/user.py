@@ -0,0 +1,49 @@
+"""用户接口相关模型"""
+
+from pydantic import BaseModel
+
+
+class UserResolve(BaseModel):
+    """待解析的媒体平台账号"""
+
+    platform: str
+    """用户账号所在媒体平台"""
+
+    user_platform_id: str
+    """用户媒体平台 id"""
+
+    user_name: str = ''
+    """用户名称，仅在账号不存在而新建时写入"""
+
+
+class ResolvedUser(BaseModel):
+    """解析后的媒体平台账号"""
+
+    platform: str
+    """用户账号所在媒体平台"""
+
+    user_platform_id: str
+    """用户媒体平台 id"""
+
+    id: int
+    """用户账号系统标识"""
+
+    main_id: int | None = None
+    """用户主账号系统标识"""
+
+
+class UserBind(BaseModel):
+    """绑定账号请求"""
+
+    main_id: int
+    """主账号系统标识"""
+
+    user_ids: list[int]
+    """需绑定至主账号的账号系统标识列表"""
+
+
+__all__ = [
+    "UserResolve",
+    "ResolvedUser",
+    "UserBind",
+]
@@ -1,3 +1,5 @@
 from .db import *
 from .log import *
 from .config import *
+from .executor import *
+from .metrics import *
@@ -1,4 +1,5 @@
-from pydantic import DirectoryPath, model_validator, PostgresDsn
+from pydantic import DirectoryPath, model_validator, UrlConstraints
+from pydantic_core import MultiHostUrl
 from pydantic_settings import (
     BaseSettings,
     SettingsConfigDict,
@@ -7,10 +8,22 @@ from pydantic_settings import (
 )
 from functools import lru_cache
 from pathlib import Path
+from typing import Annotated, Literal
+import json
 
 from .log import logger
 
 
+DatabaseDsn = Annotated[
+    MultiHostUrl,
+    UrlConstraints(
+        host_required=False,
+        allowed_schemes=['postgres', 'postgresql', 'postgresql+psycopg2', 'sqlite', 'sqlite+pysqlite'],
+    ),
+]
+"""数据库 URL 类型，支持 PostgreSQL 与 SQLite"""
+
+
 class Settings(BaseSettings):
     """全局配置类"""
 
@@ -20,14 +33,181 @@ class Settings(BaseSettings):
     base_prompt_data_dir: DirectoryPath | None = None
     """base prompt 数据目录"""
 
+    io_workers: int | None = None
+    """
+    阻塞 IO 线程池的线程数上限，为空时取 min(32, CPU 核心数 + 4)
+
+    文件读写等阻塞操作均在该线程池中执行，避免阻塞事件循环
+    """
+
+    metrics: bool = True
+    """是否采集运行指标并在 /metrics 以 Prometheus 文本格式暴露"""
+
+    base_prompt_watch: bool = True
+    """是否监听 base prompt 目录变更并自动增量载入"""
+
     corpus_data_dir: DirectoryPath | None = None
     """微调语料库数据目录"""
 
-    db_url: PostgresDsn | None = None
+    corpus_info_watch: bool = True
+    """
+    是否监听语料库目录变更以失效数据集信息缓存
+
+    监听不可用或关闭时，数据集信息缓存按 INFO.json 的 mtime 校验
+    """
+
+    corpus_write_batch_size: int = 512
+    """语料桶文件单次分组提交的最大语料条数"""
+
+    corpus_write_delay: float = 0
+    """
+    语料桶文件分组提交前的最大凑批等待时间(秒)
+
+    为 0 时不额外等待，仅合并上一次提交期间到达的语料
+    """
+
+    corpus_write_durability: Literal['none', 'flush', 'fsync'] = 'flush'
+    """
+    语料桶文件提交持久化级别
+
+    none 仅写入进程缓冲区，flush 每次提交后写入操作系统，fsync 每次提交后同步至磁盘
+    """
+
+    corpus_write_lock: bool = True
+    """
+    是否以跨进程文件锁保护语料桶写入
+
+    多个 worker 进程共用同一语料目录时必须启用；启用后每次提交均在锁内写入操作系统
+    """
+
+    corpus_dedup: bool = True
+    """是否对数据集语料按内容哈希去重"""
+
+    corpus_dedup_max_digests: int = 1_000_000
+    """语料去重索引在内存中最多保留的摘要条数，超出后按语料桶淘汰"""
+
+    corpus_stats_flush_interval: float = 1
+    """
+    数据集统计信息写回 STATS.json 的最大间隔(秒)
+
+    统计信息随提交在内存中更新，按该间隔及关闭时写回；为 0 时每次提交后立即写回
+    """
+
+    corpus_search_index: bool = False
+    """
+    是否维护语料全文检索索引
+
+    启用后每次提交同步写入数据集的 SQLite FTS5 检索数据库，未索引的语料在首次检索时由语料桶文件补齐
+    """
+
+    corpus_offset_index: bool = True
+    """
+    是否随写入维护语料桶行偏移索引
+
+    行偏移索引用于按序号分页读取语料；关闭时写入不维护，未索引的语料在首次分页读取时由语料桶文件补齐
+    """
+
+    corpus_reshard_workers: int | None = None
+    """重新分桶时并行改写语料桶的进程数，为空时取 CPU 核心数"""
+
+    corpus_scan_workers: int | None = None
+    """校验语料时的并行进程数，为空时取 CPU 核心数"""
+
+    corpus_sample_workers: int | None = None
+    """抽样时并行扫描语料桶的进程数，为空时取 CPU 核心数"""
+
+    corpus_bulk_window: int = 4096
+    """批量添加语料时同时在途(已提交未落盘)的最大语料条数"""
+
+    corpus_bulk_max_line_bytes: int = 1 << 20
+    """批量添加语料时单行 NDJSON 最大字节数"""
+
+    corpus_seal_block_size: int = 1 << 20
+    """封存语料桶时单个压缩块的原始大小(字节)，块为随机读取的最小解压单位"""
+
+    corpus_seal_compress_level: int = 6
+    """封存语料桶时的 gzip 压缩等级(1 ~ 9)"""
+
+    db_url: DatabaseDsn | None = None
     """
-    PostgreSQL 的 URL 路径
-    
+    数据库的 URL 路径
+
     期望格式：postgresql://[name]:[password]@[host]:[post]/[database]
+
+    亦可为 SQLite 数据库文件，如 sqlite:///[path]，便于脱离 PostgreSQL 运行与测试；分区等特性仅支持 PostgreSQL
+    """
+
+    db_pool_size: int = 5
+    """异步数据库连接池常驻连接数"""
+
+    db_max_overflow: int = 10
+    """异步数据库连接池在常驻连接之外允许临时创建的连接数"""
+
+    db_pool_timeout: float = 30
+    """从异步数据库连接池获取连接的最大等待时间(秒)"""
+
+    db_pool_recycle: int = 1800
+    """异步数据库连接的最大复用时间(秒)，超时的连接将在下次取出时重建，为 -1 时不限制"""
+
+    db_pool_pre_ping: bool = True
+    """取出连接时是否先检测连接可用性，可避免使用已被服务端断开的连接"""
+
+    db_statement_cache_size: int = 100
+    """
+    每个异步数据库连接的预编译语句缓存条数
+
+    经由 PgBouncer 等事务级连接池访问数据库时需设为 0
+    """
+
+    db_partition: bool = False
+    """
+    是否按时间戳对交互行为与生成内容表进行范围分区(仅 PostgreSQL)
+
+    仅在建表时生效，已存在的非分区表不会被转换；分区表主键为 (id, timestamp)
+    """
+
+    db_partition_months_ahead: int = 12
+    """每次检查数据表时预先创建的月分区数，超出已建分区范围的记录将写入默认分区"""
+
+    generation_export_batch_size: int = 10000
+    """导出生成内容至语料数据集时服务端游标单次取回的条数，亦为进度标记的保存间隔"""
+
+    user_resolve_cache_size: int = 100_000
+    """用户账号解析缓存最大条目数，为 0 时不缓存"""
+
+    user_resolve_cache_ttl: float = 300
+    """
+    用户账号解析缓存有效期(秒)
+
+    本进程绑定账号时立即失效对应缓存，该值限制其他进程绑定账号后本进程读到旧 main_id 的最长时间
+    """
+
+    interaction_ingest_batch_size: int = 2000
+    """交互行为批量写入时单次写入数据库的最大条数"""
+
+    interaction_ingest_flush_interval: float = 0.2
+    """交互行为缓冲区未满一批时的最大等待时间(秒)"""
+
+    interaction_ingest_max_pending: int = 100_000
+    """交互行为缓冲区最大待写入条数(含写入中与等待重试的批次)，超出后写入请求将等待缓冲区腾出空间"""
+
+    interaction_ingest_put_timeout: float = 5
+    """交互行为缓冲区已满时写入请求的最大等待时间(秒)，超时将拒绝请求"""
+
+    interaction_ingest_max_retries: int = 5
+    """交互行为批量写入失败时的最大重试次数，重试均失败的批次将被丢弃"""
+
+    interaction_ingest_retry_delay: float = 0.5
+    """交互行为批量写入首次重试前的等待时间(秒)，此后每次重试等待时间翻倍"""
+
+    interaction_ingest_copy: bool = True
+    """PostgreSQL 下是否使用 COPY 批量写入交互行为，否则使用多行 INSERT"""
+
+    interaction_rollup: bool = True
+    """
+    是否在批量写入交互行为时于同一事务中累加场景汇总表
+
+    仅统计经由批量写入接口写入的交互行为
     """
 
     model_config = SettingsConfigDict(
@@ -72,10 +252,20 @@ class Settings(BaseSettings):
 def get_settings(*args, **kwargs) -> Settings:
     """构建配置实例，可自定义参数，所构建实例与全局配置实例不为同一对象"""
     settings = Settings(*args, **kwargs)
-    logger.debug("新生成配置实例内容如下：" + settings.model_dump_json())
+    logger.debug("新生成配置实例中的非默认配置项如下：" + describe_settings(settings))
     return settings
 
 
+def describe_settings(settings: Settings) -> str:
+    """序列化配置实例中的非默认配置项，数据库 URL 中的密码将被隐藏"""
+    values = settings.model_dump(mode='json', exclude_defaults=True)
+    if settings.db_url is not None:
+        for host in settings.db_url.hosts():
+            if host['password']:
+                values['db_url'] = values['db_url'].replace(f":{host['password']}@", ':***@')
+    return json.dumps(values, ensure_ascii=False)
+
+
 def refresh_settings() -> Settings:
     """刷新全局配置实例，这将重新读取配置文件"""
     global settings
@@ -1,13 +1,30 @@
 from sqlmodel import create_engine, SQLModel, Session
-from sqlalchemy.engine import Engine
-from typing import Generator
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy import Index, MetaData, Table, func, inspect, select, text
+from datetime import datetime, timezone
+from typing import AsyncGenerator, Generator
+import asyncio
+import time
 
 from .config import settings
 from .log import logger
+from .metrics import db_session_acquire
 
 from app.models.db import *
 
 
+@compiles(JSONB, 'sqlite')
+def compile_jsonb_sqlite(type_, compiler, **kw) -> str:
+    """SQLite 没有 JSONB 类型，建表时以 JSON 代替，读写仍按 JSON 序列化"""
+    return 'JSON'
+
+
 def init_engine():
     """创建全局 Engine 对象"""
     global engine
@@ -21,34 +38,253 @@ def init_engine():
         logger.debug("初始化 sqlmodel Engine 对象完成。")
 
 
+PARTITIONED_TABLE_NAMES = (Interaction.__tablename__, Generation.__tablename__)
+"""按时间戳范围分区的数据表名称"""
+
+PARTITION_KEY = 'timestamp'
+"""分区键列名"""
+
+
 def check_db_tables():
-    """检查数据表，若表不存在，则完成建表操作"""
+    """
+    检查数据表，若表不存在，则完成建表操作
+
+    已存在的表将补建缺失的索引；启用分区时，分区表在建表时以分区形式创建，并补建未来的月分区
+    """
     global engine
     if engine is None:
         logger.warning("Engine 对象不存在，无法检查数据表，已略过。")
         return
-    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        if settings.db_partition and conn.dialect.name == 'postgresql':
+            for table_name in PARTITIONED_TABLE_NAMES:
+                table = SQLModel.metadata.tables[table_name]
+                if not inspect(conn).has_table(table_name):
+                    create_partitioned_table(conn, table)
+                if is_partitioned_table(conn, table_name):
+                    create_month_partitions(conn, table_name, settings.db_partition_months_ahead)
+                else:
+                    logger.warning(f"数据表 {table_name} 已存在且未分区，不会转换为分区表。")
+        SQLModel.metadata.create_all(conn)
+        skipped_indexes.clear()
+        for table in SQLModel.metadata.tables.values():
+            existing = {index['name'] for index in inspect(conn).get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in existing:
+                    continue
+                if index.unique and (duplicates := find_duplicates(conn, index)):
+                    skipped_indexes.add(index.name)
+                    logger.error(
+                        f"数据表 {table.name} 中存在 ({', '.join(column.name for column in index.columns)}) 重复的记录，"
+                        f"无法补建唯一索引 {index.name}，已略过；依赖该索引的功能将不可用，"
+                        f"请合并重复记录后重启服务以补建索引。部分重复值：{duplicates}"
+                    )
+                    continue
+                logger.info(f"正在为数据表 {table.name} 补建索引 {index.name}，数据量较大时可能耗时较长。")
+                index.create(conn)
     logger.debug(f"检查数据表完成，当前元数据中的表如下：{', '.join(SQLModel.metadata.tables.keys())}。")
 
 
+def find_duplicates(conn: Connection, index: Index, limit: int = 5) -> list[tuple]:
+    """查找违反唯一索引 index 的重复值，至多返回 limit 组"""
+    columns = list(index.columns)
+    return [
+        tuple(row) for row in conn.execute(
+            select(*columns).group_by(*columns).having(func.count() > 1).limit(limit)
+        )
+    ]
+
+
+def create_partitioned_table(conn: Connection, table: Table):
+    """
+    按 table 的定义以时间戳范围分区表的形式建表，并创建默认分区
+
+    PostgreSQL 要求分区表的主键包含分区键，因此主键改为 (id, timestamp)，id 仍为自增列；
+    索引按原定义(含 GIN 等索引方法)建在分区表上，由各分区继承
+    """
+    columns = [column._copy() for column in table.columns]
+    for column in columns:
+        if column.name == PARTITION_KEY:
+            column.primary_key = True
+        elif column.primary_key:
+            column.autoincrement = True
+    partitioned = Table(
+        table.name,
+        MetaData(),
+        *columns,
+        postgresql_partition_by=f'RANGE ({PARTITION_KEY})',
+    )
+    for index in table.indexes:
+        Index(
+            index.name,
+            *(partitioned.c[column.name] for column in index.columns),
+            unique=index.unique,
+            **index.dialect_kwargs,
+        )
+    partitioned.create(conn)
+    conn.execute(text(f'CREATE TABLE "{table.name}_default" PARTITION OF "{table.name}" DEFAULT'))
+    logger.success(f"已创建按时间戳分区的数据表 {table.name}。")
+
+
+def is_partitioned_table(conn: Connection, table_name: str) -> bool:
+    return conn.execute(
+        text(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+        ),
+        {'name': table_name},
+    ).first() is not None
+
+
+def create_month_partitions(conn: Connection, table_name: str, months_ahead: int):
+    """
+    补建当前月(UTC)起共 months_ahead + 1 个月分区，已存在的分区将被略过
+
+    默认分区中已有对应时间范围的记录时该月分区无法创建，将记录警告并略过
+    """
+    now = datetime.now(timezone.utc)
+    year, month = now.year, now.month
+    for _ in range(months_ahead + 1):
+        next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+        start = int(datetime(year, month, 1, tzinfo=timezone.utc).timestamp() * 1000)
+        end = int(datetime(next_year, next_month, 1, tzinfo=timezone.utc).timestamp() * 1000)
+        partition_name = f'{table_name}_p{year:04d}{month:02d}'
+        try:
+            with conn.begin_nested():
+                conn.execute(text(
+                    f'CREATE TABLE IF NOT EXISTS "{partition_name}" PARTITION OF "{table_name}" '
+                    f'FOR VALUES FROM ({start}) TO ({end})'
+                ))
+        except DBAPIError as e:
+            logger.warning(f"数据表 {table_name} 的分区 {partition_name} 创建失败，已略过：{e.orig!r}")
+        year, month = next_year, next_month
+
+
 def get_session() -> Generator[Session, None, None]:
-    """通过依赖注入获取 Session 实例"""
-    global engine
-    if engine is None:
+    """通过依赖注入获取 Session 实例，提供前即从连接池取得连接，获取耗时计入运行指标"""
+    if get_engine() is None:
         logger.warning("Engine 对象不存在，无法提供 Session 对象。")
         raise ValueError("Engine 对象不存在，无法提供 Session 对象。")
     with Session(engine) as session:
+        start = time.perf_counter()
+        session.connection()
+        session_acquire_sync.observe(time.perf_counter() - start)
+        yield session
+
+
+def create_db_async_engine(url: str) -> AsyncEngine:
+    """
+    按配置创建异步 Engine 对象
+
+    PostgreSQL 使用 asyncpg 驱动并按配置设置连接池与预编译语句缓存；SQLite 使用 aiosqlite 驱动，便于脱离 PostgreSQL 验证
+    """
+    db_url = make_url(url)
+    if db_url.get_backend_name() == 'sqlite':
+        return create_async_engine(db_url.set(drivername='sqlite+aiosqlite'))
+    return create_async_engine(
+        db_url.set(drivername='postgresql+asyncpg').update_query_dict(
+            {'prepared_statement_cache_size': str(settings.db_statement_cache_size)}
+        ),
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args={'statement_cache_size': settings.db_statement_cache_size},
+    )
+
+
+def get_upsert_insert(dialect_name: str):
+    """获取支持 ON CONFLICT 的 insert 构造函数，仅支持 PostgreSQL 与 SQLite"""
+    if dialect_name == 'postgresql':
+        return postgresql.insert
+    if dialect_name == 'sqlite':
+        return sqlite.insert
+    raise ValueError(f"不支持的数据库类型 {dialect_name}。")
+
+
+def init_async_engine():
+    """创建全局异步 Engine 对象"""
+    global async_engine
+    if async_engine is not None:
+        return
+    if settings.db_url is None:
+        logger.warning("数据库 URL 配置项为空，未初始化异步 Engine 对象。")
+        return
+    async_engine = create_db_async_engine(settings.db_url.unicode_string())
+    logger.debug("初始化异步 Engine 对象完成。")
+
+
+def get_engine() -> Engine | None:
+    """获取全局 Engine 对象，尚未创建时按配置创建，数据库 URL 配置项为空时返回 None"""
+    if engine is None and settings.db_url is not None:
+        init_engine()
+    return engine
+
+
+def get_async_engine() -> AsyncEngine | None:
+    """获取全局异步 Engine 对象，尚未创建时按配置创建，数据库 URL 配置项为空时返回 None"""
+    if async_engine is None and settings.db_url is not None:
+        init_async_engine()
+    return async_engine
+
+
+async def init_db():
+    """
+    创建全局 Engine 对象并检查数据表，于应用启动时调用
+
+    Engine 对象创建不连接数据库；建表与补建索引需与数据库往返，在线程池中执行
+    """
+    init_engine()
+    init_async_engine()
+    await asyncio.to_thread(check_db_tables)
+
+
+async def dispose_async_engine():
+    """关闭全局异步 Engine 对象的全部连接"""
+    global async_engine
+    if async_engine is not None:
+        await async_engine.dispose()
+        async_engine = None
+
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    """通过依赖注入获取 AsyncSession 实例，提供前即从连接池取得连接，获取耗时计入运行指标"""
+    if get_async_engine() is None:
+        logger.warning("异步 Engine 对象不存在，无法提供 AsyncSession 对象。")
+        raise ValueError("异步 Engine 对象不存在，无法提供 AsyncSession 对象。")
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        start = time.perf_counter()
+        await session.connection()
+        session_acquire_async.observe(time.perf_counter() - start)
         yield session
 
 
 engine: Engine | None = None
 """sqlmodel Engine 对象"""
 
-init_engine()
+async_engine: AsyncEngine | None = None
+"""sqlmodel 异步 Engine 对象"""
+
+skipped_indexes: set[str] = set()
+"""检查数据表时因已有重复记录而未能补建的唯一索引名称"""
+
+session_acquire_sync = db_session_acquire.labels('sync')
+"""同步会话获取连接耗时指标"""
 
-check_db_tables()
+session_acquire_async = db_session_acquire.labels('async')
+"""异步会话获取连接耗时指标"""
 
 __all__ = [
     "engine",
+    "async_engine",
+    "skipped_indexes",
+    "get_engine",
+    "get_async_engine",
     "get_session",
+    "get_async_session",
+    "init_db",
+    "create_db_async_engine",
+    "get_upsert_insert",
+    "dispose_async_engine",
 ]
@@ -0,0 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+
+from .config import settings
+from .log import logger
+
+io_executor: ThreadPoolExecutor | None = None
+"""
+阻塞 IO 线程池
+
+安装后作为事件循环的默认执行器，asyncio.to_thread 等调用均在其中执行；每次应用生命周期各自创建，
+退出时关闭并置为 None，同一进程中再次启动应用(如测试中多次进入 TestClient)时重新创建
+"""
+
+
+def install_io_executor():
+    """创建有界阻塞 IO 线程池并设为当前事件循环的默认执行器，需在事件循环中调用"""
+    global io_executor
+    if io_executor is None:
+        io_executor = ThreadPoolExecutor(max_workers=settings.io_workers, thread_name_prefix='io')
+        logger.debug(f"阻塞 IO 线程池创建完成，线程数上限为 {io_executor._max_workers}。")
+    asyncio.get_running_loop().set_default_executor(io_executor)
+
+
+async def shutdown_io_executor():
+    """等待进行中的任务完成后关闭阻塞 IO 线程池，需在安装该线程池的事件循环中于应用退出时调用"""
+    global io_executor
+    if io_executor is None:
+        return
+    io_executor = None
+    await asyncio.get_running_loop().shutdown_default_executor()
+    logger.debug("阻塞 IO 线程池已关闭。")
+
+
+__all__ = [
+    "install_io_executor",
+    "shutdown_io_executor",
+]
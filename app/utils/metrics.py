@@ -0,0 +1,233 @@
+"""
+服务运行指标
+
+以 Prometheus 文本格式在 /metrics 暴露；未安装 prometheus_client 或 metrics 配置项关闭时，各指标均为空操作对象。
+热路径上的指标应在初始化时以 labels() 绑定标签后保存子指标，调用时只做数值累加，不做字符串格式化
+"""
+
+from typing import Callable, Mapping
+from time import perf_counter
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+    from prometheus_client.core import GaugeMetricFamily
+except ImportError:
+    CollectorRegistry = Counter = Gauge = Histogram = None
+
+from .config import settings
+from .log import logger
+
+METRIC_PREFIX = 'teaine_'
+"""指标名称前缀"""
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+"""耗时直方图分桶上界(秒)，覆盖文件锁等待等亚毫秒级耗时"""
+
+
+class NoopMetric:
+    """未启用指标时的空操作指标，接口与 prometheus_client 指标一致"""
+
+    def labels(self, *_, **__) -> 'NoopMetric':
+        return self
+
+    def inc(self, amount: float = 1):
+        pass
+
+    def dec(self, amount: float = 1):
+        pass
+
+    def set(self, value: float):
+        pass
+
+    def observe(self, value: float):
+        pass
+
+
+NOOP_METRIC = NoopMetric()
+
+QueueDepthGetter = Callable[[], Mapping[str, int]]
+"""返回写入目标与待写入条数映射表的回调"""
+
+
+class QueueDepthCollector:
+    """在抓取时调用各缓冲写入器注册的回调读取队列深度，写入路径上无需维护计数"""
+
+    def __init__(self):
+        self.getters: dict[str, QueueDepthGetter] = dict()
+
+    def collect(self):
+        family = GaugeMetricFamily(
+            METRIC_PREFIX + 'queue_depth',
+            "缓冲写入器中已提交但尚未写入的条数",
+            labels=['queue', 'target'],
+        )
+        for queue, get_depths in list(self.getters.items()):
+            try:
+                depths = get_depths()
+            except Exception as e:
+                logger.warning(f"读取队列 {queue} 深度失败：{e!r}")
+                continue
+            for target, depth in depths.items():
+                family.add_metric([queue, target], depth)
+        yield family
+
+    def describe(self):
+        return []
+
+
+registry = CollectorRegistry() if settings.metrics and CollectorRegistry is not None else None
+"""指标注册表，未启用指标时为 None"""
+
+queue_depth_collector = QueueDepthCollector()
+"""队列深度采集器"""
+
+if registry is not None:
+    registry.register(queue_depth_collector)
+
+
+def _create(metric_type, name: str, documentation: str, labelnames: tuple[str, ...] = (), **kwargs):
+    if registry is None:
+        return NOOP_METRIC
+    return metric_type(METRIC_PREFIX + name, documentation, labelnames, registry=registry, **kwargs)
+
+
+def register_queue_depth(queue: str, get_depths: QueueDepthGetter):
+    """注册缓冲写入器的队列深度回调，同名队列后注册的覆盖先注册的"""
+    if registry is not None:
+        queue_depth_collector.getters[queue] = get_depths
+
+
+class MetricsMiddleware:
+    """
+    统计 HTTP 请求处理耗时与状态码的 ASGI 中间件
+
+    以匹配到的路由模板(而非实际路径)作为标签，未匹配路由的请求统一记为 unmatched；
+    各 (方法, 路由, 状态码) 组合的子指标首次出现时绑定并缓存，此后每次请求只做数值累加
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._children: dict[tuple[str, str, int], tuple] = dict()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get('route')
+            key = (scope['method'], 'unmatched' if route is None else route.path, status)
+            children = self._children.get(key)
+            if children is None:
+                children = self._children[key] = (
+                    http_request_duration.labels(key[0], key[1]),
+                    http_requests.labels(key[0], key[1], str(status)),
+                )
+            children[0].observe(perf_counter() - start)
+            children[1].inc()
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """以 Prometheus 文本格式输出全部指标，返回 (内容, Content-Type)"""
+    if CollectorRegistry is None:
+        raise ValueError("未安装 prometheus_client，无法输出运行指标。")
+    if registry is None:
+        raise ValueError("运行指标未启用。")
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+http_request_duration = _create(
+    Histogram,
+    'http_request_duration_seconds',
+    "HTTP 请求处理耗时，按路由模板统计",
+    ('method', 'route'),
+    buckets=LATENCY_BUCKETS,
+)
+"""HTTP 请求处理耗时"""
+
+http_requests = _create(
+    Counter,
+    'http_requests',
+    "HTTP 请求数",
+    ('method', 'route', 'status'),
+)
+"""HTTP 请求数"""
+
+corpus_lock_wait = _create(
+    Histogram,
+    'corpus_bucket_lock_wait_seconds',
+    "语料桶提交等待语料桶文件锁的耗时",
+    ('dataset', 'bucket'),
+    buckets=LATENCY_BUCKETS,
+)
+"""语料桶提交等待文件锁的耗时"""
+
+corpus_write = _create(
+    Histogram,
+    'corpus_bucket_write_seconds',
+    "语料桶提交在文件锁内检查、写入与更新附属数据的耗时",
+    ('dataset', 'bucket'),
+    buckets=LATENCY_BUCKETS,
+)
+"""语料桶提交在文件锁内的耗时"""
+
+corpus_written_lines = _create(
+    Counter,
+    'corpus_bucket_written_lines',
+    "写入语料桶的语料条数",
+    ('dataset', 'bucket'),
+)
+"""写入语料桶的语料条数"""
+
+base_prompt_refresh_duration = _create(
+    Histogram,
+    'base_prompt_refresh_seconds',
+    "base prompt 目录增量载入耗时",
+    buckets=LATENCY_BUCKETS,
+)
+"""base prompt 目录增量载入耗时"""
+
+base_prompt_files = _create(Gauge, 'base_prompt_files', "已载入的 base prompt 文件数")
+"""已载入的 base prompt 文件数"""
+
+base_prompt_reloaded_files = _create(
+    Counter,
+    'base_prompt_reloaded_files',
+    "增量载入时重新读取或移除的 base prompt 文件数",
+)
+"""增量载入时变更的 base prompt 文件数"""
+
+db_session_acquire = _create(
+    Histogram,
+    'db_session_acquire_seconds',
+    "依赖注入提供数据库会话时获取连接的耗时，含连接池等待",
+    ('mode',),
+    buckets=LATENCY_BUCKETS,
+)
+"""数据库会话获取连接的耗时"""
+
+__all__ = [
+    "NOOP_METRIC",
+    "MetricsMiddleware",
+    "register_queue_depth",
+    "render_metrics",
+    "http_request_duration",
+    "http_requests",
+    "corpus_lock_wait",
+    "corpus_write",
+    "corpus_written_lines",
+    "base_prompt_refresh_duration",
+    "base_prompt_files",
+    "base_prompt_reloaded_files",
+    "db_session_acquire",
+]
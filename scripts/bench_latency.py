@@ -0,0 +1,77 @@
+"""
+/corpus/add 延迟压测
+
+在 /corpus/info 与 /base_prompt/refresh 并发请求的干扰下持续添加语料，统计各接口延迟分位数。
+需先启动服务并创建数据集，corpus 文件为每行一条 Corpus JSON 的 NDJSON 文件(各行内容应互不相同，否则重复语料将被拒绝)。
+
+    python scripts/bench_latency.py --dataset bench --corpus-file corpus.jsonl
+"""
+
+from argparse import ArgumentParser
+from collections import defaultdict
+from itertools import cycle
+import asyncio
+import json
+import time
+
+import httpx
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)] if values else float('nan')
+
+
+async def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--dataset', required=True, help="目标数据集名称")
+    parser.add_argument('--corpus-file', required=True, help="NDJSON 语料文件")
+    parser.add_argument('--duration', type=float, default=30, help="压测时长(秒)")
+    parser.add_argument('--add-concurrency', type=int, default=32)
+    parser.add_argument('--info-concurrency', type=int, default=8)
+    parser.add_argument('--refresh-concurrency', type=int, default=2)
+    args = parser.parse_args()
+
+    with open(args.corpus_file, encoding='utf-8-sig') as f:
+        corpora = cycle([json.loads(line) for line in f if line.strip()])
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    deadline = time.perf_counter() + args.duration
+
+    async def worker(client: httpx.AsyncClient, name: str, request):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await request(client)
+            latencies[name].append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors[name] += 1
+
+    async def add(client: httpx.AsyncClient):
+        return await client.post('/corpus/add', json={'dataset_name': args.dataset, 'corpus': next(corpora)})
+
+    async def info(client: httpx.AsyncClient):
+        return await client.get('/corpus/info')
+
+    async def refresh(client: httpx.AsyncClient):
+        return await client.get('/base_prompt/refresh')
+
+    limits = httpx.Limits(max_connections=args.add_concurrency + args.info_concurrency + args.refresh_concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        await asyncio.gather(
+            *(worker(client, '/corpus/add', add) for _ in range(args.add_concurrency)),
+            *(worker(client, '/corpus/info', info) for _ in range(args.info_concurrency)),
+            *(worker(client, '/base_prompt/refresh', refresh) for _ in range(args.refresh_concurrency)),
+        )
+
+    print(f"{'接口':<24}{'请求数':>8}{'非 200':>8}{'p50(ms)':>10}{'p90(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}")
+    for name, values in latencies.items():
+        print(
+            f"{name:<24}{len(values):>8}{errors[name]:>8}"
+            f"{percentile(values, 0.5) * 1000:>10.2f}{percentile(values, 0.9) * 1000:>10.2f}"
+            f"{percentile(values, 0.99) * 1000:>10.2f}{max(values) * 1000:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,144 @@
+"""
+语料桶多进程写入压测
+
+启动多个独立进程，以与服务相同的 BucketWriter 与去重、统计钩子并发写入同一组语料桶文件，结束后校验：
+每行均为完整的 JSON，各进程写入条数无缺失，跨进程重复的语料仅被接受一次，STATS.json 与去重摘要文件与语料桶一致。
+任一校验失败时以非零状态码退出。
+
+    python scripts/stress_multiprocess_write.py --processes 8 --lines 5000
+"""
+
+from argparse import ArgumentParser
+from multiprocessing import get_context
+from collections import Counter
+from pathlib import Path
+import tempfile
+import asyncio
+import random
+import json
+import sys
+import os
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+SHARED_LINE_NUM = 100
+"""各进程均写入的相同语料条数，用于校验跨进程去重"""
+
+
+def get_bucket_paths(dataset_dir: Path, bucket_num: int) -> list[Path]:
+    from app.core.corpus.const import get_bucket_file_name
+
+    return [dataset_dir / get_bucket_file_name(bucket_id) for bucket_id in range(1, bucket_num + 1)]
+
+
+def worker(dataset_dir: str, bucket_num: int, worker_id: int, line_num: int, seed: int) -> tuple[int, int]:
+    """在独立进程中写入 line_num 条本进程语料与 SHARED_LINE_NUM 条共享语料，返回各自被接受的条数"""
+    from app.core.corpus.dedup import CorpusDedupIndex, DuplicateCorpusError
+    from app.core.corpus.stats import CorpusStatsIndex
+    from app.core.corpus.writer import BucketWriter
+
+    rng = random.Random(seed + worker_id)
+    hooks = [CorpusDedupIndex(1 << 24), CorpusStatsIndex()]
+    paths = get_bucket_paths(Path(dataset_dir), bucket_num)
+    writers = [BucketWriter(path, batch_size=64, delay=0, durability='flush', hooks=hooks) for path in paths]
+    lines = [(True, {'worker': worker_id, 'seq': seq, 'pad': 'x' * rng.randrange(4096)}) for seq in range(line_num)]
+    lines += [(False, {'shared': seq}) for seq in range(SHARED_LINE_NUM)]
+    rng.shuffle(lines)
+
+    async def run() -> tuple[int, int]:
+        futures = []
+        for own, item in lines:
+            line = json.dumps(item, ensure_ascii=False).encode('utf-8') + b'\n'
+            bucket_id = item.get('shared', item.get('seq', 0)) % bucket_num
+            futures.append((own, writers[bucket_id].submit(line)))
+            if len(futures) % 256 == 0:
+                await asyncio.sleep(0)
+        own_num = shared_num = 0
+        for own, future in futures:
+            try:
+                await future
+            except DuplicateCorpusError:
+                continue
+            if own:
+                own_num += 1
+            else:
+                shared_num += 1
+        await asyncio.gather(*(writer.close() for writer in writers))
+        return own_num, shared_num
+
+    return asyncio.run(run())
+
+
+def verify(dataset_dir: Path, bucket_num: int, process_num: int, line_num: int, shared_num: int) -> list[str]:
+    from app.core.corpus.dedup import DIGEST_SIZE, get_digest_file_path
+    from app.core.corpus.reader import get_bucket_size, iter_bucket_lines_sync
+    from app.core.corpus.const import STATS_FILENAME
+    from app.models.corpus import BucketStats
+
+    problems = []
+    own_counter: Counter[int] = Counter()
+    shared_counter: Counter[int] = Counter()
+    data = json.loads((dataset_dir / STATS_FILENAME).read_text(encoding='utf-8-sig'))
+    stats = {item['bucket_id']: BucketStats.model_validate(item) for item in data['buckets']}
+    for bucket_id, path in enumerate(get_bucket_paths(dataset_dir, bucket_num), start=1):
+        size = get_bucket_size(path)
+        corpus_num = 0
+        for offset, line in iter_bucket_lines_sync(path, 0, size):
+            corpus_num += 1
+            try:
+                item = json.loads(line)
+            except ValueError:
+                problems.append(f"语料桶 {bucket_id} 偏移 {offset} 处存在不完整的行：{line[:80]!r}")
+                continue
+            if 'shared' in item:
+                shared_counter[item['shared']] += 1
+            else:
+                own_counter[item['worker']] += 1
+        bucket_stats = stats.get(bucket_id, BucketStats(bucket_id=bucket_id))
+        if bucket_stats.corpus_num != corpus_num or bucket_stats.size != size:
+            problems.append(
+                f"语料桶 {bucket_id} 统计信息不一致：STATS.json 记录 {bucket_stats.corpus_num} 条 "
+                f"{bucket_stats.size} 字节，实际 {corpus_num} 条 {size} 字节"
+            )
+        digest_size = get_digest_file_path(path).stat().st_size if get_digest_file_path(path).is_file() else 0
+        if digest_size != corpus_num * DIGEST_SIZE:
+            problems.append(f"语料桶 {bucket_id} 去重摘要 {digest_size // DIGEST_SIZE} 条，实际语料 {corpus_num} 条")
+    for worker_id in range(process_num):
+        if own_counter[worker_id] != line_num:
+            problems.append(f"进程 {worker_id} 写入 {line_num} 条，语料桶中仅有 {own_counter[worker_id]} 条")
+    duplicated = [seq for seq, num in shared_counter.items() if num != 1]
+    if len(shared_counter) != SHARED_LINE_NUM or duplicated:
+        problems.append(f"共享语料应各出现 1 次，实际 {len(shared_counter)} 种，重复 {len(duplicated)} 种")
+    if shared_num != SHARED_LINE_NUM:
+        problems.append(f"各进程共接受共享语料 {shared_num} 条，应为 {SHARED_LINE_NUM} 条")
+    return problems
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--processes', type=int, default=8, help="写入进程数")
+    parser.add_argument('--lines', type=int, default=5000, help="每个进程写入的语料条数")
+    parser.add_argument('--buckets', type=int, default=4, help="语料桶数")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ['CORPUS_WRITE_LOCK'] = 'true'
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        dataset_dir = Path(tmp_dir)
+        with get_context('spawn').Pool(args.processes) as pool:
+            results = pool.starmap(
+                worker,
+                [(tmp_dir, args.buckets, worker_id, args.lines, args.seed) for worker_id in range(args.processes)],
+            )
+        shared_num = sum(shared for _, shared in results)
+        problems = verify(dataset_dir, args.buckets, args.processes, args.lines, shared_num)
+    total = sum(own for own, _ in results) + shared_num
+    print(f"{args.processes} 个进程共写入 {total} 条语料，发现 {len(problems)} 个问题。")
+    for problem in problems:
+        print(problem)
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+from pathlib import Path
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+# 导入 app 时全局配置会在数据目录下创建子目录，测试期间(含子进程)统一指向临时目录
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp(prefix='teaine-ruler-test-'))
+
+
+@pytest.fixture
+def sqlite_url(tmp_path: Path) -> str:
+    return f'sqlite:///{tmp_path / "test.db"}'
+
+
+@pytest.fixture
+def async_engine(sqlite_url: str, monkeypatch: pytest.MonkeyPatch):
+    """以建好全部数据表的 SQLite 数据库替换全局异步 Engine 对象，使用方需在自身事件循环中 dispose"""
+    from sqlmodel import SQLModel
+    from app.utils import db
+
+    engine = db.create_db_async_engine(sqlite_url)
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+        await engine.dispose()
+
+    asyncio.run(create_tables())
+    monkeypatch.setattr(db, 'async_engine', engine)
+    return engine
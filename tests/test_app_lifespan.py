@@ -0,0 +1,18 @@
+"""同一进程中多次启动与关闭应用"""
+
+from fastapi.testclient import TestClient
+import pytest
+
+from app.__main__ import app
+from app.utils import executor
+from app.utils.config import settings
+
+
+def test_repeated_lifespan(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, 'corpus_info_watch', False)
+    monkeypatch.setattr(settings, 'base_prompt_watch', False)
+    for _ in range(2):
+        with TestClient(app) as client:
+            assert executor.io_executor is not None
+            assert client.get('/base_prompt/status').status_code == 200
+        assert executor.io_executor is None
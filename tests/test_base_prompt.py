@@ -0,0 +1,44 @@
+"""base prompt 批量获取与服务端渲染"""
+
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+
+from app.api.routes.base_prompt import router
+from app.core.base_prompt import BasePromptManager
+
+
+@pytest.fixture
+def client(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> TestClient:
+    (tmp_path / 'greet.txt').write_text('你好 {{{name}}}，欢迎来到 {{{place}}}。', encoding='utf-8-sig')
+    (tmp_path / 'plain.txt').write_text('没有参数', encoding='utf-8-sig')
+    manager = BasePromptManager()
+    manager.base_prompt_data_dir = tmp_path
+    monkeypatch.setattr('app.api.routes.base_prompt.base_prompt_manager', manager)
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_get_all_raw(client: TestClient):
+    response = client.post('/get_all', json={'params': {'name': '小明'}})
+    assert response.status_code == 200
+    prompts = {item['name']: item for item in response.json()}
+    assert prompts['greet']['text'] == '你好 {{{name}}}，欢迎来到 {{{place}}}。'
+    assert prompts['greet']['params'] == {'name': '小明'}
+    assert 'missing_params' not in prompts['greet']
+
+
+def test_get_all_rendered(client: TestClient):
+    response = client.post('/get_all', params={'render': True}, json={'params': {'name': '小明'}})
+    assert response.status_code == 200
+    prompts = {item['name']: item for item in response.json()}
+    assert prompts['greet'] == {
+        'name': 'greet',
+        'text': '你好 小明，欢迎来到 {{{place}}}。',
+        'param_names': ['name', 'place'],
+        'missing_params': ['place'],
+    }
+    assert prompts['plain'] == {'name': 'plain', 'text': '没有参数', 'param_names': [], 'missing_params': []}
@@ -0,0 +1,47 @@
+"""数据集信息缓存的目录监听"""
+
+from pathlib import Path
+import asyncio
+import time
+
+from app.common.models.corpus import DatasetInfo
+from app.core.corpus.cache import DatasetInfoCache
+from app.core.corpus.const import DATASET_INFO_FILENAME
+
+
+async def wait_until(predicate, timeout: float = 10) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.02)
+    return True
+
+
+def test_watch_enabled_after_watcher_started(tmp_path: Path):
+    dataset_dir = tmp_path / 'watched'
+    dataset_dir.mkdir()
+    info_path = dataset_dir / DATASET_INFO_FILENAME
+    info_path.write_text(DatasetInfo(name='watched', description='', bucket_num=1).model_dump_json())
+    cache = DatasetInfoCache()
+
+    def load() -> DatasetInfo:
+        return DatasetInfo.model_validate_json(info_path.read_text())
+
+    async def run():
+        cache.start_watch(tmp_path)
+        await asyncio.sleep(0)
+        assert not cache.watching
+        assert cache.get(dataset_dir, load).bucket_num == 1
+        assert await wait_until(lambda: cache.watching)
+        assert cache.peek('watched') is None
+
+        assert cache.get(dataset_dir, load).bucket_num == 1
+        info_path.write_text(DatasetInfo(name='watched', description='', bucket_num=2).model_dump_json())
+        assert await wait_until(lambda: cache.peek('watched') is None)
+        assert cache.get(dataset_dir, load).bucket_num == 2
+
+        await cache.stop_watch()
+        assert not cache.watching
+
+    asyncio.run(run())
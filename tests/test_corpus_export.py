@@ -0,0 +1,52 @@
+"""数据集导出的快照续传"""
+
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+
+from app.api.routes.corpus import router
+from app.core.corpus import corpus_dataset_manager
+from app.core.corpus.const import get_bucket_file_name
+
+DATASET_NAME = 'export'
+
+
+@pytest.fixture
+def client(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> TestClient:
+    monkeypatch.setattr(corpus_dataset_manager, 'corpus_data_dir', tmp_path)
+    corpus_dataset_manager.info_cache.invalidate()
+    corpus_dataset_manager._create(DATASET_NAME, '', 2, False)
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def write_bucket(corpus_data_dir: Path, bucket_id: int, data: bytes):
+    (corpus_data_dir / DATASET_NAME / get_bucket_file_name(bucket_id)).write_bytes(data)
+
+
+def test_export_resume_with_snapshot(client: TestClient, tmp_path: Path):
+    write_bucket(tmp_path, 1, b'{"a": 1}\n{"a": 2}\n')
+    write_bucket(tmp_path, 2, b'{"b": 1}\n')
+    response = client.get(f'/export/{DATASET_NAME}')
+    assert response.status_code == 200
+    assert response.content == b'{"a": 1}\n{"a": 2}\n{"b": 1}\n'
+    snapshot = response.headers['X-Corpus-Snapshot']
+
+    write_bucket(tmp_path, 2, b'{"b": 1}\n{"b": 2}\n')
+    response = client.get(f'/export/{DATASET_NAME}', params={'snapshot': snapshot}, headers={'Range': 'bytes=9-'})
+    assert response.status_code == 206
+    assert response.content == b'{"a": 2}\n{"b": 1}\n'
+    assert int(response.headers['Content-Length']) == len(response.content)
+
+
+def test_export_rejects_stale_snapshot(client: TestClient, tmp_path: Path):
+    write_bucket(tmp_path, 1, b'{"a": 1}\n{"a": 2}\n')
+    snapshot = client.get(f'/export/{DATASET_NAME}').headers['X-Corpus-Snapshot']
+
+    write_bucket(tmp_path, 1, b'{"a": 1}\n')
+    response = client.get(f'/export/{DATASET_NAME}', params={'snapshot': snapshot}, headers={'Range': 'bytes=1-'})
+    assert response.status_code == 403
+    assert client.get(f'/export/{DATASET_NAME}', params={'snapshot': '1:4-2'}).status_code == 403
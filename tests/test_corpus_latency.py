@@ -0,0 +1,64 @@
+"""添加语料与数据集维护操作读取数据集信息时不阻塞事件循环"""
+
+from pathlib import Path
+import asyncio
+import time
+
+import pytest
+
+from app.common.models.corpus import Corpus
+from app.core.corpus import CorpusDatasetManager
+
+DATASET_NAME = 'latency'
+READ_INFO_DELAY = 0.3
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """在 stop 被设置前周期性让出事件循环，返回单次调度超出预期的最大延迟"""
+    max_lag = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        max_lag = max(max_lag, time.perf_counter() - start - interval)
+    return max_lag
+
+
+OPERATIONS = {
+    'add_corpus': lambda manager: manager.add_corpus(DATASET_NAME, Corpus.model_construct()),
+    'get_bucket_ids': lambda manager: manager.get_bucket_ids(DATASET_NAME),
+    'seal': lambda manager: manager.seal(DATASET_NAME),
+    'rebuild_stats': lambda manager: manager.rebuild_stats(DATASET_NAME),
+}
+"""需读取数据集信息的写入与维护操作"""
+
+
+@pytest.mark.parametrize('operation', OPERATIONS)
+def test_load_info_does_not_block_event_loop(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, operation: str):
+    manager = CorpusDatasetManager()
+    manager.corpus_data_dir = tmp_path
+    read_info = manager._read_info
+
+    def slow_read_info(dataset_dir: Path):
+        time.sleep(READ_INFO_DELAY)
+        return read_info(dataset_dir)
+
+    async def run():
+        await manager.create(DATASET_NAME, bucket_num=2)
+        manager.info_cache.invalidate()
+        monkeypatch.setattr(manager, '_read_info', slow_read_info)
+        stop = asyncio.Event()
+        lag_task = asyncio.create_task(measure_loop_lag(stop))
+        await asyncio.sleep(0)
+        start = time.perf_counter()
+        try:
+            await OPERATIONS[operation](manager)
+        finally:
+            stop.set()
+        elapsed = time.perf_counter() - start
+        max_lag = await lag_task
+        await manager.close()
+        return elapsed, max_lag
+
+    elapsed, max_lag = asyncio.run(run())
+    assert elapsed >= READ_INFO_DELAY
+    assert max_lag < READ_INFO_DELAY / 3
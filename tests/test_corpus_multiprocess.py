@@ -0,0 +1,135 @@
+"""多进程并发写入同一数据集，期间重新分桶，校验语料无丢失、无重复、无交错且位于正确分桶"""
+
+from multiprocessing import get_context
+from pathlib import Path
+import asyncio
+import json
+
+from app.core.corpus import CorpusDatasetManager
+from app.core.corpus.const import STATS_FILENAME, get_bucket_file_name, get_line_bucket_id, parse_bucket_id
+from app.core.corpus.reader import get_bucket_size, iter_bucket_lines_sync
+from app.core.corpus.stats import scan_bucket_stats
+
+DATASET_NAME = 'mp'
+WORKER_NUM = 3
+LINES_PER_WORKER = 600
+
+
+def create_manager(corpus_data_dir: Path) -> CorpusDatasetManager:
+    manager = CorpusDatasetManager()
+    manager.corpus_data_dir = corpus_data_dir
+    return manager
+
+
+def write_lines(corpus_data_dir: str, worker_id: int, ready, start, stats_flush_interval: float = 1):
+    """子进程：分批提交带编号的语料行，每批之间让出时间片以便与重新分桶交错"""
+
+    async def run():
+        manager = create_manager(Path(corpus_data_dir))
+        manager.stats_index.flush_interval = stats_flush_interval
+        ready.set()
+        start.wait()
+        try:
+            for batch_start in range(0, LINES_PER_WORKER, 20):
+                bucket_num = (await manager.load_info(DATASET_NAME)).bucket_num
+                futures = [
+                    manager._submit_line(
+                        DATASET_NAME,
+                        json.dumps({'worker': worker_id, 'seq': seq, 'pad': 'x' * (seq % 97)}).encode(),
+                        bucket_num,
+                    )[1]
+                    for seq in range(batch_start, batch_start + 20)
+                ]
+                await asyncio.gather(*futures)
+                await asyncio.sleep(0.005)
+        finally:
+            await manager.close()
+
+    asyncio.run(run())
+
+
+def read_dataset(corpus_data_dir: Path, bucket_num: int) -> dict[tuple[int, int], int]:
+    """读取数据集全部语料，校验每行均为完整 JSON 且位于其所属分桶，返回 (进程编号, 序号) 与出现次数映射表"""
+    dataset_dir = corpus_data_dir / DATASET_NAME
+    bucket_ids = sorted(
+        bucket_id for path in dataset_dir.iterdir() if (bucket_id := parse_bucket_id(path.name)) is not None
+    )
+    assert max(bucket_ids, default=0) <= bucket_num
+    counts: dict[tuple[int, int], int] = dict()
+    for bucket_id in bucket_ids:
+        path = dataset_dir / get_bucket_file_name(bucket_id)
+        for _, line in iter_bucket_lines_sync(path, 0, get_bucket_size(path)):
+            item = json.loads(line)
+            assert get_line_bucket_id(line, bucket_num) == bucket_id
+            key = (item['worker'], item['seq'])
+            counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def test_concurrent_writers_during_reshard(tmp_path: Path):
+    ctx = get_context('spawn')
+    manager = create_manager(tmp_path)
+
+    async def run():
+        await manager.create(DATASET_NAME, bucket_num=4)
+        start = ctx.Event()
+        readies = [ctx.Event() for _ in range(WORKER_NUM)]
+        processes = [
+            ctx.Process(target=write_lines, args=(str(tmp_path), worker_id, readies[worker_id], start))
+            for worker_id in range(WORKER_NUM)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for ready in readies:
+                assert await asyncio.to_thread(ready.wait, 60)
+            start.set()
+            for bucket_num in (7, 3):
+                await asyncio.sleep(0.2)
+                await manager.reshard(DATASET_NAME, bucket_num)
+                await manager._reshard_tasks[DATASET_NAME]
+                progress = manager.get_reshard_progress(DATASET_NAME)
+                assert progress.status == 'finished', progress.error
+        finally:
+            for process in processes:
+                await asyncio.to_thread(process.join, 120)
+            await manager.close()
+        assert all(process.exitcode == 0 for process in processes)
+
+    asyncio.run(run())
+    counts = read_dataset(tmp_path, 3)
+    expected = {(worker_id, seq) for worker_id in range(WORKER_NUM) for seq in range(LINES_PER_WORKER)}
+    assert set(counts) == expected
+    assert all(count == 1 for count in counts.values())
+
+
+def test_concurrent_writers_stats(tmp_path: Path):
+    """各进程延迟写回统计信息，合并后 STATS.json 与语料桶文件一致"""
+    ctx = get_context('spawn')
+    manager = create_manager(tmp_path)
+    asyncio.run(manager.create(DATASET_NAME, bucket_num=4))
+    start = ctx.Event()
+    readies = [ctx.Event() for _ in range(WORKER_NUM)]
+    processes = [
+        ctx.Process(
+            target=write_lines,
+            args=(str(tmp_path), worker_id, readies[worker_id], start, 0.01 if worker_id % 2 else 3600),
+        )
+        for worker_id in range(WORKER_NUM)
+    ]
+    for process in processes:
+        process.start()
+    for ready in readies:
+        assert ready.wait(60)
+    start.set()
+    for process in processes:
+        process.join(120)
+    assert all(process.exitcode == 0 for process in processes)
+
+    dataset_dir = tmp_path / DATASET_NAME
+    data = json.loads((dataset_dir / STATS_FILENAME).read_text(encoding='utf-8-sig'))
+    stats = {item['bucket_id']: item for item in data['buckets']}
+    for bucket_id in range(1, 5):
+        scanned = scan_bucket_stats(dataset_dir / get_bucket_file_name(bucket_id))
+        assert (stats[bucket_id]['corpus_num'], stats[bucket_id]['size']) == (scanned.corpus_num, scanned.size)
+    assert sum(item['corpus_num'] for item in stats.values()) == WORKER_NUM * LINES_PER_WORKER
@@ -0,0 +1,137 @@
+"""语料桶行偏移索引的构建、按序号定位与失效重建"""
+
+from pathlib import Path
+import asyncio
+import codecs
+import json
+
+import pytest
+
+from app.core.corpus import CorpusDatasetManager
+from app.core.corpus.offset import CorpusOffsetIndex, get_offset_index_path
+from app.core.corpus.reader import get_bucket_size, get_sealed_file_path, iter_bucket_chunks_sync
+from app.core.corpus.seal import commit_rewrite
+from app.utils.config import settings
+
+DATASET_NAME = 'offset'
+
+
+def make_lines(start: int, num: int) -> list[bytes]:
+    return [json.dumps({'seq': seq, 'pad': 'x' * (seq % 13)}).encode() for seq in range(start, start + num)]
+
+
+def write_bucket(path: Path, lines: list[bytes]):
+    path.write_bytes(codecs.BOM_UTF8 + b''.join(line + b'\n' for line in lines))
+
+
+def read_line(index: CorpusOffsetIndex, path: Path, line_no: int) -> bytes:
+    """由行偏移索引定位并读取第 line_no 条语料(不含换行符)"""
+    with index.view(path) as view:
+        start, end = view.get_span(line_no)
+    return b''.join(iter_bucket_chunks_sync(path, start, end)).removesuffix(b'\n')
+
+
+def assert_index_matches(index: CorpusOffsetIndex, path: Path, lines: list[bytes]):
+    with index.view(path) as view:
+        assert len(view) == len(lines)
+        assert view[len(view) - 1] == get_bucket_size(path)
+    for line_no in (0, len(lines) // 2, len(lines) - 1):
+        assert read_line(index, path, line_no) == lines[line_no]
+
+
+def test_build_and_read_at_offsets(tmp_path: Path):
+    path = tmp_path / 'bucket_1.jsonl'
+    lines = make_lines(0, 50)
+    write_bucket(path, lines)
+    index = CorpusOffsetIndex()
+    index.catch_up(path, get_bucket_size(path))
+    assert_index_matches(index, path, lines)
+
+    size = get_bucket_size(path)
+    more = make_lines(50, 10)
+    with open(path, 'ab') as f:
+        f.write(b''.join(line + b'\n' for line in more))
+    offsets = []
+    for line in more:
+        offsets.append(size)
+        size += len(line) + 1
+    index.committed(path, [line + b'\n' for line in more], offsets)
+    assert_index_matches(index, path, lines + more)
+
+    with index.view(path) as view:
+        middle = view[29]
+        assert view.count(middle) == 30
+        assert view.count(middle - 1) == 29
+
+
+def test_truncated_index_caught_up(tmp_path: Path):
+    path = tmp_path / 'bucket_1.jsonl'
+    lines = make_lines(0, 40)
+    write_bucket(path, lines)
+    index = CorpusOffsetIndex()
+    index.catch_up(path, get_bucket_size(path))
+    index_path = get_offset_index_path(path)
+    data = index_path.read_bytes()
+    index_path.write_bytes(data[:len(data) // 2 + 3])
+
+    with index.view(path) as view:
+        assert len(view) == len(data) // 2 // 8
+    index.catch_up(path, get_bucket_size(path))
+    assert index_path.read_bytes() == data
+    assert_index_matches(index, path, lines)
+
+    index_path.unlink()
+    index.catch_up(path, get_bucket_size(path))
+    assert index_path.read_bytes() == data
+
+
+def test_stale_index_rebuilt_after_rewrite(tmp_path: Path):
+    path = tmp_path / 'bucket_1.jsonl'
+    index = CorpusOffsetIndex()
+    write_bucket(path, make_lines(0, 30))
+    index.catch_up(path, get_bucket_size(path))
+
+    lines = make_lines(100, 10)
+    new_path = tmp_path / 'bucket_1.jsonl.new'
+    write_bucket(new_path, lines)
+    commit_rewrite(path, new_path)
+    index.rebuild(path)
+    assert_index_matches(index, path, lines)
+
+    write_bucket(path, make_lines(200, 5))
+    more = make_lines(300, 3)
+    size = get_bucket_size(path)
+    with open(path, 'ab') as f:
+        f.write(b''.join(line + b'\n' for line in more))
+    index.committed(path, [more[0] + b'\n'], [size])
+    with index.view(path) as view:
+        assert view[len(view) - 1] == size + len(more[0]) + 1
+        assert read_line(index, path, 5) == more[0]
+
+
+def test_index_valid_after_seal(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, 'corpus_seal_block_size', 256)
+    manager = CorpusDatasetManager()
+    manager.corpus_data_dir = tmp_path
+    path = manager.get_bucket_file_path(DATASET_NAME, 1)
+
+    async def write(lines: list[bytes]):
+        await asyncio.gather(*(manager._submit_line(DATASET_NAME, line, 1)[1] for line in lines))
+
+    async def run():
+        await manager.create(DATASET_NAME, bucket_num=1)
+        lines = make_lines(0, 60)
+        await write(lines)
+        manager.offset_index.catch_up(path, get_bucket_size(path))
+        await manager.seal(DATASET_NAME)
+        assert get_sealed_file_path(path).exists()
+        assert_index_matches(manager.offset_index, path, lines)
+
+        more = make_lines(60, 20)
+        await write(more)
+        await manager.writer_pool.flush(path.parent, sync=True)
+        manager.offset_index.catch_up(path, get_bucket_size(path))
+        assert_index_matches(manager.offset_index, path, lines + more)
+        await manager.close()
+
+    asyncio.run(run())
@@ -0,0 +1,91 @@
+"""数据集统计信息延迟写回"""
+
+from pathlib import Path
+import asyncio
+import json
+import time
+
+from app.core.corpus import CorpusDatasetManager
+from app.core.corpus.const import STATS_FILENAME, get_bucket_file_name
+from app.core.corpus.stats import scan_bucket_stats
+
+DATASET_NAME = 'stats'
+BUCKET_NUM = 4
+
+
+def create_manager(corpus_data_dir: Path, flush_interval: float) -> CorpusDatasetManager:
+    manager = CorpusDatasetManager()
+    manager.corpus_data_dir = corpus_data_dir
+    manager.stats_index.flush_interval = flush_interval
+    return manager
+
+
+async def write_lines(manager: CorpusDatasetManager, start: int, num: int):
+    bucket_num = (await manager.load_info(DATASET_NAME)).bucket_num
+    await asyncio.gather(*(
+        manager._submit_line(DATASET_NAME, json.dumps({'seq': seq}).encode(), bucket_num)[1]
+        for seq in range(start, start + num)
+    ))
+
+
+def read_stats(dataset_dir: Path) -> dict[int, dict]:
+    data = json.loads((dataset_dir / STATS_FILENAME).read_text(encoding='utf-8-sig'))
+    return {item['bucket_id']: item for item in data['buckets']}
+
+
+def assert_stats_match_buckets(dataset_dir: Path):
+    stats = read_stats(dataset_dir)
+    for bucket_id in range(1, BUCKET_NUM + 1):
+        scanned = scan_bucket_stats(dataset_dir / get_bucket_file_name(bucket_id))
+        assert stats[bucket_id]['corpus_num'] == scanned.corpus_num
+        assert stats[bucket_id]['size'] == scanned.size
+
+
+def test_stats_written_back_on_close(tmp_path: Path):
+    manager = create_manager(tmp_path, 3600)
+    dataset_dir = tmp_path / DATASET_NAME
+
+    async def run():
+        await manager.create(DATASET_NAME, bucket_num=BUCKET_NUM)
+        for start in range(0, 300, 50):
+            await write_lines(manager, start, 50)
+        assert not (dataset_dir / STATS_FILENAME).exists()
+        detail = await manager.get_info(DATASET_NAME)
+        assert detail.corpus_num == 300
+        await manager.close()
+
+    asyncio.run(run())
+    assert_stats_match_buckets(dataset_dir)
+    assert sum(item['corpus_num'] for item in read_stats(dataset_dir).values()) == 300
+
+
+def test_stats_written_back_on_timer(tmp_path: Path):
+    manager = create_manager(tmp_path, 0.05)
+    dataset_dir = tmp_path / DATASET_NAME
+
+    async def run():
+        await manager.create(DATASET_NAME, bucket_num=BUCKET_NUM)
+        await write_lines(manager, 0, 100)
+        deadline = time.monotonic() + 5
+        while not (dataset_dir / STATS_FILENAME).exists() and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        assert_stats_match_buckets(dataset_dir)
+        await manager.close()
+
+    asyncio.run(run())
+
+
+def test_stats_reload_after_restart(tmp_path: Path):
+    dataset_dir = tmp_path / DATASET_NAME
+
+    async def run(start: int):
+        manager = create_manager(tmp_path, 3600)
+        if start == 0:
+            await manager.create(DATASET_NAME, bucket_num=BUCKET_NUM)
+        await write_lines(manager, start, 100)
+        await manager.close()
+
+    asyncio.run(run(0))
+    asyncio.run(run(100))
+    assert_stats_match_buckets(dataset_dir)
+    assert sum(item['corpus_num'] for item in read_stats(dataset_dir).values()) == 200
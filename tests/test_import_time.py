@@ -0,0 +1,14 @@
+"""应用导入耗时预算，探测代码与预算取自 scripts/check_import_time.py"""
+
+from scripts.check_import_time import IMPORT_TIME_BUDGET, run_probe
+
+
+def test_import_time_within_budget():
+    results = [run_probe(IMPORT_TIME_BUDGET * 10, importtime=True) for _ in range(3)]
+    for result in results:
+        assert result.no_engine, "导入期间创建了数据库 Engine 对象。"
+        assert result.no_prompt, "导入期间载入了 base prompt。"
+    timings = min((result.timings for result in results), key=lambda timings: timings['app.__main__'][1])
+    slowest = sorted(timings.items(), key=lambda item: item[1][0], reverse=True)[:10]
+    detail = ', '.join(f'{name} {self_us / 1e3:.1f}ms' for name, (self_us, _) in slowest)
+    assert timings['app.__main__'][1] <= IMPORT_TIME_BUDGET * 1e6, f"导入耗时超出预算，自身耗时最多的模块：{detail}"
@@ -0,0 +1,141 @@
+"""交互行为批量写入缓冲区的重试与反压"""
+
+import asyncio
+
+from sqlalchemy import func
+from sqlmodel import select
+import pytest
+
+from app.core import interaction as interaction_module
+from app.core.interaction import IngestBufferFullError, InteractionIngestBuffer, resolve_ingest_users
+from app.core.user.cache import UserResolveCache
+from app.core.user.resolve import UserResolver
+from app.models.db import Interaction, InteractionBase, User_Info
+from app.models.interaction import InteractionIngest
+from app.models.user import UserResolve
+from app.utils.config import settings
+
+
+def make_interactions(num: int) -> list[InteractionBase]:
+    return [InteractionBase(scene_id=1, user_id=user_id) for user_id in range(num)]
+
+
+async def count_interactions(async_engine) -> int:
+    async with async_engine.connect() as conn:
+        return (await conn.execute(select(func.count()).select_from(Interaction))).scalar_one()
+
+
+def test_retry_after_insert_failure(async_engine, monkeypatch: pytest.MonkeyPatch):
+    buffer = InteractionIngestBuffer(
+        batch_size=10,
+        flush_interval=0.01,
+        max_pending=100,
+        max_retries=3,
+        retry_delay=0.01,
+    )
+    insert = buffer._insert
+    failures = 2
+
+    async def flaky_insert(rows: list[dict]):
+        nonlocal failures
+        if failures:
+            failures -= 1
+            raise OSError("connection reset")
+        await insert(rows)
+
+    monkeypatch.setattr(buffer, '_insert', flaky_insert)
+
+    async def run():
+        await buffer.put(make_interactions(5), wait=True)
+        assert failures == 0
+        assert buffer.pending == 0
+        assert await count_interactions(async_engine) == 5
+        await buffer.close()
+        await async_engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_drop_after_retries_exhausted(async_engine, monkeypatch: pytest.MonkeyPatch):
+    buffer = InteractionIngestBuffer(
+        batch_size=10,
+        flush_interval=0.01,
+        max_pending=100,
+        max_retries=2,
+        retry_delay=0.01,
+    )
+    attempts = 0
+
+    async def failing_insert(rows: list[dict]):
+        nonlocal attempts
+        attempts += 1
+        raise OSError("connection refused")
+
+    monkeypatch.setattr(buffer, '_insert', failing_insert)
+
+    async def run():
+        with pytest.raises(OSError):
+            await buffer.put(make_interactions(5), wait=True)
+        assert attempts == 3
+        assert buffer.pending == 0
+        await buffer.close()
+        await async_engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_in_flight_rows_count_toward_max_pending(async_engine, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, 'interaction_ingest_put_timeout', 0.1)
+    buffer = InteractionIngestBuffer(batch_size=5, flush_interval=0.01, max_pending=5)
+    insert = buffer._insert
+    release = asyncio.Event()
+
+    async def blocked_insert(rows: list[dict]):
+        await release.wait()
+        await insert(rows)
+
+    monkeypatch.setattr(buffer, '_insert', blocked_insert)
+
+    async def run():
+        await buffer.put(make_interactions(5))
+        await asyncio.sleep(0.05)
+        assert not buffer._rows
+        assert buffer.pending == 5
+        with pytest.raises(IngestBufferFullError):
+            await buffer.put(make_interactions(1))
+        release.set()
+        await buffer.put(make_interactions(1), wait=True)
+        assert await count_interactions(async_engine) == 6
+        await buffer.close()
+        await async_engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_ingest_resolves_platform_users(async_engine, monkeypatch: pytest.MonkeyPatch):
+    resolver = UserResolver(UserResolveCache(maxsize=100, ttl=60))
+    monkeypatch.setattr(interaction_module, 'user_resolver', resolver)
+    buffer = InteractionIngestBuffer(batch_size=10, flush_interval=0.01, max_pending=100)
+    interactions = [
+        InteractionIngest(scene_id=1, user=UserResolve(platform='bilibili', user_platform_id=user_platform_id))
+        for user_platform_id in ('a', 'b', 'a')
+    ]
+    interactions.append(InteractionIngest(scene_id=1, user_id=42))
+
+    async def run():
+        rows = await resolve_ingest_users(interactions)
+        assert all(type(row) is InteractionBase for row in rows)
+        assert rows[0].user_id == rows[2].user_id != rows[1].user_id
+        assert rows[3].user_id == 42
+        assert len(resolver.cache) == 2
+        await buffer.put(rows, wait=True)
+        assert await count_interactions(async_engine) == 4
+        async with async_engine.connect() as conn:
+            assert (await conn.execute(select(func.count()).select_from(User_Info))).scalar_one() == 2
+
+        with pytest.raises(ValueError):
+            await resolve_ingest_users([InteractionIngest(scene_id=1)])
+        await buffer.close()
+        await async_engine.dispose()
+
+    asyncio.run(run())
@@ -0,0 +1,73 @@
+"""/metrics 抓取与 HTTP 请求指标"""
+
+from pathlib import Path
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client.parser import text_string_to_metric_families
+
+from app.api.routes.metrics import router as metrics_router
+from app.core.corpus.const import get_bucket_file_name
+from app.core.corpus.writer import BucketWriter
+from app.utils.metrics import MetricsMiddleware, registry
+
+
+def create_client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
+
+    @app.get('/items/{item_id}')
+    async def _(item_id: int):
+        return item_id
+
+    return TestClient(app)
+
+
+def scrape(client: TestClient) -> dict[str, list]:
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain')
+    return {family.name: family.samples for family in text_string_to_metric_families(response.text)}
+
+
+def test_metrics_enabled_by_default():
+    assert registry is not None
+
+
+def write_bucket_lines(path: Path, num: int):
+    """经语料桶写入器写入 num 条语料，使写入指标以生产代码的标签格式记录"""
+
+    async def run():
+        writer = BucketWriter(path, batch_size=num, delay=0, durability='none')
+        await asyncio.gather(*(writer.write(f'{{"seq": {seq}}}\n'.encode()) for seq in range(num)))
+        await writer.close()
+
+    asyncio.run(run())
+
+
+def test_scrape_metrics(tmp_path: Path):
+    client = create_client()
+    bucket_file_path = tmp_path / 'metrics_dataset' / get_bucket_file_name(1)
+    bucket_file_path.parent.mkdir()
+    for item_id in range(3):
+        assert client.get(f'/items/{item_id}').status_code == 200
+    assert client.get('/missing').status_code == 404
+    write_bucket_lines(bucket_file_path, 5)
+
+    families = scrape(client)
+    requests = {
+        (sample.labels['route'], sample.labels['status']): sample.value
+        for sample in families['teaine_http_requests']
+        if sample.name == 'teaine_http_requests_total'
+    }
+    assert requests[('/items/{item_id}', '200')] == 3
+    assert requests[('unmatched', '404')] == 1
+    assert any(
+        sample.labels == {'dataset': 'metrics_dataset', 'bucket': 'bucket_1'} and sample.value == 5
+        for sample in families['teaine_corpus_bucket_written_lines']
+        if sample.name == 'teaine_corpus_bucket_written_lines_total'
+    )
+    assert 'teaine_http_request_duration_seconds' in families
+    assert 'teaine_queue_depth' in families
@@ -0,0 +1,132 @@
+"""媒体平台账号解析、解析缓存与绑定失效"""
+
+import asyncio
+import time
+
+from sqlalchemy import func, inspect, insert, text
+from sqlmodel import create_engine, select
+import pytest
+
+from app.core.user import resolve as resolve_module
+from app.core.user.cache import UserResolveCache
+from app.core.user.resolve import USER_UNIQUE_INDEX_NAME, UserResolver
+from app.models.db import User_Info
+from app.models.user import ResolvedUser, UserResolve
+from app.utils import db
+
+
+def make_users(*user_platform_ids: str) -> list[UserResolve]:
+    return [UserResolve(platform='bilibili', user_platform_id=platform_id) for platform_id in user_platform_ids]
+
+
+@pytest.fixture
+def statement_calls(monkeypatch: pytest.MonkeyPatch) -> list[int]:
+    """记录每次构建获取或创建语句时的账号数"""
+    calls = []
+    get_or_create_statement = resolve_module.get_or_create_statement
+
+    def spy(dialect_name: str, users: list[UserResolve]):
+        calls.append(len(users))
+        return get_or_create_statement(dialect_name, users)
+
+    monkeypatch.setattr(resolve_module, 'get_or_create_statement', spy)
+    return calls
+
+
+def test_cache_lru_and_ttl(monkeypatch: pytest.MonkeyPatch):
+    resolved = [ResolvedUser(platform='bilibili', user_platform_id=str(i), id=i) for i in range(3)]
+    cache = UserResolveCache(maxsize=2, ttl=60)
+    for user in resolved:
+        cache.put(user)
+    assert len(cache) == 2
+    assert cache.get(('bilibili', '0')) is None
+    assert cache.get(('bilibili', '1')) == resolved[1]
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, 'monotonic', lambda: now + 61)
+    assert cache.get(('bilibili', '1')) is None
+
+
+def test_resolve_creates_and_caches(async_engine, statement_calls: list[int]):
+    resolver = UserResolver(UserResolveCache(maxsize=100, ttl=60))
+
+    async def run():
+        first = await resolver.resolve(make_users('a', 'b', 'a'))
+        assert first[0] == first[2]
+        assert first[0].id != first[1].id
+        assert statement_calls == [2]
+
+        assert await resolver.resolve(make_users('b', 'a')) == [first[1], first[0]]
+        assert statement_calls == [2]
+
+        resolver.cache.invalidate()
+        again = await resolver.resolve(make_users('a', 'c'))
+        assert again[0] == first[0]
+        assert statement_calls == [2, 2]
+        async with async_engine.connect() as conn:
+            assert (await conn.execute(select(func.count()).select_from(User_Info))).scalar_one() == 3
+        await async_engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_bind_invalidates_cache(async_engine, statement_calls: list[int]):
+    resolver = UserResolver(UserResolveCache(maxsize=100, ttl=60))
+
+    async def run():
+        main, other = await resolver.resolve(make_users('main', 'other'))
+        bound = await resolver.bind(main.id, [other.id])
+        assert [(user.id, user.main_id) for user in bound] == [(other.id, main.id)]
+        assert resolver.cache.get(('bilibili', 'other')) is None
+
+        (other,) = await resolver.resolve(make_users('other'))
+        assert other.main_id == main.id
+        assert statement_calls == [2, 1]
+
+        with pytest.raises(ValueError):
+            await resolver.bind(main.id + other.id + 1, [other.id])
+        await async_engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_resolve_during_bind_not_cached(async_engine, monkeypatch: pytest.MonkeyPatch):
+    resolver = UserResolver(UserResolveCache(maxsize=100, ttl=60))
+    get_or_create_statement = resolve_module.get_or_create_statement
+
+    def bind_in_flight(dialect_name: str, users: list[UserResolve]):
+        resolver._epoch += 1
+        return get_or_create_statement(dialect_name, users)
+
+    monkeypatch.setattr(resolve_module, 'get_or_create_statement', bind_in_flight)
+
+    async def run():
+        await resolver.resolve(make_users('a'))
+        assert len(resolver.cache) == 0
+        await async_engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_unique_index_skipped_on_duplicates(sqlite_url: str, async_engine, monkeypatch: pytest.MonkeyPatch):
+    engine = create_engine(sqlite_url)
+    monkeypatch.setattr(db, 'engine', engine)
+    monkeypatch.setattr(db, 'skipped_indexes', set())
+    table = User_Info.__table__
+    with engine.begin() as conn:
+        conn.execute(text(f'DROP INDEX {USER_UNIQUE_INDEX_NAME}'))
+        conn.execute(insert(table), [
+            User_Info(platform='bilibili', user_platform_id='dup').model_dump(exclude={'id'}) for _ in range(2)
+        ])
+
+    db.check_db_tables()
+    assert USER_UNIQUE_INDEX_NAME in db.skipped_indexes
+    assert USER_UNIQUE_INDEX_NAME not in {index['name'] for index in inspect(engine).get_indexes(table.name)}
+    with pytest.raises(ValueError, match=USER_UNIQUE_INDEX_NAME):
+        asyncio.run(UserResolver(UserResolveCache(maxsize=100, ttl=60)).resolve(make_users('dup')))
+
+    with engine.begin() as conn:
+        conn.execute(table.delete().where(table.c.id == 2))
+    db.check_db_tables()
+    assert not db.skipped_indexes
+    assert USER_UNIQUE_INDEX_NAME in {index['name'] for index in inspect(engine).get_indexes(table.name)}